@@ -13,6 +13,12 @@ radarcatalog = namedtuple('radarcatalog', 'host dataset')
 
 LEVEL_2_RADAR_CATALOG = radarcatalog('http://thredds.ucar.edu/thredds/', 'NEXRAD Level II Radar from IDD')
 
+DOWNLOAD_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.weatherpy', 'downloads')
+
+ARCHIVE_INDEX_DIR = os.path.join(os.path.expanduser('~'), '.weatherpy', 'archive-index')
+
+TILE_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.weatherpy', 'tiles')
+
 TEST_DATA_DIR = os.sep.join([RESOURCES_DIR, 'fortests'])
 
 # LEVEL_2_RADAR_CATALOG_BACKUP = radarcatalog('http://tds.meteo.psu.edu:8080/thredds/idd/radars.xml',
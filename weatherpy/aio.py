@@ -0,0 +1,84 @@
+import asyncio
+import functools
+import weakref
+
+from weatherpy.thredds import netcdf_lock
+
+
+class Limiter(object):
+    def __init__(self, concurrency=8, executor=None):
+        if concurrency < 1:
+            raise ValueError("Concurrency must be at least 1")
+        self._concurrency = concurrency
+        self._executor = executor
+        # asyncio primitives belong to one event loop, so keep one semaphore per loop.
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    @property
+    def concurrency(self):
+        return self._concurrency
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self._concurrency)
+        async with self._semaphores[loop]:
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+
+def _identity(ds):
+    return ds
+
+
+def _locked_read(variable, index):
+    with netcdf_lock:
+        return variable[index]
+
+
+# only netCDF calls hold netcdf_lock; actions reading variables go through read() or take it
+class AsyncSelection(object):
+    def __init__(self, selection, catalog_limiter=None, data_limiter=None):
+        self._selection = selection
+        self._catalog_limiter = catalog_limiter or Limiter(8)
+        self._data_limiter = data_limiter or Limiter(4)
+
+    @property
+    def selection(self):
+        return self._selection
+
+    async def latest(self, action=None, **kwargs):
+        ds = await self._catalog_limiter.run(self._selection.latest, action=_identity, **kwargs)
+        return await self._apply(action, ds)
+
+    async def around(self, when, action=None, **kwargs):
+        ds = await self._catalog_limiter.run(self._selection.around, when, action=_identity, **kwargs)
+        return await self._apply(action, ds)
+
+    async def between(self, t1, t2, action=None, sort='asc'):
+        datasets = await self._catalog_limiter.run(
+            lambda: list(self._selection.between(t1, t2, action=_identity, sort=sort)))
+        return list(await asyncio.gather(*(self._apply(action, ds) for ds in datasets)))
+
+    async def since(self, when, action=None, sort='asc'):
+        datasets = await self._catalog_limiter.run(
+            lambda: list(self._selection.since(when, action=_identity, sort=sort)))
+        return list(await asyncio.gather(*(self._apply(action, ds) for ds in datasets)))
+
+    async def read(self, variable, index=slice(None)):
+        return await self._data_limiter.run(_locked_read, variable, index)
+
+    async def _apply(self, action, ds):
+        if action is None:
+            action = self._selection._default_action
+        return await self._data_limiter.run(action, ds)
+
+
+def wrap_all(selections, catalog_concurrency=8, data_concurrency=4):
+    catalog_limiter = Limiter(catalog_concurrency)
+    data_limiter = Limiter(data_concurrency)
+    return [AsyncSelection(sel, catalog_limiter, data_limiter) for sel in selections]
+
+
+async def latest_all(selections, action=None, catalog_concurrency=8, data_concurrency=4, **kwargs):
+    wrapped = wrap_all(selections, catalog_concurrency, data_concurrency)
+    return list(await asyncio.gather(*(sel.latest(action=action, **kwargs) for sel in wrapped)))
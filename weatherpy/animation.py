@@ -0,0 +1,267 @@
+import fractions
+import queue
+import shutil
+import struct
+import subprocess
+import threading
+import zlib
+
+import numpy as np
+
+from weatherpy import plotextras
+from weatherpy.internal import logger
+from weatherpy.plotextras import figure_rgba
+
+
+def animate(plotters, render, writer, **fig_kwargs):
+    # only the frame being rendered and the one pending in the writer are held in memory
+    for plotter in plotters:
+        with plotextras.figcontext(**fig_kwargs) as fig:
+            with plotter:
+                render(plotter, fig)
+            writer.add_figure(fig)
+    return writer
+
+
+class AnimationWriter(object):
+    def __init__(self, fps=10, dedupe=True, threaded=False, max_queue=4):
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+        self._fps = fps
+        self._dedupe = dedupe
+        self._size = None
+        self._pending = None
+        self._pending_count = 0
+        self._nframes = 0
+        self._closed = False
+
+        self._queue = None
+        self._worker = None
+        self._error = None
+        if threaded:
+            self._queue = queue.Queue(maxsize=max_queue)
+            self._worker = threading.Thread(target=self._work, daemon=True)
+            self._worker.start()
+
+    @property
+    def fps(self):
+        return self._fps
+
+    @property
+    def frames_written(self):
+        return self._nframes
+
+    def add_figure(self, fig):
+        self.add_frame(figure_rgba(fig))
+
+    def add_frame(self, rgba):
+        self._raise_worker_error()
+        if self._closed:
+            raise ValueError("Cannot add frames to a closed animation writer")
+
+        rgba = np.asarray(rgba, dtype=np.uint8)
+        if rgba.ndim != 3 or rgba.shape[2] != 4:
+            raise ValueError("Frames must be RGBA arrays of shape (height, width, 4)")
+        if self._size is None:
+            self._size = rgba.shape[:2]
+        elif rgba.shape[:2] != self._size:
+            raise ValueError("Frame size {} does not match animation size {}".format(rgba.shape[:2], self._size))
+
+        if self._queue is not None:
+            # blocks when the encoder falls behind, which bounds the number of buffered frames.
+            self._queue.put(rgba)
+        else:
+            try:
+                self._consume(rgba)
+            except Exception as e:
+                self._error = e
+                raise
+
+    def close(self):
+        if self._closed:
+            self._raise_worker_error()
+            return
+        self._closed = True
+        try:
+            if self._queue is not None:
+                self._queue.put(None)
+                self._worker.join()
+            self._raise_worker_error()
+            if self._pending is not None:
+                pending, self._pending = self._pending, None
+                self._write_frame(pending, self._pending_count)
+        except BaseException:
+            # release the output even though the animation can't be completed
+            self._abort()
+            raise
+        self._finish()
+        logger.info('[ANIMATION] Finish writing {} frames'.format(self._nframes))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return None
+
+    def _work(self):
+        while True:
+            rgba = self._queue.get()
+            if rgba is None:
+                return
+            if self._error is not None:
+                # keep draining so the producer never blocks on a dead worker.
+                continue
+            try:
+                self._consume(rgba)
+            except Exception as e:
+                self._error = e
+
+    def _raise_worker_error(self):
+        # once a frame failed the output is incomplete, so the writer stays failed
+        if self._error is not None:
+            raise self._error
+
+    def _consume(self, rgba):
+        # we hold back one frame so that runs of identical frames are written once.
+        if self._pending is not None:
+            if self._dedupe and np.array_equal(self._pending, rgba):
+                self._pending_count += 1
+                return
+            self._write_frame(self._pending, self._pending_count)
+        self._pending = rgba
+        self._pending_count = 1
+
+    def _write_frame(self, rgba, count):
+        raise NotImplementedError("Subclasses must implement _write_frame method")
+
+    def _finish(self):
+        raise NotImplementedError("Subclasses must implement _finish method")
+
+    def _abort(self):
+        raise NotImplementedError("Subclasses must implement _abort method")
+
+
+class ApngWriter(AnimationWriter):
+    _signature = b'\x89PNG\r\n\x1a\n'
+
+    def __init__(self, saveloc, fps=10, loops=0, compress_level=6, **kwargs):
+        super(ApngWriter, self).__init__(fps, **kwargs)
+        self._saveloc = saveloc
+        self._loops = loops
+        self._compress_level = compress_level
+        self._fh = None
+        self._actl_pos = None
+        self._seq = 0
+
+    def _write_frame(self, rgba, count):
+        if self._fh is None:
+            self._start(rgba.shape[1], rgba.shape[0])
+
+        height, width = rgba.shape[:2]
+        # delay is expressed as a fraction of seconds: count / fps, with 16-bit terms
+        delay = (count / fractions.Fraction(self._fps)).limit_denominator(65535)
+        self._chunk(b'fcTL', struct.pack('>IIIIIHHBB', self._next_seq(), width, height, 0, 0,
+                                         delay.numerator, delay.denominator, 0, 0))
+
+        # each scanline is prefixed with filter type 0 (None)
+        scanlines = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+        scanlines[:, 1:] = rgba.reshape(height, width * 4)
+        data = zlib.compress(scanlines.tobytes(), self._compress_level)
+
+        if self._nframes == 0:
+            self._chunk(b'IDAT', data)
+        else:
+            self._chunk(b'fdAT', struct.pack('>I', self._next_seq()) + data)
+        self._nframes += 1
+
+    def _start(self, width, height):
+        logger.info('[ANIMATION] Writing animated PNG to: {}'.format(self._saveloc))
+        self._fh = open(self._saveloc, 'wb')
+        self._fh.write(ApngWriter._signature)
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+        # number of frames is unknown until the end; patched in _finish.
+        self._actl_pos = self._fh.tell()
+        self._chunk(b'acTL', struct.pack('>II', 0, self._loops))
+
+    def _finish(self):
+        if self._fh is None:
+            return
+        try:
+            self._chunk(b'IEND', b'')
+            self._fh.seek(self._actl_pos)
+            self._chunk(b'acTL', struct.pack('>II', self._nframes, self._loops))
+        finally:
+            self._fh.close()
+            self._fh = None
+
+    def _abort(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def _chunk(self, chunktype, data):
+        self._fh.write(struct.pack('>I', len(data)))
+        self._fh.write(chunktype)
+        self._fh.write(data)
+        self._fh.write(struct.pack('>I', zlib.crc32(chunktype + data) & 0xffffffff))
+
+    def _next_seq(self):
+        seq = self._seq
+        self._seq += 1
+        return seq
+
+
+class FFmpegWriter(AnimationWriter):
+    def __init__(self, saveloc, fps=10, ffmpeg_path=None, output_args=(), **kwargs):
+        super(FFmpegWriter, self).__init__(fps, **kwargs)
+        self._saveloc = saveloc
+        self._ffmpeg = ffmpeg_path or shutil.which('ffmpeg')
+        if self._ffmpeg is None:
+            raise ValueError("Could not find ffmpeg executable")
+        self._output_args = tuple(output_args)
+        self._proc = None
+
+    def _write_frame(self, rgba, count):
+        if self._proc is None:
+            self._start(rgba.shape[1], rgba.shape[0])
+        # ffmpeg takes a constant frame rate, so deduplicated frames are repeated
+        # to keep the timing; we still skip the work of holding them in memory.
+        buf = np.ascontiguousarray(rgba).data
+        try:
+            for _ in range(count):
+                self._proc.stdin.write(buf)
+        except BrokenPipeError:
+            raise IOError("ffmpeg exited unexpectedly: {}".format(self._stderr()))
+        self._nframes += count
+
+    def _start(self, width, height):
+        logger.info('[ANIMATION] Piping frames to ffmpeg, output: {}'.format(self._saveloc))
+        cmd = [self._ffmpeg, '-y', '-loglevel', 'error',
+               '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', '{}x{}'.format(width, height),
+               '-r', str(self._fps), '-i', '-']
+        cmd.extend(self._output_args)
+        cmd.append(self._saveloc)
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def _finish(self):
+        if self._proc is None:
+            return
+        self._proc.stdin.close()
+        retcode = self._proc.wait()
+        if retcode != 0:
+            raise IOError("ffmpeg failed with exit code {}: {}".format(retcode, self._stderr()))
+
+    def _abort(self):
+        if self._proc is None:
+            return
+        try:
+            self._proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        self._proc.kill()
+        self._proc.wait()
+        self._proc.stderr.close()
+
+    def _stderr(self):
+        return self._proc.stderr.read().decode(errors='replace').strip()
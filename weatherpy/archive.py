@@ -0,0 +1,246 @@
+import bisect
+import fnmatch
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import netCDF4
+
+import config
+from weatherpy.internal import pyhelpers, logger
+from weatherpy.thredds import DatasetAccessException, netcdf_lock
+
+localdataset = namedtuple('localdataset', 'name path')
+
+_TIMESTAMP_FMT = '%Y-%m-%dT%H:%M:%S'
+
+_MTIME_RESOLUTION = 2
+
+DEFAULT_REFRESH_INTERVAL = timedelta(seconds=5)
+
+
+def default_index_path(directory):
+    digest = hashlib.sha1(os.path.abspath(directory).encode('utf-8')).hexdigest()
+    return os.path.join(config.ARCHIVE_INDEX_DIR, digest + '.json')
+
+
+def local_plotter(local_ds, plotter, opener=None):
+    opener = opener or netCDF4.Dataset
+    with netcdf_lock:
+        return plotter(opener(local_ds.path))
+
+
+# persisted; on refresh only directories whose mtime changed are listed again
+class ArchiveIndex(object):
+    def __init__(self, directory, timestamp_func, pattern=None, index_path=None):
+        self._directory = os.path.abspath(directory)
+        self._timestamp_func = timestamp_func
+        self._pattern = pattern
+        self._index_path = index_path or default_index_path(self._directory)
+        self._lock = threading.Lock()
+        self._dirs = self._load()
+        self._timestamps = []
+        self._paths = []
+        self._dirty = True
+        self.scans = 0
+
+    @property
+    def directory(self):
+        return self._directory
+
+    def refresh(self):
+        with self._lock:
+            seen = set()
+            changed = self._refresh_dir('', seen)
+            for stale in set(self._dirs) - seen:
+                del self._dirs[stale]
+                changed = True
+            if changed:
+                self._dirty = True
+                self._save()
+            if self._dirty:
+                self._rebuild()
+
+    def entries(self, t1=None, t2=None):
+        with self._lock:
+            lo = 0 if t1 is None else bisect.bisect_left(self._timestamps, t1)
+            hi = len(self._timestamps) if t2 is None else bisect.bisect_left(self._timestamps, t2)
+            return list(zip(self._timestamps[lo:hi], self._paths[lo:hi]))
+
+    def nearest(self, when, t1=None, t2=None):
+        # ties go to the earlier entry
+        with self._lock:
+            lo = 0 if t1 is None else bisect.bisect_left(self._timestamps, t1)
+            hi = len(self._timestamps) if t2 is None else bisect.bisect_left(self._timestamps, t2)
+            if lo >= hi:
+                return None
+            i = bisect.bisect_left(self._timestamps, when, lo, hi)
+            candidates = [j for j in (i - 1, i) if lo <= j < hi]
+            best = min(candidates, key=lambda j: abs(self._timestamps[j] - when))
+            return self._timestamps[best], self._paths[best]
+
+    def __len__(self):
+        return len(self._timestamps)
+
+    def _refresh_dir(self, relpath, seen):
+        fullpath = os.path.join(self._directory, relpath)
+        try:
+            mtime = os.stat(fullpath).st_mtime
+        except FileNotFoundError:
+            return False
+        seen.add(relpath)
+
+        cached = self._dirs.get(relpath)
+        changed = False
+        if cached is None or cached['mtime'] != mtime:
+            cached = self._scan(relpath, fullpath, mtime)
+            self._dirs[relpath] = cached
+            changed = True
+
+        # a directory's mtime doesn't change when something is added further down, so
+        # subdirectories always get a stat of their own.
+        for subdir in cached['subdirs']:
+            changed = self._refresh_dir(os.path.join(relpath, subdir), seen) or changed
+        return changed
+
+    def _scan(self, relpath, fullpath, mtime):
+        logger.info('[ARCHIVE] Scanning: {}'.format(fullpath))
+        self.scans += 1
+        previous = self._dirs.get(relpath, {}).get('files', {})
+        subdirs = []
+        files = {}
+        for entry in os.scandir(fullpath):
+            if entry.is_dir():
+                subdirs.append(entry.name)
+            elif self._pattern is None or fnmatch.fnmatch(entry.name, self._pattern):
+                if entry.name in previous:
+                    files[entry.name] = previous[entry.name]
+                else:
+                    files[entry.name] = self._parse_timestamp(entry.name)
+        if time.time() - mtime < _MTIME_RESOLUTION:
+            # files written in the same clock tick wouldn't bump mtime again; look next time too
+            mtime = None
+        return {'mtime': mtime, 'subdirs': sorted(subdirs), 'files': files}
+
+    def _parse_timestamp(self, filename):
+        try:
+            return self._timestamp_func(filename).strftime(_TIMESTAMP_FMT)
+        except ValueError:
+            # kept in the index as None, so it isn't parsed again on every scan
+            logger.debug('[ARCHIVE] Skipping file without timestamp: {}'.format(filename))
+            return None
+
+    def _rebuild(self):
+        entries = []
+        for relpath, info in self._dirs.items():
+            for filename, timestamp in info['files'].items():
+                if timestamp is not None:
+                    entries.append((datetime.strptime(timestamp, _TIMESTAMP_FMT),
+                                    os.path.join(self._directory, relpath, filename)))
+        entries.sort()
+        self._timestamps = [ts for ts, _ in entries]
+        self._paths = [path for _, path in entries]
+        self._dirty = False
+
+    def _load(self):
+        try:
+            with open(self._index_path) as f:
+                saved = json.load(f)
+        except (IOError, ValueError):
+            return {}
+        if saved.get('directory') != self._directory or saved.get('pattern') != self._pattern:
+            return {}
+        return saved['dirs']
+
+    def _save(self):
+        tmp_path = self._index_path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self._index_path), exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump({'directory': self._directory, 'pattern': self._pattern, 'dirs': self._dirs}, f)
+            os.replace(tmp_path, self._index_path)
+        except (IOError, OSError) as e:
+            logger.warning('[ARCHIVE] Could not save index to {}: {}'.format(self._index_path, e))
+
+
+# the index is refreshed at most once per refresh_interval; refresh() forces it
+class LocalArchiveSelection(object):
+    def __init__(self, directory, timestamp_func, plotter=None, pattern=None, opener=None, index_path=None,
+                 refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        if not os.path.isdir(directory):
+            raise ValueError("Not a directory: {}".format(directory))
+        self._index = ArchiveIndex(directory, timestamp_func, pattern, index_path)
+        self._refresh_interval = refresh_interval.total_seconds()
+        self._refreshed_at = None
+        self._default_action = functools.partial(local_plotter, plotter=plotter, opener=opener) \
+            if plotter is not None else _identity
+
+    @property
+    def index(self):
+        return self._index
+
+    def refresh(self):
+        self._index.refresh()
+        self._refreshed_at = time.monotonic()
+
+    def latest(self, within=None, action=None):
+        if action is None:
+            action = self._default_action
+        t1 = None
+        if within is not None:
+            t1 = pyhelpers.current_time_utc() - within
+        entries = self._entries(t1, None)
+        if not entries:
+            raise DatasetAccessException("No datasets found in archive: {}".format(self._index.directory))
+        return action(_localdataset(entries[-1][1]))
+
+    def around(self, when, within=None, action=None):
+        if action is None:
+            action = self._default_action
+        self._refresh_if_stale()
+        if within is None:
+            entry = self._index.nearest(when)
+        else:
+            entry = self._index.nearest(when, when - within, when + within)
+        if entry is None:
+            raise DatasetAccessException("No datasets found around: {} +/- {}".format(when, within))
+        return action(_localdataset(entry[1]))
+
+    def between(self, t1, t2, action=None, sort='asc'):
+        if t1 >= t2:
+            raise ValueError("t1 must be less than than t2")
+        if sort not in ('asc', 'desc'):
+            raise ValueError("Sort must be `asc` or `desc`")
+        if action is None:
+            action = self._default_action
+        return (action(ds) for _, ds in self._datasets_between(t1, t2, sort))
+
+    def since(self, when, action=None, sort='asc'):
+        return self.between(when, pyhelpers.current_time_utc(), action, sort)
+
+    def _datasets_between(self, t1, t2, sort):
+        entries = self._entries(t1, t2)
+        if sort == 'desc':
+            entries.reverse()
+        return ((ts, _localdataset(path)) for ts, path in entries)
+
+    def _entries(self, t1, t2):
+        self._refresh_if_stale()
+        return self._index.entries(t1, t2)
+
+    def _refresh_if_stale(self):
+        if self._refreshed_at is None or time.monotonic() - self._refreshed_at >= self._refresh_interval:
+            self.refresh()
+
+
+def _localdataset(path):
+    return localdataset(os.path.basename(path), path)
+
+
+def _identity(ds):
+    return ds
@@ -0,0 +1,239 @@
+import atexit
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import weakref
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+except ImportError:
+    # no advisory file locks (Windows); processes sharing a cache directory may download twice
+    fcntl = None
+
+import config
+from weatherpy import httpsession
+from weatherpy.internal import logger
+
+_CHUNK_SIZE = 1024 * 1024
+
+INDEX_FLUSH_INTERVAL = 30
+
+# downloads take one of a fixed set of lock files, picked by URL, so the lock directory doesn't grow
+_URL_LOCK_FILES = 64
+
+
+# blobs are stored by content digest, and evicted least recently used past max_bytes
+class DownloadCache(object):
+    def __init__(self, directory=None, max_bytes=5 * 1024 ** 3):
+        self._directory = directory or config.DOWNLOAD_CACHE_DIR
+        self._max_bytes = max_bytes
+        self._index_path = os.path.join(self._directory, 'index.json')
+        self._lock = threading.RLock()
+        self._url_locks = {}
+        os.makedirs(os.path.join(self._directory, 'blobs'), exist_ok=True)
+        os.makedirs(os.path.join(self._directory, 'locks'), exist_ok=True)
+        self._index = self._load_index()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        atexit.register(_flush_at_exit, weakref.ref(self))
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @property
+    def size(self):
+        with self._lock:
+            return sum(blob['size'] for blob in self._index['blobs'].values())
+
+    def __contains__(self, url):
+        with self._lock:
+            return self._cached_path(url) is not None
+
+    def fetch(self, url):
+        path = self._hit(url)
+        if path is not None:
+            return path
+
+        with self._url_lock(url), self._file_lock(_url_lock_name(url)):
+            # another thread or process may have fetched it while we waited
+            with self._lock:
+                self._merge_index(self._load_index())
+            path = self._hit(url)
+            if path is not None:
+                return path
+
+            digest, tmp_path, size = self._download(url)
+            with self._lock:
+                path = self._blob_path(digest, url)
+                if os.path.exists(path):
+                    os.remove(tmp_path)
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(tmp_path, path)
+                self._index['urls'][url] = digest
+                self._index['blobs'][digest] = {'size': size, 'path': os.path.relpath(path, self._directory),
+                                                'last_access': time.time()}
+                self._evict(keep=digest)
+                self._save_index()
+                return path
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty or not os.path.isdir(self._directory):
+                return
+            try:
+                self._save_index()
+            except (IOError, OSError) as e:
+                logger.warning('[CACHE] Could not save index to {}: {}'.format(self._index_path, e))
+
+    def clear(self):
+        with self._lock:
+            for digest in list(self._index['blobs']):
+                self._remove_blob(digest)
+            self._save_index(merge=False)
+
+    def _hit(self, url):
+        with self._lock:
+            path = self._cached_path(url)
+            if path is None:
+                return None
+            logger.info('[CACHE] Using cached file for: {}'.format(url))
+            self._touch(self._index['urls'][url])
+            self._dirty = True
+            if time.monotonic() - self._saved_at >= INDEX_FLUSH_INTERVAL:
+                self._save_index()
+            return path
+
+    @contextlib.contextmanager
+    def _url_lock(self, url):
+        with self._lock:
+            entry = self._url_locks.get(url)
+            if entry is None:
+                entry = self._url_locks[url] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._url_locks[url]
+
+    @contextlib.contextmanager
+    def _file_lock(self, name):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self._directory, 'locks', name + '.lock'), 'w') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _download(self, url):
+        logger.info('[CACHE] Downloading: {}'.format(url))
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self._directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                with httpsession.get_session().get(url, stream=True) as resp:
+                    resp.raise_for_status()
+                    for chunk in resp.iter_content(_CHUNK_SIZE):
+                        hasher.update(chunk)
+                        f.write(chunk)
+                        size += len(chunk)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        return hasher.hexdigest(), tmp_path, size
+
+    def _cached_path(self, url):
+        digest = self._index['urls'].get(url)
+        if digest is None or digest not in self._index['blobs']:
+            return None
+        path = os.path.join(self._directory, self._index['blobs'][digest]['path'])
+        if not os.path.exists(path):
+            # removed from under us; forget about it
+            self._index['blobs'].pop(digest)
+            return None
+        return path
+
+    def _blob_path(self, digest, url):
+        _, ext = os.path.splitext(urlparse(url).path)
+        return os.path.join(self._directory, 'blobs', digest[:2], digest + ext)
+
+    def _touch(self, digest):
+        self._index['blobs'][digest]['last_access'] = time.time()
+
+    def _evict(self, keep=None):
+        blobs = self._index['blobs']
+        total = sum(blob['size'] for blob in blobs.values())
+        for digest in sorted(blobs, key=lambda d: blobs[d]['last_access']):
+            if total <= self._max_bytes:
+                break
+            if digest == keep:
+                continue
+            total -= blobs[digest]['size']
+            logger.info('[CACHE] Evicting: {}'.format(digest))
+            self._remove_blob(digest)
+
+    def _remove_blob(self, digest):
+        blob = self._index['blobs'].pop(digest)
+        try:
+            os.remove(os.path.join(self._directory, blob['path']))
+        except FileNotFoundError:
+            pass
+        for url in [url for url, d in self._index['urls'].items() if d == digest]:
+            self._index['urls'].pop(url)
+
+    def _load_index(self):
+        try:
+            with open(self._index_path) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {'urls': {}, 'blobs': {}}
+
+    def _merge_index(self, saved):
+        # entries written by other processes sharing the directory; blobs they evicted are gone
+        # from disk, and are dropped by _cached_path the next time they're looked up
+        blobs = self._index['blobs']
+        for digest, blob in saved['blobs'].items():
+            if digest not in blobs:
+                if os.path.exists(os.path.join(self._directory, blob['path'])):
+                    blobs[digest] = blob
+            elif blob['last_access'] > blobs[digest]['last_access']:
+                blobs[digest]['last_access'] = blob['last_access']
+        for url, digest in saved['urls'].items():
+            if digest in blobs:
+                self._index['urls'].setdefault(url, digest)
+
+    def _save_index(self, merge=True):
+        with self._file_lock('index'):
+            if merge:
+                self._merge_index(self._load_index())
+            tmp_path = '{}.{}.tmp'.format(self._index_path, os.getpid())
+            with open(tmp_path, 'w') as f:
+                json.dump(self._index, f)
+            os.replace(tmp_path, self._index_path)
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+
+def _flush_at_exit(ref):
+    cache = ref()
+    if cache is not None:
+        cache.flush()
+
+
+def _url_lock_name(url):
+    digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    return 'url-{:02d}'.format(int(digest, 16) % _URL_LOCK_FILES)
@@ -0,0 +1,282 @@
+import re
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from siphon.http_util import session_manager
+from urllib3.util.retry import Retry
+
+from weatherpy.internal import logger, pyhelpers
+
+requestmetric = namedtuple('requestmetric', 'method url host status elapsed')
+
+cachedresponse = namedtuple('cachedresponse', 'url status headers content encoding stored_at')
+
+
+class RequestMetrics(object):
+    def __init__(self, maxlen=10000):
+        self._records = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def record(self, method, url, status, elapsed):
+        metric = requestmetric(method, url, urlparse(url).netloc, status, elapsed)
+        with self._lock:
+            self._records.append(metric)
+        logger.debug('[HTTP] {} {} -> {} in {:.3f}s'.format(method, url, status, elapsed))
+        return metric
+
+    @property
+    def records(self):
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def summary(self):
+        by_host = {}
+        for metric in self.records:
+            by_host.setdefault(metric.host, []).append(metric)
+
+        result = {}
+        for host, metrics in by_host.items():
+            elapsed = sorted(m.elapsed for m in metrics)
+            result[host] = {
+                'count': len(metrics),
+                'errors': sum(1 for m in metrics if m.status is None or m.status >= 400),
+                'mean': sum(elapsed) / len(elapsed),
+                'p95': elapsed[min(len(elapsed) - 1, int(0.95 * len(elapsed)))],
+                'max': elapsed[-1]
+            }
+        return result
+
+
+# seconds a catalog of the past is used before revalidating it, so that long-running processes
+# still pick up late files and corrections
+DEFAULT_PAST_TTL = 24 * 3600
+
+
+# past-day catalogs get past_ttl (None for forever), others current_ttl; expired ones are revalidated
+class CatalogCachePolicy(object):
+    def __init__(self, current_ttl=0, past_ttl=DEFAULT_PAST_TTL, settle=timedelta(hours=1)):
+        self.current_ttl = current_ttl
+        self.past_ttl = past_ttl
+        self.settle = settle
+
+    def ttl(self, url):
+        now = pyhelpers.current_time_utc()
+        parsed = urlparse(url)
+        time_end = parse_qs(parsed.query).get('time_end')
+        if time_end:
+            try:
+                end = datetime.strptime(time_end[0][:19], '%Y-%m-%dT%H:%M:%S')
+            except ValueError:
+                return self.current_ttl
+            return self.past_ttl if end < now - self.settle else self.current_ttl
+
+        match = re.search(r'/(\d{8})/', parsed.path)
+        if match:
+            try:
+                catalog_date = datetime.strptime(match.group(1), '%Y%m%d').date()
+            except ValueError:
+                return self.current_ttl
+            if catalog_date < now.date():
+                return self.past_ttl
+        return self.current_ttl
+
+
+class CatalogCache(object):
+    def __init__(self, policy=None, max_entries=512):
+        self.policy = policy or CatalogCachePolicy()
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def is_fresh(self, entry):
+        ttl = self.policy.ttl(entry.url)
+        return ttl is None or time.monotonic() - entry.stored_at < ttl
+
+    def store(self, resp):
+        entry = cachedresponse(resp.url, resp.status_code, CaseInsensitiveDict(resp.headers), resp.content,
+                               resp.encoding, time.monotonic())
+        self._put(entry)
+        return entry
+
+    def revalidated(self, entry, resp):
+        headers = CaseInsensitiveDict(entry.headers)
+        for name in ('ETag', 'Last-Modified'):
+            if name in resp.headers:
+                headers[name] = resp.headers[name]
+        refreshed = entry._replace(headers=headers, stored_at=time.monotonic())
+        self._put(refreshed)
+        return refreshed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def cacheable(request, resp, stream):
+        if stream or request.method != 'GET' or resp.status_code != 200:
+            return False
+        return 'xml' in resp.headers.get('Content-Type', '')
+
+    @staticmethod
+    def validators(entry):
+        headers = {}
+        if 'ETag' in entry.headers:
+            headers['If-None-Match'] = entry.headers['ETag']
+        if 'Last-Modified' in entry.headers:
+            headers['If-Modified-Since'] = entry.headers['Last-Modified']
+        return headers
+
+    @staticmethod
+    def response(request, entry):
+        resp = Response()
+        resp.status_code = entry.status
+        resp.headers = CaseInsensitiveDict(entry.headers)
+        resp._content = entry.content
+        resp.encoding = entry.encoding
+        resp.url = entry.url
+        resp.request = request
+        resp.reason = 'OK'
+        resp.from_cache = True
+        return resp
+
+    def _put(self, entry):
+        with self._lock:
+            self._entries[entry.url] = entry
+            self._entries.move_to_end(entry.url)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+
+class ThreddsHTTPAdapter(HTTPAdapter):
+    def __init__(self, timeout=(10, 60), retries=3, backoff_factor=0.5, per_host=4,
+                 pool_maxsize=10, metrics=None, catalog_cache=None):
+        retry = Retry(total=retries, backoff_factor=backoff_factor,
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset(['GET', 'HEAD']),
+                      raise_on_status=False)
+        super(ThreddsHTTPAdapter, self).__init__(pool_maxsize=pool_maxsize, max_retries=retry)
+        self._timeout = timeout
+        self._per_host = per_host
+        self._host_slots = {}
+        self._slots_lock = threading.Lock()
+        self.metrics = metrics if metrics is not None else RequestMetrics()
+        self.catalog_cache = catalog_cache
+
+    @property
+    def timeout(self):
+        return self._timeout
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self._timeout
+
+        cache = self.catalog_cache
+        entry = None
+        if cache is not None and request.method == 'GET' and not kwargs.get('stream'):
+            entry = cache.get(request.url)
+            if entry is not None:
+                if cache.is_fresh(entry):
+                    logger.debug('[HTTP] Using cached catalog: {}'.format(request.url))
+                    return cache.response(request, entry)
+                request.headers.update(cache.validators(entry))
+
+        status = None
+        start = time.perf_counter()
+        try:
+            with self._host_slot(urlparse(request.url).netloc):
+                resp = super(ThreddsHTTPAdapter, self).send(request, **kwargs)
+            status = resp.status_code
+        finally:
+            self.metrics.record(request.method, request.url, status, time.perf_counter() - start)
+
+        if cache is None:
+            return resp
+        if entry is not None and resp.status_code == 304:
+            resp.close()
+            return cache.response(request, cache.revalidated(entry, resp))
+        if cache.cacheable(request, resp, kwargs.get('stream')):
+            cache.store(resp)
+        return resp
+
+    @contextmanager
+    def _host_slot(self, host):
+        if self._per_host is None:
+            yield
+            return
+        with self._slots_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self._per_host)
+            slot = self._host_slots[host]
+        with slot:
+            yield
+
+
+_adapter = None
+_configure_lock = threading.RLock()
+
+
+def configure(timeout=(10, 60), retries=3, backoff_factor=0.5, per_host=4, pool_maxsize=10,
+              cache_catalogs=True, catalog_policy=None):
+    # changes siphon's session options for the whole process; ensure_configured() does it with the defaults
+    global _adapter
+    with _configure_lock:
+        metrics = _adapter.metrics if _adapter is not None else None
+        catalog_cache = None
+        if cache_catalogs:
+            previous = _adapter.catalog_cache if _adapter is not None else None
+            catalog_cache = previous if previous is not None else CatalogCache()
+            catalog_cache.policy = catalog_policy or CatalogCachePolicy()
+        adapter = ThreddsHTTPAdapter(timeout, retries, backoff_factor, per_host, pool_maxsize, metrics,
+                                     catalog_cache)
+
+        adapters = OrderedDict()
+        adapters['https://'] = adapter
+        adapters['http://'] = adapter
+        session_manager.set_session_options(adapters=adapters)
+
+        if _adapter is not None:
+            _adapter.close()
+        _adapter = adapter
+        return adapter
+
+
+def ensure_configured():
+    with _configure_lock:
+        if _adapter is None:
+            configure()
+    return _adapter
+
+
+def get_session():
+    ensure_configured()
+    return session_manager.create_session()
+
+
+def metrics():
+    return _adapter.metrics if _adapter is not None else None
+
+
+def catalog_cache():
+    return _adapter.catalog_cache if _adapter is not None else None
@@ -1,3 +1,4 @@
+from .arrays import ArrayVariable, ArrayDataset
 from .calcs import *
 from .pyhelpers import *
 
@@ -0,0 +1,109 @@
+from collections import OrderedDict
+
+import numpy as np
+
+
+# unpacks and masks like netCDF4, unless auto mask-and-scale is turned off
+class ArrayVariable(object):
+    def __init__(self, name, data, dimensions, attrs=None):
+        self.name = name
+        self._data = data
+        self.dimensions = tuple(dimensions)
+        self._attrs = OrderedDict(attrs or ())
+        self._maskandscale = True
+
+    @property
+    def shape(self):
+        return self._data.shape
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    @property
+    def ndim(self):
+        return self._data.ndim
+
+    def ncattrs(self):
+        return list(self._attrs.keys())
+
+    def getncattr(self, name):
+        return self._attrs[name]
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['_attrs'][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    @property
+    def mask(self):
+        return self._maskandscale
+
+    @property
+    def scale(self):
+        return self._maskandscale
+
+    def set_auto_maskandscale(self, value):
+        self._maskandscale = bool(value)
+
+    def __getitem__(self, item):
+        data = _orthogonal_index(self._data, item)
+        if not self._maskandscale or 'scale_factor' not in self._attrs:
+            # a view, not a copy, when backed by a memory map
+            return np.asarray(data)
+        mask = np.isin(data, self._attrs.get('missing_value', ()))
+        unpacked = data * np.float32(self._attrs['scale_factor']) + np.float32(self._attrs.get('add_offset', 0))
+        return np.ma.array(unpacked, mask=mask)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return '<{} {}{}>'.format(type(self).__name__, self.name, self.dimensions)
+
+
+class ArrayDataset(object):
+    def __init__(self, variables, dimensions, attrs=None):
+        self.variables = OrderedDict((var.name, var) for var in variables)
+        self.dimensions = OrderedDict(dimensions)
+        self._attrs = OrderedDict(attrs or ())
+
+    def ncattrs(self):
+        return list(self._attrs.keys())
+
+    def getncattr(self, name):
+        return self._attrs[name]
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['_attrs'][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return None
+
+
+def _orthogonal_index(data, item):
+    # netCDF4 indexes each dimension on its own when several are given as arrays; numpy pairs them up.
+    if not isinstance(item, tuple) or sum(np.ndim(index) > 0 for index in item) < 2:
+        return data[item]
+    data = data[tuple(slice(None) if np.ndim(index) > 0 else index for index in item)]
+    axis = 0
+    for index in item:
+        if np.ndim(index) > 0:
+            index = np.asarray(index)
+            if index.dtype == bool:
+                index = np.flatnonzero(index)
+            data = np.take(data, index, axis=axis)
+        if not isinstance(index, (int, np.integer)):
+            axis += 1
+    return data
@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 from weatherpy import units
 
 
@@ -28,20 +30,34 @@ def destination_point(lon, lat, distance, bearing, R_earth=6378.1,
 
 
 def haversine_distance(lon0, lat0, lon1, lat1, R_earth=6378.1):
-    lon0 = math.radians(lon0)
-    lat0 = math.radians(lat0)
-    lon1 = math.radians(lon1)
-    lat1 = math.radians(lat1)
+    # works on scalars as well as arrays of points
+    lon0 = np.radians(lon0)
+    lat0 = np.radians(lat0)
+    lon1 = np.radians(lon1)
+    lat1 = np.radians(lat1)
 
     dlon = lon1 - lon0
     dlat = lat1 - lat0
 
-    a = math.sin(dlat / 2) ** 2 + math.cos(lat0) * math.cos(lat1) * math.sin(dlon / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat0) * np.cos(lat1) * np.sin(dlon / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
 
     return R_earth * c
 
 
+def initial_bearing(lon0, lat0, lon1, lat1):
+    lon0 = np.radians(lon0)
+    lat0 = np.radians(lat0)
+    lon1 = np.radians(lon1)
+    lat1 = np.radians(lat1)
+
+    dlon = lon1 - lon0
+    x = np.sin(dlon) * np.cos(lat1)
+    y = np.cos(lat0) * np.sin(lat1) - np.sin(lat0) * np.cos(lat1) * np.cos(dlon)
+
+    return np.degrees(np.arctan2(x, y)) % 360
+
+
 def bbox_from_coord(coord_mat):
     lons = coord_mat[:,0]
     lats = coord_mat[:,1]
@@ -70,4 +86,12 @@ def mask_outside_extent(extent, target_crs, x, y, coordinate_crs=None):
 
     xmask = (x <= target_extnt.east) & (x >= target_extnt.west)
     ymask = (y <= target_extnt.north) & (y >= target_extnt.south)
-    return xmask, ymask, target_extnt
\ No newline at end of file
+    return xmask, ymask, target_extnt
+
+
+def mask_to_slice(mask):
+    # for masks over monotonic coordinates, where the points inside are contiguous
+    indices = np.flatnonzero(mask)
+    if not indices.size:
+        return None
+    return slice(int(indices[0]), int(indices[-1]) + 1)
@@ -16,6 +16,13 @@ class TestCalcs(TestCase):
         self.assertAlmostEqual(lat2, 41.3224612, delta=0.01)
         self.assertAlmostEqual(lon2, -73.2318226, delta=0.01)
 
+    def test_initial_bearing(self):
+        lon, lat = -73.984, 40.76
+        lon2, lat2 = calcs.destination_point(lon, lat, 88.8561, 45)
+
+        self.assertAlmostEqual(calcs.initial_bearing(lon, lat, lon2, lat2), 45, delta=0.01)
+        self.assertAlmostEqual(calcs.initial_bearing(lon, lat, lon, lat - 1), 180, delta=0.01)
+
     def test_bbox_from_coord(self):
         coord = np.asarray([[-1, -5], [2, 3], [5, 0]])
         x0, x1, y0, y1 = calcs.bbox_from_coord(coord)
@@ -37,4 +44,13 @@ class TestCalcs(TestCase):
     def test_relative_percentage(self):
         x = 50
         minval, maxval = 25, 100
-        self.assertAlmostEqual(relative_percentage(x, minval, maxval), 0.333, 3)
\ No newline at end of file
+        self.assertAlmostEqual(relative_percentage(x, minval, maxval), 0.333, 3)
+
+    def test_distance_and_bearing_of_arrays(self):
+        lons = np.array([-73.2318226, -73.984])
+        lats = np.array([41.3224612, 39.76])
+        distances = calcs.haversine_distance(-73.984, 40.76, lons, lats)
+        bearings = calcs.initial_bearing(-73.984, 40.76, lons, lats)
+        np.testing.assert_allclose(distances, [88.8561, calcs.haversine_distance(-73.984, 40.76, -73.984, 39.76)],
+                                   atol=0.5)
+        np.testing.assert_allclose(bearings, [45, 180], atol=0.01)
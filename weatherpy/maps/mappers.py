@@ -61,17 +61,24 @@ class MapperBase(object):
     def initialized(self):
         return self._ax is not None
 
-    def initialize_drawing(self, subplot=None, fig=None, reinit=False):
+    def initialize_drawing(self, subplot=None, fig=None, reinit=False, ax=None):
         if not reinit and self._ax is not None:
             warnings.warn('Plot is already initialized. Further calls to this method will have no effect.')
             return
 
-        if subplot is not None:
+        if ax is not None:
+            if getattr(ax, 'projection', None) != self.crs:
+                raise ValueError("Axes projection does not match the map projection")
+            self._ax = ax
+        elif subplot is not None:
             if fig is None:
                 fig = plt.gcf()
             self._ax = fig.add_subplot(subplot, projection=self.crs)
+        elif fig is not None:
+            self._ax = fig.add_subplot(111, projection=self.crs)
         else:
             self._ax = plt.axes(projection=self.crs)
+        self._extent_set = False
 
         if self._bg_color is not None:
             self._ax.background_patch.set_facecolor(self._bg_color)
@@ -1,5 +1,5 @@
 from unittest import TestCase
-from unittest.mock import patch, call
+from unittest.mock import patch, call, MagicMock
 
 import cartopy.crs as ccrs
 import matplotlib.pyplot as plt
@@ -71,6 +71,22 @@ class TestBaseMapper(TestCase):
         func_name, args, kwargs = mapper.ax.coastlines.mock_calls[0]
         self.assertEqual(kwargs['color'], 'red')
 
+    def test_should_initialize_drawing_with_existing_axes(self):
+        mapper = MapperBase(self.crs)
+        mapper.extent = self.extent
+        ax = MagicMock(projection=self.crs)
+
+        mapper.initialize_drawing(ax=ax)
+
+        self.assertIs(mapper.ax, ax)
+        self.ax.assert_not_called()
+        ax.set_extent.assert_called_with(mapper.extent)
+
+    def test_should_not_initialize_drawing_with_axes_of_different_projection(self):
+        mapper = MapperBase(self.crs)
+        with self.assertRaises(ValueError):
+            mapper.initialize_drawing(ax=MagicMock(projection=ccrs.Mercator()))
+
     def test_get_initialized_status(self):
         mapper = MapperBase(self.crs)
         self.assertFalse(mapper.initialized())
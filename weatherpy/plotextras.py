@@ -1,22 +1,35 @@
 import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from contextlib import contextmanager
 
+import matplotlib.cm as cm
 import matplotlib.path as mpath
 import matplotlib.pyplot as plt
 import matplotlib.patheffects as path_effects
 import numpy as np
+from matplotlib import rcParams
+from matplotlib.artist import setp
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.transforms import Bbox
 from mpl_toolkits.axes_grid1.inset_locator import inset_axes
+from PIL import Image
 
 from weatherpy import units
 from weatherpy.internal import destination_point, logger
 
 
 def plot_legend(colortable, **plot_kwargs):
-    sm = plt.cm.ScalarMappable(cmap=colortable.cmap, norm=colortable.norm)
+    sm = cm.ScalarMappable(cmap=colortable.cmap, norm=colortable.norm)
     # fake up the array of the scalar mappable. Um...
     sm._A = []
-    cbar = plt.colorbar(sm, **plot_kwargs)
-    return cbar
+    # colorbars on given axes go through their figure, which may not be managed by pyplot
+    axes = plot_kwargs.get('cax') or plot_kwargs.get('ax')
+    if hasattr(axes, 'figure'):
+        return axes.figure.colorbar(sm, **plot_kwargs)
+    return plt.colorbar(sm, **plot_kwargs)
 
 
 def plot_offright_inset(ax, colortable, width='3%', height='100%', title=None, color=None, **legend_kwargs):
@@ -33,7 +46,7 @@ def plot_offright_inset(ax, colortable, width='3%', height='100%', title=None, c
     if color is not None:
         cbar.outline.set_edgecolor(color)
         cbar.ax.xaxis.set_tick_params(color=color)
-        plt.setp(plt.getp(cbar.ax.axes, 'yticklabels'), color=color)
+        setp(cbar.ax.get_yticklabels(), color=color)
 
 
 def colorbar_inset(ax, colortable, loc=2, width='50%', height='3%', title=None,
@@ -64,8 +77,7 @@ def colorbar_inset(ax, colortable, loc=2, width='50%', height='3%', title=None,
         cbar.ax.minorticks_on()
 
     if label_size:
-        plt.setp(plt.getp(cbar.ax.axes, 'xticklabels'), color=color, size=label_size, y=1.0,
-                 path_effects=[_text_shadow])
+        setp(cbar.ax.get_xticklabels(), color=color, size=label_size, y=1.0, path_effects=[_text_shadow])
 
 
 _text_shadow = path_effects.withSimplePatchShadow(offset=(0.5, -0.5), alpha=0.6, shadow_rgbFace='black')
@@ -87,15 +99,159 @@ def ring_path(r_mi, ctr):
     return mpath.Path(ring)
 
 
-def save_image_no_border(fig, saveloc):
+class FixedLayout(object):
+    def __init__(self, pad_inches=-0.05):
+        self._pad_inches = pad_inches
+        self._bboxes = {}
+
+    def bbox_inches(self, fig, key=None):
+        # the tight bbox only depends on the layout, so it's computed once per layout key
+        if key is None:
+            key = FixedLayout._template_key(fig)
+        if key not in self._bboxes:
+            logger.info('[PLOT] Computing tight layout for figure template: {}'.format(key))
+            fig.canvas.draw()
+            tight = fig.get_tightbbox(fig.canvas.get_renderer())
+            self._bboxes[key] = Bbox(tight.get_points()).padded(self._pad_inches)
+        return self._bboxes[key]
+
+    def reset(self):
+        self._bboxes.clear()
+
+    @staticmethod
+    def _template_key(fig):
+        width, height = fig.get_size_inches()
+        axes = tuple((type(ax).__name__, ax.get_position(original=True).bounds, tuple(ax.get_xlim()),
+                      tuple(ax.get_ylim()), ax.get_title(), ax.get_xlabel(), ax.get_ylabel())
+                     for ax in fig.axes)
+        texts = tuple((tuple(text.get_position()), text.get_text()) for text in fig.texts)
+        return width, height, fig.dpi, axes, texts
+
+
+def save_image_no_border(fig, saveloc, layout=None, fmt=None, compress_level=None, **pil_kwargs):
     logger.info('[PLOT] Saving image to: {}'.format(saveloc))
     # commenting these out as they remove any inset axes
     # for ax in fig.get_axes():
     #     ax.set_frame_on(False)
     # plt.axis('off')
 
-    # pad inches < 0 as a hack to remove a bit of extra padding around images.
-    fig.savefig(saveloc, bbox_inches='tight', pad_inches=-0.05, transparent=False)
+    save_kwargs = dict(transparent=False)
+    if layout is None:
+        # pad inches < 0 as a hack to remove a bit of extra padding around images.
+        save_kwargs.update(bbox_inches='tight', pad_inches=-0.05)
+    else:
+        save_kwargs.update(bbox_inches=layout.bbox_inches(fig))
+
+    if fmt is not None:
+        save_kwargs['format'] = fmt
+    if compress_level is not None:
+        pil_kwargs['compress_level'] = compress_level
+    if pil_kwargs:
+        save_kwargs['pil_kwargs'] = pil_kwargs
+
+    fig.savefig(saveloc, **save_kwargs)
+
+
+def figure_rgba(fig, layout=None):
+    # figures without an Agg canvas are drawn on a temporary one, and get their own canvas back
+    original = fig.canvas
+    canvas = original if isinstance(original, FigureCanvasAgg) else FigureCanvasAgg(fig)
+    try:
+        canvas.draw()
+        rgba = np.asarray(canvas.buffer_rgba())
+
+        if layout is not None:
+            # crop the rendered canvas instead of re-rendering to the bbox like savefig does.
+            # Note: anything drawn outside of the figure itself is not part of the canvas.
+            height = rgba.shape[0]
+            (x0, y0), (x1, y1) = layout.bbox_inches(fig).get_points() * fig.dpi
+            rows = slice(max(int(round(height - y1)), 0), max(int(round(height - y0)), 0))
+            cols = slice(max(int(round(x0)), 0), max(int(round(x1)), 0))
+            rgba = rgba[rows, cols]
+
+        # the Agg buffer is reused by the next draw, so we must hold on to a copy.
+        return np.array(rgba, copy=True)
+    finally:
+        if canvas is not original:
+            fig.set_canvas(original)
+
+
+class BackgroundSaver(object):
+    def __init__(self, workers=2, max_pending=8, layout=None, compress_level=6):
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._layout = layout
+        self._compress_level = compress_level
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._errors = []
+        self._closed = False
+
+    def submit(self, fig, saveloc, fmt=None, **pil_kwargs):
+        if self._closed:
+            raise ValueError("Cannot save images with a closed saver")
+        logger.info('[PLOT] Queueing image save to: {}'.format(saveloc))
+
+        # The canvas is drawn and copied on the calling thread, so the figure is free
+        # to be cleared or closed (e.g. by figcontext) as soon as this returns.
+        rgba = figure_rgba(fig, self._layout)
+        pil_kwargs.setdefault('compress_level', self._compress_level)
+
+        # blocks when too many images are waiting to be written
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(BackgroundSaver._write, rgba, saveloc, fmt, pil_kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def flush(self):
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending)
+
+        with self._lock:
+            errors, self._errors = self._errors, []
+        if errors:
+            raise IOError("Failed to save {} image(s); first error: {}".format(len(errors), errors[0])) \
+                from errors[0]
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return None
+
+    def _on_done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+            if not future.cancelled() and future.exception() is not None:
+                self._errors.append(future.exception())
+        self._slots.release()
+
+    @staticmethod
+    def _write(rgba, saveloc, fmt, pil_kwargs):
+        img = Image.fromarray(rgba, 'RGBA')
+        if fmt is None and isinstance(saveloc, str):
+            fmt = Image.registered_extensions().get(os.path.splitext(saveloc)[1].lower())
+        if fmt is not None and fmt.lower() in ('jpg', 'jpeg'):
+            img = img.convert('RGB')
+        img.save(saveloc, format=fmt, **pil_kwargs)
+        logger.info('[PLOT] Saved image to: {}'.format(saveloc))
 
 
 @contextmanager
@@ -106,4 +262,66 @@ def figcontext(*args, **kwargs):
         yield fig
     finally:
         if fig is not None:
-            plt.close(fig)
\ No newline at end of file
+            plt.close(fig)
+
+
+class FigurePool(object):
+    def __init__(self, max_size=2):
+        self._max_size = max_size
+        self._free = {}
+        self._map_axes = {}
+
+    @contextmanager
+    def figure(self, figsize=None, dpi=None, **kwargs):
+        # Figures are built directly on an Agg canvas, so they never enter pyplot's
+        # global figure manager (and are not affected by plt.gcf/plt.close).
+        key = FigurePool._template_key(figsize, dpi, kwargs)
+        free = self._free.setdefault(key, [])
+        if free:
+            fig = free.pop()
+        else:
+            logger.info('[PLOT] Creating pooled figure: {}'.format(key))
+            fig = Figure(figsize=key[0], dpi=key[1], **kwargs)
+            FigureCanvasAgg(fig)
+        try:
+            yield fig
+        finally:
+            self._reset(fig)
+            if len(free) < self._max_size:
+                free.append(fig)
+            else:
+                self._map_axes.pop(id(fig), None)
+
+    def map_axes(self, fig, crs):
+        ax = self._map_axes.get(id(fig))
+        if ax is not None and ax.figure is fig and ax.projection == crs:
+            return ax
+        if ax is not None and ax.figure is fig:
+            fig.delaxes(ax)
+        ax = fig.add_subplot(111, projection=crs)
+        self._map_axes[id(fig)] = ax
+        return ax
+
+    def initialize(self, mapper, fig):
+        mapper.initialize_drawing(ax=self.map_axes(fig, mapper.crs), reinit=True)
+        return mapper
+
+    @staticmethod
+    def _template_key(figsize, dpi, kwargs):
+        # same figures however the size and dpi are given, including as the rc defaults
+        if figsize is None:
+            figsize = rcParams['figure.figsize']
+        if dpi is None:
+            dpi = rcParams['figure.dpi']
+        return tuple(float(size) for size in figsize), float(dpi), tuple(sorted(kwargs.items()))
+
+    def _reset(self, fig):
+        map_ax = self._map_axes.get(id(fig))
+        for ax in list(fig.axes):
+            if ax is map_ax:
+                ax.cla()
+            else:
+                fig.delaxes(ax)
+        for artists in (fig.texts, fig.images, fig.legends, fig.lines, fig.patches, fig.artists):
+            for artist in list(artists):
+                artist.remove()
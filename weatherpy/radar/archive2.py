@@ -0,0 +1,241 @@
+import bz2
+import math
+import struct
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import netCDF4
+import numpy as np
+
+from weatherpy.internal import logger, ArrayVariable, ArrayDataset
+
+# Reader for NEXRAD Level II (Archive II) files, decoding message 31 radials into the
+# same variables the THREDDS/CDM conversion of the files exposes.
+
+VOLUME_HEADER_SIZE = 24
+CTM_HEADER_SIZE = 12
+MESSAGE_HEADER_SIZE = 16
+LEGACY_MESSAGE_SIZE = 2432
+
+_MSG_HEADER = struct.Struct('>HBBHHIHH')
+_MSG31_HEADER = struct.Struct('>4sIHHfBBHBBBBfBBH')
+_VOLUME_BLOCK = struct.Struct('>4sHBBffhH')
+_MOMENT_BLOCK = struct.Struct('>4sIHhhhhBBff')
+
+_EPOCH = datetime(1970, 1, 1)
+_EARTH_RADIUS_KM = 6371.
+
+# moment block name -> (variable name, suffix used in the coordinate variable names, units)
+MOMENTS = OrderedDict([
+    ('REF', ('Reflectivity', 'R', 'dBz')),
+    ('VEL', ('RadialVelocity', 'V', 'm/s')),
+    ('SW ', ('SpectrumWidth', 'S', 'm/s')),
+    ('ZDR', ('DifferentialReflectivity', 'D', 'dB')),
+    ('PHI', ('DifferentialPhase', 'P', 'deg')),
+    ('RHO', ('CorrelationCoefficient', 'C', 'N/A')),
+])
+
+radial = namedtuple('radial', 'elevation_num azimuth elevation hires time moments')
+moment = namedtuple('moment', 'first_gate gate_spacing scale offset data')
+volumeinfo = namedtuple('volumeinfo', 'latitude longitude height')
+
+
+def is_archive2(path):
+    with open(path, 'rb') as f:
+        return f.read(4) == b'AR2V'
+
+
+def open_dataset(path, **kwargs):
+    if is_archive2(path):
+        return open_archive2(path, **kwargs)
+    return netCDF4.Dataset(path)
+
+
+def open_archive2(path, executor=None, workers=None):
+    # decoded in this process unless given an executor or workers; processes cost more than one volume
+    with open(path, 'rb') as f:
+        content = f.read()
+    if content[:4] != b'AR2V':
+        raise ValueError("Not an Archive II file: {}".format(path))
+
+    station = content[20:24].decode('ascii').strip()
+    records = _split_records(content)
+    logger.info('[ARCHIVE II] Decoding {} records of {}'.format(len(records), path))
+
+    if executor is not None:
+        decoded = list(executor.map(_decode_record, records))
+    elif not workers or len(records) <= 1:
+        decoded = [_decode_record(record) for record in records]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            decoded = list(pool.map(_decode_record, records))
+
+    radials = []
+    volume = None
+    for record_radials, record_volume in decoded:
+        radials.extend(record_radials)
+        volume = volume or record_volume
+    if not radials:
+        raise ValueError("No message 31 radials in: {}".format(path))
+    return _build_dataset(station, volume, radials)
+
+
+def _split_records(content):
+    records = []
+    pos = VOLUME_HEADER_SIZE
+    while pos + 4 <= len(content):
+        size = abs(struct.unpack_from('>i', content, pos)[0])
+        chunk = content[pos + 4:pos + 4 + size]
+        if not chunk.startswith(b'BZh'):
+            # not compressed: the rest of the file is plain messages
+            records.append(content[pos:])
+            break
+        records.append(chunk)
+        pos += 4 + size
+    return records
+
+
+def _decode_record(record):
+    if record.startswith(b'BZh'):
+        record = bz2.decompress(record)
+    radials = []
+    volume = None
+    pos = 0
+    while pos + CTM_HEADER_SIZE + MESSAGE_HEADER_SIZE <= len(record):
+        size, _, msg_type = _MSG_HEADER.unpack_from(record, pos + CTM_HEADER_SIZE)[:3]
+        if msg_type == 31:
+            start = pos + CTM_HEADER_SIZE + MESSAGE_HEADER_SIZE
+            decoded, msg_volume = _decode_message31(record, start)
+            radials.append(decoded)
+            volume = volume or msg_volume
+            pos += CTM_HEADER_SIZE + 2 * size
+        else:
+            # metadata and legacy messages come in fixed size frames
+            pos += LEGACY_MESSAGE_SIZE
+    return radials, volume
+
+
+def _decode_message31(buf, start):
+    (_, ms, julian_date, _, azimuth, _, _, _, azimuth_spacing, _, elevation_num, _,
+     elevation, _, _, block_count) = _MSG31_HEADER.unpack_from(buf, start)
+    pointers = struct.unpack_from('>{}I'.format(block_count), buf, start + _MSG31_HEADER.size)
+
+    volume = None
+    moments = {}
+    for pointer in pointers:
+        block_start = start + pointer
+        name = buf[block_start + 1:block_start + 4].decode('ascii')
+        if name == 'VOL':
+            _, _, _, _, lat, lon, height, feedhorn = _VOLUME_BLOCK.unpack_from(buf, block_start)
+            volume = volumeinfo(lat, lon, height + feedhorn)
+        elif name in MOMENTS:
+            (_, _, ngates, first_gate, spacing, _, _, _, word_size,
+             scale, offset) = _MOMENT_BLOCK.unpack_from(buf, block_start)
+            dtype = '>u2' if word_size == 16 else 'u1'
+            data = np.frombuffer(buf, dtype, ngates, block_start + _MOMENT_BLOCK.size)
+            moments[name] = moment(first_gate, spacing, scale, offset, data.astype(dtype[-2:]))
+
+    time_ms = (julian_date - 1) * 86400000 + ms
+    # super resolution (0.5 degree) radials go to the CDM's _HI variables
+    return radial(elevation_num, azimuth, elevation, azimuth_spacing == 1, time_ms, moments), volume
+
+
+def _build_dataset(station, volume, radials):
+    variables = []
+    dimensions = OrderedDict()
+    max_range_m = 0
+
+    for block_name, (varname, suffix, units) in MOMENTS.items():
+        for hires in (True, False):
+            sweeps = _sweeps_for(radials, block_name, hires)
+            if not sweeps:
+                continue
+            tag = '_HI' if hires else ''
+            scan_dim, radial_dim, gate_dim = ('scan' + suffix + tag, 'radial' + suffix + tag, 'gate' + suffix + tag)
+            made, max_range = _moment_variables(varname, suffix, tag, units, block_name, sweeps,
+                                                (scan_dim, radial_dim, gate_dim))
+            variables.extend(made)
+            max_range_m = max(max_range_m, max_range)
+            dimensions[scan_dim] = len(sweeps)
+            dimensions[radial_dim] = made[0].shape[1]
+            dimensions[gate_dim] = made[0].shape[2]
+
+    times = [r.time for r in radials]
+    attrs = OrderedDict([
+        ('Station', station),
+        ('StationLatitude', volume.latitude if volume else float('nan')),
+        ('StationLongitude', volume.longitude if volume else float('nan')),
+        ('StationElevationInMeters', float(volume.height) if volume else float('nan')),
+        ('time_coverage_start', _isoformat(min(times))),
+        ('time_coverage_end', _isoformat(max(times))),
+        ('format', 'ARCHIVE2'),
+    ])
+    if volume:
+        dlat = max_range_m / 1000. / _EARTH_RADIUS_KM * 180 / math.pi
+        dlon = dlat / math.cos(math.radians(volume.latitude))
+        attrs['geospatial_lat_min'] = volume.latitude - dlat
+        attrs['geospatial_lat_max'] = volume.latitude + dlat
+        attrs['geospatial_lon_min'] = volume.longitude - dlon
+        attrs['geospatial_lon_max'] = volume.longitude + dlon
+    return ArrayDataset(variables, dimensions, attrs)
+
+
+def _sweeps_for(radials, block_name, hires):
+    sweeps = OrderedDict()
+    for r in radials:
+        if block_name in r.moments and r.hires == hires:
+            sweeps.setdefault(r.elevation_num, []).append(r)
+    return [sweeps[num] for num in sorted(sweeps)]
+
+
+def _moment_variables(varname, suffix, tag, units, block_name, sweeps, dims):
+    nradials = max(len(sweep) for sweep in sweeps)
+    ngates = max(len(r.moments[block_name].data) for sweep in sweeps for r in sweep)
+    first = sweeps[0][0].moments[block_name]
+    dtype = first.data.dtype
+
+    data = np.zeros((len(sweeps), nradials, ngates), dtype=dtype)
+    azimuth = np.zeros((len(sweeps), nradials), dtype=np.float32)
+    elevation = np.zeros((len(sweeps), nradials), dtype=np.float32)
+    times = np.zeros((len(sweeps), nradials), dtype=np.int64)
+    num_radials = np.zeros(len(sweeps), dtype=np.int32)
+    num_gates = np.zeros(len(sweeps), dtype=np.int32)
+
+    for i, sweep in enumerate(sweeps):
+        num_radials[i] = len(sweep)
+        for j, r in enumerate(sweep):
+            values = r.moments[block_name].data
+            data[i, j, :len(values)] = values
+            azimuth[i, j] = r.azimuth
+            elevation[i, j] = r.elevation
+            times[i, j] = r.time
+            num_gates[i] = max(num_gates[i], len(values))
+        # pad short sweeps with zero-width radials so meshes stay well formed; their data is all missing
+        azimuth[i, len(sweep):] = azimuth[i, len(sweep) - 1]
+        elevation[i, len(sweep):] = elevation[i, len(sweep) - 1]
+        times[i, len(sweep):] = times[i, len(sweep) - 1]
+
+    distance = (first.first_gate + first.gate_spacing * np.arange(ngates)).astype(np.float32)
+    scan_dim, radial_dim, gate_dim = dims
+    variables = [
+        ArrayVariable(varname + tag, data, dims, [
+            ('units', units),
+            ('_Unsigned', 'true'),
+            ('scale_factor', np.float32(1. / first.scale)),
+            ('add_offset', np.float32(-first.offset / first.scale)),
+            ('missing_value', np.array([0, 1], dtype=dtype)),
+        ]),
+        ArrayVariable('azimuth' + suffix + tag, azimuth, (scan_dim, radial_dim), [('units', 'degrees')]),
+        ArrayVariable('elevation' + suffix + tag, elevation, (scan_dim, radial_dim), [('units', 'degrees')]),
+        ArrayVariable('distance' + suffix + tag, distance, (gate_dim,), [('units', 'm')]),
+        ArrayVariable('time' + suffix + tag, times, (scan_dim, radial_dim),
+                      [('units', 'msecs since 1970-01-01T00:00:00Z')]),
+        ArrayVariable('numRadials' + suffix + tag, num_radials, (scan_dim,)),
+        ArrayVariable('numGates' + suffix + tag, num_gates, (scan_dim,)),
+    ]
+    return variables, float(distance[-1])
+
+
+def _isoformat(time_ms):
+    return (_EPOCH + timedelta(milliseconds=int(time_ms))).strftime('%Y-%m-%dT%H:%M:%SZ')
@@ -0,0 +1,178 @@
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from weatherpy import units
+from weatherpy.internal import logger, haversine_distance, initial_bearing, destination_point
+from weatherpy.thredds import netcdf_lock
+
+timeseries = namedtuple('timeseries', 'times points values')
+
+
+def extract_points(selection, t1, t2, points, radartype='Reflectivity', hires=True, sweep=0,
+                   window=0, workers=4, action=None):
+    # points outside the radar's range are NaN
+    if action is None:
+        action = selection._default_action
+    extractor = PointExtractor(points, radartype, hires, sweep, window)
+    datasets = list(selection._datasets_between(t1, t2, 'asc'))
+
+    def extract_one(ds):
+        with netcdf_lock:
+            plotter = action(ds)
+        try:
+            return extractor.extract(plotter)
+        finally:
+            with netcdf_lock:
+                plotter.close()
+
+    logger.info('[EXTRACT] Sampling {} points from {} scans'.format(len(extractor.points), len(datasets)))
+    with ThreadPoolExecutor(workers) as pool:
+        values = list(pool.map(extract_one, (ds for _, ds in datasets)))
+
+    values = np.asarray(values, dtype=np.float32).reshape(len(datasets), len(extractor.points))
+    return timeseries(times=[ts for ts, _ in datasets], points=extractor.points, values=values)
+
+
+def extract_polyline(selection, t1, t2, line, spacing=1., dist_unit=units.KILOMETER, **kwargs):
+    return extract_points(selection, t1, t2, points_along(line, spacing, dist_unit), **kwargs)
+
+
+def points_along(line, spacing, dist_unit=units.KILOMETER):
+    spacing_km = units.KILOMETER.convert(spacing, dist_unit)
+    if spacing_km <= 0:
+        raise ValueError("Spacing must be positive")
+    if len(line) < 2:
+        raise ValueError("A polyline needs at least two points")
+
+    points = [tuple(line[0])]
+    for (lat0, lon0), (lat1, lon1) in zip(line[:-1], line[1:]):
+        length = haversine_distance(lon0, lat0, lon1, lat1)
+        bearing = initial_bearing(lon0, lat0, lon1, lat1)
+        # intermediate points only; a tolerance keeps rounding from duplicating the end vertex
+        nsteps = int(np.ceil(length / spacing_km - 1e-6))
+        for dist in spacing_km * np.arange(1, nsteps):
+            lon, lat = destination_point(lon0, lat0, dist, bearing)
+            points.append((lat, lon))
+        points.append((lat1, lon1))
+    return points
+
+
+class PointExtractor(object):
+    def __init__(self, points, radartype='Reflectivity', hires=True, sweep=0, window=0):
+        self._points = np.asarray(points, dtype=float).reshape(-1, 2)
+        self._radartype = radartype
+        self._hires = hires
+        self._sweep = sweep
+        self._window = window
+        self._polar = {}
+        self._gates = {}
+        self._lock = threading.Lock()
+
+    @property
+    def points(self):
+        return self._points
+
+    def extract(self, plotter):
+        with netcdf_lock:
+            plotter.set_radar(self._radartype, self._hires, self._sweep)
+            az = np.asarray(plotter.dataset.variables[plotter._getncvar('azimuth')][self._sweep])
+            distvar = plotter.dataset.variables[plotter._getncvar('distance')]
+            dist = np.asarray(distvar[:2])
+            ngates = distvar.shape[0]
+            dist_unit = units.get(getattr(distvar, 'units', 'm'))
+            station = plotter.station
+            stn_coordinates = plotter._stn_coordinates
+
+        bearings, ranges = self._polar_coords(station, stn_coordinates)
+        gates = self._gate_indices(station, dist, ngates, dist_unit, ranges)
+        radials = _nearest_radials(az, bearings)
+
+        values = np.full(len(self._points), np.nan, dtype=np.float32)
+        inside = np.flatnonzero(gates >= 0)
+        pieces = [_window_pieces(radials[i], gates[i], self._window, len(az), ngates) for i in inside]
+        boxes = [box for point_pieces in pieces for box in point_pieces]
+        blocks = {}
+        with netcdf_lock:
+            for group, members in _group_boxes(boxes):
+                r0, r1, g0, g1 = group
+                block = plotter._read_moment((self._sweep, slice(r0, r1), slice(g0, g1)))
+                for box in members:
+                    blocks[box] = block[box[0] - r0:box[1] - r0, box[2] - g0:box[3] - g0]
+
+        for i, point_pieces in zip(inside, pieces):
+            data = np.concatenate([blocks[box].ravel() for box in point_pieces])
+            valid = data[~np.isnan(data)]
+            if valid.size:
+                values[i] = valid.mean()
+        return values
+
+    def _polar_coords(self, station, stn_coordinates):
+        # bearing and range of each point from the radar; only depends on where the radar is.
+        with self._lock:
+            if station not in self._polar:
+                stn_lon, stn_lat = stn_coordinates
+                lats, lons = self._points[:, 0], self._points[:, 1]
+                bearings = initial_bearing(stn_lon, stn_lat, lons, lats)
+                ranges_km = haversine_distance(stn_lon, stn_lat, lons, lats)
+                self._polar[station] = bearings, ranges_km
+            return self._polar[station]
+
+    def _gate_indices(self, station, dist, ngates, dist_unit, ranges_km):
+        key = (station, ngates, float(dist[0]), float(dist[1] - dist[0]), dist_unit)
+        with self._lock:
+            if key not in self._gates:
+                first, spacing = dist[0], dist[1] - dist[0]
+                ranges = dist_unit.convert(ranges_km, units.KILOMETER)
+                # distance is at gate centers
+                gates = np.floor((ranges - first) / spacing + 0.5).astype(int)
+                gates[(gates < 0) | (gates >= ngates)] = -1
+                self._gates[key] = gates
+            return self._gates[key]
+
+
+def _nearest_radials(az, bearings):
+    order = np.argsort(az)
+    sorted_az = az[order]
+    right = np.searchsorted(sorted_az, bearings) % len(az)
+    left = (right - 1) % len(az)
+    right_diff = np.abs((sorted_az[right] - bearings + 180) % 360 - 180)
+    left_diff = np.abs((sorted_az[left] - bearings + 180) % 360 - 180)
+    return order[np.where(left_diff <= right_diff, left, right)]
+
+
+# a group of windows is read as one block as long as the block isn't much bigger than the windows
+_MAX_BLOCK_WASTE = 2.
+
+
+def _window_pieces(radial, gate, w, nradials, ngates):
+    # (r0, r1, g0, g1) boxes of the window around a gate; windows wrapping past radial 0 are split in two
+    g0, g1 = max(gate - w, 0), min(gate + w + 1, ngates)
+    if 2 * w + 1 >= nradials:
+        return [(0, nradials, g0, g1)]
+    r0 = (radial - w) % nradials
+    r1 = r0 + 2 * w + 1
+    if r1 <= nradials:
+        return [(int(r0), int(r1), g0, g1)]
+    return [(int(r0), nradials, g0, g1), (0, int(r1 - nradials), g0, g1)]
+
+
+def _group_boxes(boxes):
+    # greedily, in radial order; returns (bounding box, member boxes) pairs
+    groups = []
+    current, members, area = None, [], 0
+    for box in sorted(set(boxes)):
+        box_area = (box[1] - box[0]) * (box[3] - box[2])
+        if current is not None:
+            merged = (current[0], max(current[1], box[1]), min(current[2], box[2]), max(current[3], box[3]))
+            if (merged[1] - merged[0]) * (merged[3] - merged[2]) <= _MAX_BLOCK_WASTE * (area + box_area):
+                current, area = merged, area + box_area
+                members.append(box)
+                continue
+            groups.append((current, members))
+        current, members, area = box, [box], box_area
+    if current is not None:
+        groups.append((current, members))
+    return groups
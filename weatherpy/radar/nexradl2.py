@@ -1,3 +1,10 @@
+import functools
+import re
+import threading
+import time
+from collections import namedtuple, OrderedDict
+from datetime import datetime, timedelta
+
 import netCDF4 as nc
 import numpy as np
 import requests
@@ -6,9 +13,12 @@ from matplotlib import patches
 from siphon.radarserver import get_radarserver_datasets, RadarServer
 
 import config
-from weatherpy import maps, ctables, plotextras
+from weatherpy import maps, ctables, plotextras, units, httpsession
+from weatherpy.archive import LocalArchiveSelection
 from weatherpy.internal import pyhelpers, logger, bbox_from_coord
-from weatherpy.thredds import DatasetAccessException, dap_plotter, DatasetContextManager
+from weatherpy.radar import archive2, volumestore
+from weatherpy.thredds import DatasetAccessException, DatasetContextManager, LazyDataset, open_dap_dataset, \
+    netcdf_lock
 from weatherpy.units import Scale
 
 
@@ -16,7 +26,80 @@ def selectfor(station):
     return Nexrad2Selection(station)
 
 
-def get_radar_server(host, dataset):
+def selectmany(stations):
+    return Nexrad2MultiSelection(stations)
+
+
+def open_dataset(path):
+    if volumestore.is_volume(path):
+        return volumestore.open_volume(path)
+    return archive2.open_dataset(path)
+
+
+def archive(directory, pattern=None, **kwargs):
+    kwargs.setdefault('opener', open_dataset)
+    return LocalArchiveSelection(directory, timestamp_from_name, Nexrad2Plotter, pattern, **kwargs)
+
+
+# Radar servers found through the top-level catalog are shared by every selection in the process,
+# along with the station list they downloaded, and looked up again once they are this old.
+RADAR_SERVER_TTL = timedelta(hours=6)
+
+_cachedserver = namedtuple('_cachedserver', 'server loaded_at')
+_radar_servers = {}
+_radar_servers_lock = threading.Lock()
+
+
+def lazy_plotter(catalog_ds, cache=None, **kwargs):
+    dataset = LazyDataset(functools.partial(open_dap_dataset, catalog_ds, cache))
+    return Nexrad2Plotter(dataset, name=catalog_ds.name, **kwargs)
+
+
+def get_radar_server(host, dataset, refresh=False):
+    key = (host, dataset)
+    # held during discovery so concurrent selections wait for a single lookup
+    with _radar_servers_lock:
+        cached = _radar_servers.get(key)
+        if not refresh and cached is not None and \
+                time.monotonic() - cached.loaded_at < RADAR_SERVER_TTL.total_seconds():
+            return cached.server
+        server = _discover_radar_server(host, dataset)
+        _radar_servers[key] = _cachedserver(server, time.monotonic())
+        return server
+
+
+def clear_radar_servers():
+    with _radar_servers_lock:
+        _radar_servers.clear()
+
+
+def warm_up(host=None, dataset=None):
+    return get_radar_server(host or config.LEVEL_2_RADAR_CATALOG.host,
+                            dataset or config.LEVEL_2_RADAR_CATALOG.dataset, refresh=True)
+
+
+def validate_stations(stations, server=None):
+    if server is None:
+        server = _default_radar_server()
+    stations = list(stations)
+    known = getattr(server, 'stations', None)
+    if known is None:
+        invalid = [st for st in stations if not server.validate_query(server.query().stations(st))]
+    else:
+        invalid = [st for st in stations if st not in known]
+    if invalid:
+        raise DatasetAccessException("Invalid station{}: {}".format('s' if len(invalid) > 1 else '',
+                                                                    ', '.join(invalid)))
+    return stations
+
+
+def _default_radar_server():
+    return get_radar_server(config.LEVEL_2_RADAR_CATALOG.host, config.LEVEL_2_RADAR_CATALOG.dataset)
+
+
+def _discover_radar_server(host, dataset):
+    httpsession.ensure_configured()
+    logger.info('[RADAR SERVER] Looking up {} at {}'.format(dataset, host))
     full_datasets = get_radarserver_datasets(host)
     if dataset not in full_datasets:
         raise ValueError("Invalid dataset: {} for host: {}".format(dataset, host))
@@ -27,19 +110,17 @@ def get_radar_server(host, dataset):
 class Nexrad2Selection(object):
     @staticmethod
     def _default_action(ds):
-        return dap_plotter(ds, Nexrad2Plotter)
+        return lazy_plotter(ds)
 
     def __init__(self, station, server=None):
-        self._radarserver = server or get_radar_server(config.LEVEL_2_RADAR_CATALOG.host,
-                                                       config.LEVEL_2_RADAR_CATALOG.dataset)
+        httpsession.ensure_configured()
+        self._radarserver = server or _default_radar_server()
 
         self._q = self._init_query(station)
 
     def _init_query(self, st):
-        st_q = self._radarserver.query().stations(st)
-        if not self._radarserver.validate_query(st_q):
-            raise DatasetAccessException("Invalid station: {}".format(st))
-        return st_q
+        validate_stations([st], self._radarserver)
+        return self._radarserver.query().stations(st)
 
     def latest(self, action=None):
         if action is None:
@@ -78,19 +159,113 @@ class Nexrad2Selection(object):
     def since(self, when, action=None, sort='asc'):
         return self.between(when, pyhelpers.current_time_utc(), action, sort)
 
+    def _datasets_between(self, t1, t2, sort):
+        query = self._q.time_range(t1, t2)
+        return ((self._timestamp_from_dataset(ds_key), ds) for ds_key, ds in self._get_named_datasets(query, sort))
+
+    def _timestamp_from_dataset(self, dataset_name):
+        return timestamp_from_name(dataset_name)
+
     def _get_datasets(self, query, sort):
-        try:
-            catalog = self._radarserver.get_catalog(query)
-        except requests.exceptions.HTTPError:
-            # Catalog does not exist, thus datasets are empty
-            return ()
-        reverse = sort == 'desc'
-        dataset_keys = sorted(catalog.datasets.keys(), reverse=reverse)
-        return (catalog.datasets[ds_key] for ds_key in dataset_keys)
+        return (ds for _, ds in self._get_named_datasets(query, sort))
+
+    def _get_named_datasets(self, query, sort):
+        return _named_datasets(self._radarserver, query, sort)
+
+
+# one radar server query for all stations; stations without any scan are left out
+class Nexrad2MultiSelection(object):
+    _default_action = Nexrad2Selection._default_action
+
+    def __init__(self, stations, server=None):
+        httpsession.ensure_configured()
+        self._radarserver = server or _default_radar_server()
+        self._stations = tuple(validate_stations(stations, self._radarserver))
+        if not self._stations:
+            raise ValueError("At least one station is required")
+
+    @property
+    def stations(self):
+        return self._stations
+
+    def latest(self, action=None, within=None):
+        if action is None:
+            action = Nexrad2MultiSelection._default_action
+        if within is None:
+            query = self._query().all_times()
+        else:
+            now = pyhelpers.current_time_utc()
+            query = self._query().time_range(now - within, now)
+        grouped = self._grouped_datasets(query, 'desc')
+        if not grouped:
+            raise DatasetAccessException("No radar datasets found")
+        return OrderedDict((st, action(datasets[0][1])) for st, datasets in grouped.items())
+
+    def around(self, when, action=None):
+        if action is None:
+            action = Nexrad2MultiSelection._default_action
+        grouped = self._grouped_datasets(self._query().time(when), 'asc')
+        if not grouped:
+            raise DatasetAccessException("No dataset found around {}".format(when))
+        return OrderedDict((st, action(min(datasets, key=lambda item: abs(item[0] - when))[1]))
+                           for st, datasets in grouped.items())
+
+    def between(self, t1, t2, action=None, sort='asc'):
+        if action is None:
+            action = Nexrad2MultiSelection._default_action
+        return OrderedDict((st, (action(ds) for _, ds in datasets))
+                           for st, datasets in self._datasets_between(t1, t2, sort).items())
+
+    def since(self, when, action=None, sort='asc'):
+        return self.between(when, pyhelpers.current_time_utc(), action, sort)
+
+    def _datasets_between(self, t1, t2, sort):
+        if sort not in ('asc', 'desc'):
+            raise ValueError("Sort must be `asc` or `desc`")
+        if t1 >= t2:
+            raise ValueError("t1 must be less than t2")
+        return self._grouped_datasets(self._query().time_range(t1, t2), sort)
+
+    def _query(self):
+        return self._radarserver.query().stations(*self._stations)
+
+    def _grouped_datasets(self, query, sort):
+        # names sort by station first, then time; each group comes out in `sort` order.
+        grouped = {}
+        for ds_key, ds in _named_datasets(self._radarserver, query, sort):
+            grouped.setdefault(station_from_name(ds_key), []).append((timestamp_from_name(ds_key), ds))
+        return OrderedDict((st, grouped[st]) for st in self._stations if st in grouped)
+
+
+def _named_datasets(server, query, sort):
+    try:
+        catalog = server.get_catalog(query)
+    except requests.exceptions.HTTPError:
+        # Catalog does not exist, thus datasets are empty
+        return ()
+    reverse = sort == 'desc'
+    dataset_keys = sorted(catalog.datasets.keys(), reverse=reverse)
+    return ((ds_key, catalog.datasets[ds_key]) for ds_key in dataset_keys)
+
+
+def timestamp_from_name(dataset_name):
+    match = re.search(r'\d{8}_\d{4}', dataset_name)
+    if not match:
+        raise ValueError("Invalid dataset name: " + str(dataset_name))
+    return datetime.strptime(match.group(0), '%Y%m%d_%H%M')
+
+
+def station_from_name(dataset_name):
+    match = re.search(r'([A-Z0-9]{4})_\d{8}_\d{4}', dataset_name)
+    if not match:
+        raise ValueError("Invalid dataset name: " + str(dataset_name))
+    return match.group(1)
 
 
 DEFAULT_RANGE_MI = 143.
 
+radarsector = namedtuple('radarsector', 'azimuth distance x y data')
+
 
 class Nexrad2Plotter(DatasetContextManager):
     suffix_mapper = {radartype: radartype[0] for radartype in (
@@ -111,31 +286,21 @@ class Nexrad2Plotter(DatasetContextManager):
         'SpectrumWidth': None  # TODO: implement
     }
 
-    def __init__(self, dataset, radartype=None, hires=True, sweep=0):
+    def __init__(self, dataset, radartype=None, hires=True, sweep=0, max_range=None, name=None):
+        # nothing is read until needed; given a catalog name, station and timestamp come from it
         super(Nexrad2Plotter, self).__init__(dataset)
 
         # declare radar-specific attributes
         self._radartype = None
         self._hires = None
         self._sweep = None
-        self._radarvar = None
-        self._timestamp = None
-        self._radarunits = None
+        self._name = name
+        # values read from the dataset, filled in the first time they're used
+        self._loaded = {}
         self.set_radar(radartype, hires, sweep)
 
-        self._extent = (
-            self.dataset.geospatial_lon_min,
-            self.dataset.geospatial_lon_max,
-            self.dataset.geospatial_lat_min,
-            self.dataset.geospatial_lat_max
-        )
-
-        self._stn_coordinates = (
-            self.dataset.StationLongitude,
-            self.dataset.StationLatitude
-        )
-
         self._mesh = None
+        self.max_range = max_range
 
     @property
     def radartype(self):
@@ -151,11 +316,44 @@ class Nexrad2Plotter(DatasetContextManager):
 
     @property
     def station(self):
-        return self.dataset.Station
+        if self._name is not None:
+            return station_from_name(self._name)
+        return self._load('station', lambda: self.dataset.Station)
 
     @property
     def timestamp(self):
-        return self._timestamp
+        if self._name is not None:
+            return timestamp_from_name(self._name)
+        return self.sweep_time
+
+    @property
+    def sweep_time(self):
+        # time the sweep started, as recorded in the dataset
+        return self._load('sweep_time', self._read_sweep_time)
+
+    @property
+    def _radarvar(self):
+        return self._load('radarvar', lambda: self.dataset.variables[self._getncvar(self._radartype)])
+
+    @property
+    def _radarunits(self):
+        return self._load('radarunits', self._read_radarunits)
+
+    @property
+    def _extent(self):
+        return self._load('extent', lambda: (
+            self.dataset.geospatial_lon_min,
+            self.dataset.geospatial_lon_max,
+            self.dataset.geospatial_lat_min,
+            self.dataset.geospatial_lat_max
+        ))
+
+    @property
+    def _stn_coordinates(self):
+        return self._load('stn_coordinates', lambda: (
+            self.dataset.StationLongitude,
+            self.dataset.StationLatitude
+        ))
 
     def set_radar(self, radartype=None, hires=True, sweep=0):
         self._radartype = radartype or 'Reflectivity'
@@ -166,16 +364,28 @@ class Nexrad2Plotter(DatasetContextManager):
         # TODO: validation of hires
 
         self._sweep = sweep
-        self._radarvar = self.dataset.variables[self._getncvar(self._radartype)]
-
+        with netcdf_lock:
+            for key in ('radarvar', 'radarunits', 'sweep_time'):
+                self._loaded.pop(key, None)
+
+    def _load(self, key, loader):
+        # loading reads the dataset, which may happen on a worker thread
+        with netcdf_lock:
+            if key not in self._loaded:
+                self._loaded[key] = loader()
+            return self._loaded[key]
+
+    def _read_sweep_time(self):
         timevar = self.dataset.variables[self._getncvar('time')]
         raw_time = timevar[self._sweep]
         time_units = timevar.units.replace('msecs', 'milliseconds')
-        self._timestamp = nc.num2date(min(raw_time), time_units)
+        return nc.num2date(min(raw_time), time_units)
 
-        self._radarunits = self._radarvar.units
-        if self._radarunits is None or self._radarunits == 'N/A':
-            self._radarunits = Scale()
+    def _read_radarunits(self):
+        radarunits = self._radarvar.units
+        if radarunits is None or radarunits == 'N/A':
+            radarunits = Scale()
+        return radarunits
 
     def default_map(self):
         crs = maps.projections.lambertconformal(lon0=self._stn_coordinates[0], lat0=self._stn_coordinates[1])
@@ -187,7 +397,7 @@ class Nexrad2Plotter(DatasetContextManager):
     def default_ctable(self):
         return Nexrad2Plotter.ctable_mapper.get(self.radartype, None)
 
-    def make_plot(self, mapper=None, colortable=None):
+    def make_plot(self, mapper=None, colortable=None, out=None, max_range=None):
         if mapper is not None and isinstance(mapper.crs, ccrs.PlateCarree):
             raise ValueError("Radar images are not supported on the Plate Carree projection at this time.")
         if mapper is None:
@@ -197,8 +407,9 @@ class Nexrad2Plotter(DatasetContextManager):
         if not mapper.initialized():
             mapper.initialize_drawing()
 
-        x, y = self._calculate_xy()
-        radardata = self._data_for_sweep()
+        gates = self._gate_slice(max_range or self.max_range)
+        x, y = self._calculate_xy(gates)
+        radardata = self._data_for_sweep(out, gates)
 
         if self._radarunits != colortable.unit:
             colortable = colortable.convert(self._radarunits)
@@ -218,9 +429,48 @@ class Nexrad2Plotter(DatasetContextManager):
             mapper.extent = bbox_from_coord(ring.vertices)
         return mapper
 
-    def _calculate_xy(self):
+    def sector(self, az_range, rng_range, dist_unit=units.KILOMETER):
+        # the azimuth window wraps around north when start > end, e.g. (330, 30)
+        az_start, az_end = az_range
+        rng_min, rng_max = rng_range
+        if rng_min >= rng_max:
+            raise ValueError("Minimum range must be less than maximum range")
+
+        az = np.asarray(self.dataset.variables[self._getncvar('azimuth')][self._sweep])
+        radials = _radial_runs(az, az_start, az_end)
+        if not radials:
+            raise ValueError("No radials between azimuths {} and {}".format(az_start, az_end))
+
+        distvar = self.dataset.variables[self._getncvar('distance')]
+        dist_native = np.asarray(distvar[:])
+        native_unit = units.get(getattr(distvar, 'units', 'm'))
+        lo, hi = np.searchsorted(dist_native, [native_unit.convert(rng_min, dist_unit),
+                                               native_unit.convert(rng_max, dist_unit)])
+        if lo >= hi:
+            raise ValueError("No gates between ranges {} and {}".format(rng_min, rng_max))
+        gates = slice(lo, hi)
+
+        data = np.concatenate([self._read_moment((self._sweep, run, gates)) for run in radials])
+        az_sector = np.concatenate([az[run] for run in radials])
+        az_rad = np.deg2rad(az_sector)[:, None]
+        rng = dist_native[gates]
+        return radarsector(azimuth=az_sector, distance=dist_unit.convert(rng, native_unit),
+                           x=rng * np.sin(az_rad), y=rng * np.cos(az_rad), data=data)
+
+    def _gate_slice(self, max_range):
+        # max_range is in miles, like range_ring. Only gates out to it are read, plus the
+        # one straddling it so the mesh still reaches the ring.
+        if max_range is None:
+            return slice(None)
+        distvar = self.dataset.variables[self._getncvar('distance')]
+        dist_unit = units.get(getattr(distvar, 'units', 'm'))
+        limit = dist_unit.convert(max_range, units.MILE)
+        ngates = np.searchsorted(distvar[:], limit, side='right') + 1
+        return slice(0, min(ngates, distvar.shape[0]))
+
+    def _calculate_xy(self, gates=slice(None)):
         az = self.dataset.variables[self._getncvar('azimuth')][self._sweep]
-        rng = self.dataset.variables[self._getncvar('distance')][:]
+        rng = self.dataset.variables[self._getncvar('distance')][gates]
         az_rad = np.deg2rad(az)[:, None]
 
         # sin <-> x and cos <-> y since azimuth is measure from 0 deg == North.
@@ -228,20 +478,31 @@ class Nexrad2Plotter(DatasetContextManager):
         y = rng * np.cos(az_rad)
         return x, y
 
-    def _data_for_sweep(self):
+    def _data_for_sweep(self, out=None, gates=slice(None)):
         logger.info('[PROCESS LEVEL 2] Finish parsing radar information for '
                     'radar station: {}, timestamp: {}'.format(self.station, self.timestamp))
-
-        # If flag is there, the data needs to be converted to 8-bit unsigned integer
-        if '_Unsigned' in self._radarvar.ncattrs() and self._radarvar._Unsigned == 'true':
-            self._radarvar.set_auto_maskandscale(False)
-            data = self._radarvar[self._sweep]
-            data = data.view('uint8')
-            masked_data = np.ma.array(data, mask=data == 0)
-            return masked_data * self._radarvar.scale_factor + self._radarvar.add_offset
+        return self._read_moment((self._sweep, slice(None), gates), out)
+
+    def _read_moment(self, item, out=None):
+        # Packed unsigned gates are decoded to float32 in one pass through a lookup
+        # table, with no-data gates (raw 0) as NaN.
+        var = self._radarvar
+        unsigned = var.dtype.kind == 'u' or getattr(var, '_Unsigned', 'false') == 'true'
+        if 'scale_factor' in var.ncattrs() and unsigned:
+            data = _read_raw(var, item)
+            if data.dtype.kind == 'i':
+                # netCDF stores these as signed bytes/shorts
+                data = data.view(data.dtype.str.replace('i', 'u'))
+            lut = _decode_lut(data.dtype.str, float(self._radarvar.scale_factor),
+                              float(getattr(self._radarvar, 'add_offset', 0.)))
+            return np.take(lut, data, out=out)
         else:
-            data = self._radarvar[self._sweep]
-            return np.ma.array(data, mask=data == 0)
+            data = self._radarvar[item]
+            if out is None:
+                out = np.empty(data.shape, dtype=np.float32)
+            out[...] = np.ma.filled(data, 0)
+            out[out == 0] = np.nan
+            return out
 
     def _getncvar(self, prefix):
         if prefix in Nexrad2Plotter.suffix_mapper:
@@ -250,4 +511,45 @@ class Nexrad2Plotter(DatasetContextManager):
             varname = prefix + Nexrad2Plotter.suffix_mapper[self._radartype]
         if self._hires:
             varname += '_HI'
-        return varname
\ No newline at end of file
+        return varname
+
+
+def _radial_runs(az, az_start, az_end):
+    # Radials come in scan order, which is sorted by azimuth up to a rotation. The ones
+    # in the window are put in azimuth order starting at az_start and split into runs
+    # of consecutive indices, so each run is read with a single slice.
+    width = (az_end - az_start) % 360 or 360
+    offsets = (az - az_start) % 360
+    selected = np.flatnonzero(offsets < width)
+    selected = selected[np.argsort(offsets[selected], kind='stable')]
+
+    runs = []
+    start = 0
+    for i in range(1, len(selected) + 1):
+        if i == len(selected) or selected[i] != selected[i - 1] + 1:
+            runs.append(slice(int(selected[start]), int(selected[i - 1]) + 1))
+            start = i
+    return runs
+
+
+def _read_raw(var, item):
+    # reads packed values without leaving auto mask-and-scale switched off on a shared variable
+    scale, mask = getattr(var, 'scale', True), getattr(var, 'mask', True)
+    var.set_auto_maskandscale(False)
+    try:
+        return var[item]
+    finally:
+        if scale == mask:
+            var.set_auto_maskandscale(scale)
+        else:
+            var.set_auto_scale(scale)
+            var.set_auto_mask(mask)
+
+
+@functools.lru_cache(maxsize=32)
+def _decode_lut(dtype, scale_factor, add_offset):
+    raw = np.arange(np.iinfo(dtype).max + 1)
+    lut = (raw * scale_factor + add_offset).astype(np.float32)
+    lut[0] = np.nan
+    lut.setflags(write=False)
+    return lut
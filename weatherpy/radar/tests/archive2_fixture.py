@@ -0,0 +1,79 @@
+import bz2
+import struct
+from datetime import datetime
+
+import numpy as np
+
+# Writes small synthetic NEXRAD Archive II files for the decoder tests.
+
+STATION = 'KTLX'
+LATITUDE = 35.333
+LONGITUDE = -97.278
+REF_SCALE, REF_OFFSET = 2., 66.
+VEL_SCALE, VEL_OFFSET = 2., 129.
+
+
+def reflectivity_raw(sweep, radial, ngates):
+    return (np.arange(ngates) + 10 * radial + 50 * sweep) % 254 + 2
+
+
+def write_archive2(path, scan_time=datetime(2017, 6, 22, 0, 37, 19), sweeps=2, radials=8, ngates=20,
+                   radials_per_record=6, compress=True):
+    days = (scan_time - datetime(1970, 1, 1)).days + 1
+    ms = (scan_time - datetime(scan_time.year, scan_time.month, scan_time.day)).seconds * 1000
+
+    messages = []
+    for sweep in range(sweeps):
+        for r in range(radials):
+            azimuth = (r + 0.5) * 360. / radials
+            vel = np.full(ngates // 2, 140, dtype=np.uint8)
+            messages.append(_message31(days, ms + 1000 * (sweep * radials + r), azimuth, sweep + 1,
+                                       0.5 + sweep, reflectivity_raw(sweep, r, ngates).astype(np.uint8), vel))
+
+    records = [[_legacy_message(2)]]
+    for i in range(0, len(messages), radials_per_record):
+        records.append(messages[i:i + radials_per_record])
+
+    header = b'AR2V0006.001' + struct.pack('>II', days, ms) + STATION.encode('ascii')
+    with open(path, 'wb') as f:
+        f.write(header)
+        for record in records:
+            content = b''.join(record)
+            if compress:
+                # LDM records: a size word followed by the bzip2 block
+                content = bz2.compress(content)
+                f.write(struct.pack('>i', len(content)))
+            f.write(content)
+
+
+def _legacy_message(msg_type):
+    body = struct.pack('>HBBHHIHH', 1208, 0, msg_type, 0, 0, 0, 1, 1)
+    return bytes(12) + body + bytes(2432 - 12 - len(body))
+
+
+def _message31(days, ms, azimuth, elevation_num, elevation, ref, vel):
+    blocks = [_volume_block(), _moment_block('REF', ref, 2125, 250, REF_SCALE, REF_OFFSET),
+              _moment_block('VEL', vel, 2125, 250, VEL_SCALE, VEL_OFFSET)]
+    header_size = 32 + 4 * len(blocks)
+    pointers = []
+    offset = header_size
+    for block in blocks:
+        pointers.append(offset)
+        offset += len(block)
+
+    header = struct.pack('>4sIHHfBBHBBBBfBBH', STATION.encode('ascii'), ms, days, 1, azimuth, 0, 0, offset,
+                         1, 1, elevation_num, 0, elevation, 0, 0, len(blocks))
+    data = header + struct.pack('>{}I'.format(len(pointers)), *pointers) + b''.join(blocks)
+    msg_header = struct.pack('>HBBHHIHH', (16 + len(data)) // 2, 0, 31, 0, days, ms, 1, 1)
+    return bytes(12) + msg_header + data
+
+
+def _volume_block():
+    return struct.pack('>4sHBBffhHf', b'RVOL', 44, 1, 0, LATITUDE, LONGITUDE, 370, 20, 0.) + bytes(20)
+
+
+def _moment_block(name, raw, first_gate, spacing, scale, offset):
+    raw = np.asarray(raw, dtype=np.uint8)
+    block = struct.pack('>4sIHhhhhBBff', ('D' + name).encode('ascii'), 0, len(raw), first_gate, spacing,
+                        0, 0, 0, 8, scale, offset) + raw.tobytes()
+    return block + bytes(len(block) % 2)
@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+
+from weatherpy.radar import archive2
+from weatherpy.radar.nexradl2 import Nexrad2Plotter
+
+from archive2_fixture import write_archive2, reflectivity_raw, REF_SCALE, REF_OFFSET, LATITUDE, STATION
+
+
+class TestArchive2(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'KTLX20170622_003719_V06')
+        write_archive2(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_should_decode_reflectivity(self):
+        ds = archive2.open_archive2(self.path, workers=0)
+        var = ds.variables['Reflectivity_HI']
+
+        self.assertEqual(var.dimensions, ('scanR_HI', 'radialR_HI', 'gateR_HI'))
+        self.assertEqual(var.shape, (2, 8, 20))
+        self.assertEqual(var._Unsigned, 'true')
+
+        var.set_auto_maskandscale(False)
+        np.testing.assert_array_equal(var[1, 3], reflectivity_raw(1, 3, 20))
+
+        var.set_auto_maskandscale(True)
+        expected = (reflectivity_raw(1, 3, 20) - REF_OFFSET) / REF_SCALE
+        np.testing.assert_allclose(var[1, 3], expected, rtol=1e-6)
+
+    def test_should_decode_coordinates(self):
+        ds = archive2.open_archive2(self.path, workers=0)
+
+        np.testing.assert_allclose(ds.variables['azimuthR_HI'][0], (np.arange(8) + 0.5) * 45)
+        np.testing.assert_allclose(ds.variables['distanceR_HI'][:3], [2125, 2375, 2625])
+        self.assertEqual(ds.variables['distanceR_HI'].units, 'm')
+        self.assertEqual(ds.variables['RadialVelocity_HI'].shape, (2, 8, 10))
+
+        self.assertEqual(ds.Station, STATION)
+        self.assertAlmostEqual(ds.StationLatitude, LATITUDE, places=3)
+        self.assertLess(ds.geospatial_lat_min, LATITUDE)
+        self.assertEqual(ds.time_coverage_start, '2017-06-22T00:37:19Z')
+
+    def test_should_decode_in_process_pool(self):
+        with ProcessPoolExecutor(2) as pool:
+            pooled = archive2.open_archive2(self.path, executor=pool)
+        serial = archive2.open_archive2(self.path, workers=0)
+
+        for name, var in serial.variables.items():
+            var.set_auto_maskandscale(False)
+            pooled.variables[name].set_auto_maskandscale(False)
+            np.testing.assert_array_equal(pooled.variables[name][:], var[:])
+
+    def test_should_decode_in_this_process_by_default(self):
+        with patch('weatherpy.radar.archive2.ProcessPoolExecutor') as pool:
+            ds = archive2.open_archive2(self.path)
+        pool.assert_not_called()
+        self.assertEqual(ds.variables['Reflectivity_HI'].shape[0], 2)
+
+    def test_should_read_uncompressed_file(self):
+        path = os.path.join(self.tmpdir, 'uncompressed')
+        write_archive2(path, compress=False)
+        ds = archive2.open_archive2(path)
+        self.assertEqual(ds.variables['Reflectivity_HI'].shape, (2, 8, 20))
+
+    def test_should_reject_other_files(self):
+        path = os.path.join(self.tmpdir, 'not-radar')
+        with open(path, 'wb') as f:
+            f.write(b'CDF\x01')
+        self.assertFalse(archive2.is_archive2(path))
+        with self.assertRaises(ValueError):
+            archive2.open_archive2(path)
+
+    def test_should_work_with_plotter(self):
+        plotter = Nexrad2Plotter(archive2.open_dataset(self.path, workers=0))
+
+        self.assertEqual(plotter.station, STATION)
+        x, y = plotter._calculate_xy()
+        self.assertEqual(x.shape, (8, 20))
+        data = plotter._data_for_sweep()
+        self.assertEqual(data.shape, (8, 20))
+        self.assertAlmostEqual(float(data[0, 0]), (reflectivity_raw(0, 0, 20)[0] - REF_OFFSET) / REF_SCALE)
+        self.assertEqual(plotter.timestamp.strftime('%Y%m%d%H%M%S'),
+                         datetime(2017, 6, 22, 0, 37, 19).strftime('%Y%m%d%H%M%S'))
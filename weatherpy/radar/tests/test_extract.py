@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+
+from weatherpy.internal import destination_point
+from weatherpy.radar import extract, nexradl2
+
+from archive2_fixture import write_archive2, reflectivity_raw, REF_SCALE, REF_OFFSET, LATITUDE, LONGITUDE
+
+
+def _point(bearing, dist_km):
+    lon, lat = destination_point(LONGITUDE, LATITUDE, dist_km, bearing)
+    return lat, lon
+
+
+def _expected(radial, gate, sweep=0):
+    return (reflectivity_raw(sweep, radial, 20)[gate] - REF_OFFSET) / REF_SCALE
+
+
+class TestExtractPoints(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        archive_dir = os.path.join(self.tmpdir, 'archive')
+        os.makedirs(archive_dir)
+        for minute in (37, 42, 47):
+            write_archive2(os.path.join(archive_dir, 'KTLX20170622_00{}19_V06'.format(minute)),
+                           scan_time=datetime(2017, 6, 22, 0, minute, 19))
+        self.selection = nexradl2.archive(archive_dir, index_path=os.path.join(self.tmpdir, 'index.json'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_should_sample_points_for_each_scan(self):
+        # radials are centered on 22.5 + 45n degrees and gates on 2125 + 250n meters
+        points = [_point(67.5, 2.625), _point(340, 2.125), _point(180, 200.)]
+        ts = extract.extract_points(self.selection, datetime(2017, 6, 22, 0, 0), datetime(2017, 6, 22, 1, 0),
+                                    points, workers=2)
+
+        self.assertEqual(ts.times, [datetime(2017, 6, 22, 0, minute) for minute in (37, 42, 47)])
+        self.assertEqual(ts.values.shape, (3, 3))
+        self.assertEqual(ts.values.dtype, np.float32)
+        np.testing.assert_allclose(ts.values[:, 0], _expected(1, 2))
+        np.testing.assert_allclose(ts.values[:, 1], _expected(7, 0))
+        self.assertTrue(np.isnan(ts.values[:, 2]).all())
+
+    def test_should_average_windows(self):
+        ts = extract.extract_points(self.selection, datetime(2017, 6, 22, 0, 40), datetime(2017, 6, 22, 0, 45),
+                                    [_point(67.5, 2.625)], window=1)
+
+        expected = np.mean([_expected(r, g) for r in (0, 1, 2) for g in (1, 2, 3)])
+        self.assertAlmostEqual(float(ts.values[0, 0]), expected, places=4)
+
+    def test_should_sample_along_polyline(self):
+        line = [_point(67.5, 2.125), _point(67.5, 3.125)]
+        ts = extract.extract_polyline(self.selection, datetime(2017, 6, 22, 0, 40), datetime(2017, 6, 22, 0, 45),
+                                      line, spacing=0.25)
+
+        self.assertEqual(len(ts.points), 5)
+        np.testing.assert_allclose(ts.values[0], [_expected(1, g) for g in range(5)], rtol=1e-4)
+
+    def test_should_reuse_gate_indices_per_station(self):
+        extractor = extract.PointExtractor([_point(67.5, 2.625)])
+        for _, ds in self.selection._datasets_between(datetime(2017, 6, 22), datetime(2017, 6, 23), 'asc'):
+            with self.selection._default_action(ds) as plotter:
+                extractor.extract(plotter)
+        self.assertEqual(len(extractor._polar), 1)
+        self.assertEqual(len(extractor._gates), 1)
+
+    def test_should_read_every_point_in_one_read_per_scan(self):
+        # radial 0 and 7 windows wrap around north
+        points = [_point(22.5, 2.125), _point(337.5, 2.375), _point(157.5, 2.625), _point(180, 200.)]
+        extractor = extract.PointExtractor(points, window=1)
+        _, ds = next(iter(self.selection._datasets_between(datetime(2017, 6, 22), datetime(2017, 6, 23), 'asc')))
+        with self.selection._default_action(ds) as plotter:
+            with patch.object(plotter, '_read_moment', wraps=plotter._read_moment) as read:
+                values = extractor.extract(plotter)
+        self.assertEqual(read.call_count, 1)
+
+        expected = [np.mean([_expected(r, g) for r in radials for g in gates])
+                    for radials, gates in (((7, 0, 1), (0, 1)), ((6, 7, 0), (0, 1, 2)), ((2, 3, 4), (1, 2, 3)))]
+        np.testing.assert_allclose(values[:3], expected, rtol=1e-4)
+        self.assertTrue(np.isnan(values[3]))
+
+    def test_should_read_spread_out_points_in_small_blocks(self):
+        archive_dir = os.path.join(self.tmpdir, 'wide')
+        os.makedirs(archive_dir)
+        write_archive2(os.path.join(archive_dir, 'KTLX20170622_003719_V06'), radials=360, ngates=200)
+        selection = nexradl2.archive(archive_dir, index_path=os.path.join(self.tmpdir, 'wide.json'))
+
+        # radials are centered on 0.5 + n degrees and gates on 2125 + 250n meters
+        points = [_point(0.5, 2.125), _point(359.5, 2.375), _point(180.5, 39.625), _point(90.5, 51.875)]
+        extractor = extract.PointExtractor(points, window=1)
+        _, ds = next(iter(selection._datasets_between(datetime(2017, 6, 22), datetime(2017, 6, 23), 'asc')))
+        with selection._default_action(ds) as plotter:
+            with patch.object(plotter, '_read_moment', wraps=plotter._read_moment) as read:
+                values = extractor.extract(plotter)
+
+        cells = sum(call[0][0][1].stop - call[0][0][1].start for call in read.call_args_list)
+        self.assertLess(cells, 20)
+        read_gates = [call[0][0][2] for call in read.call_args_list]
+        self.assertTrue(all(gates.stop - gates.start <= 3 for gates in read_gates))
+
+        def expected(radials, gates):
+            return np.mean([(reflectivity_raw(0, r, 200)[g] - REF_OFFSET) / REF_SCALE for r in radials for g in gates])
+        np.testing.assert_allclose(values, [expected((359, 0, 1), (0, 1)), expected((358, 359, 0), (0, 1, 2)),
+                                            expected((179, 180, 181), (149, 150, 151)),
+                                            expected((89, 90, 91), (198, 199))], rtol=1e-4)
@@ -0,0 +1,227 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import netCDF4
+import numpy as np
+
+from weatherpy import units
+from weatherpy.radar.nexradl2 import Nexrad2Plotter, lazy_plotter
+from weatherpy.thredds import LazyDataset
+
+
+def _write_cdm_file(path, raw, azimuth=None, unsigned=True):
+    if azimuth is None:
+        azimuth = np.linspace(0, 359, raw.shape[1])
+    with netCDF4.Dataset(path, 'w') as ds:
+        ds.Station = 'KGLD'
+        ds.StationLatitude = 39.37
+        ds.StationLongitude = -101.7
+        ds.geospatial_lat_min, ds.geospatial_lat_max = 38., 40.
+        ds.geospatial_lon_min, ds.geospatial_lon_max = -103., -100.
+        ds.createDimension('scanR_HI', raw.shape[0])
+        ds.createDimension('radialR_HI', raw.shape[1])
+        ds.createDimension('gateR_HI', raw.shape[2])
+
+        ref = ds.createVariable('Reflectivity_HI', 'i1', ('scanR_HI', 'radialR_HI', 'gateR_HI'))
+        ref.units = 'dBz'
+        if unsigned:
+            ref._Unsigned = 'true'
+        ref.scale_factor = np.float32(0.5)
+        ref.add_offset = np.float32(-33.)
+        ref.set_auto_maskandscale(False)
+        ref[:] = raw.view('i1')
+
+        time = ds.createVariable('timeR_HI', 'i4', ('scanR_HI', 'radialR_HI'))
+        time.units = 'msecs since 1970-01-01T00:00:00Z'
+        time[:] = 1498091839000 % 2 ** 31
+        ds.createVariable('azimuthR_HI', 'f4', ('scanR_HI', 'radialR_HI'))[:] = azimuth
+        ds.createVariable('distanceR_HI', 'f4', ('gateR_HI',))[:] = 2125 + 250 * np.arange(raw.shape[2])
+
+
+class CdmFileTestCase(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.raw = (np.arange(2 * 4 * 6).reshape(2, 4, 6) * 11 % 256).astype(np.uint8)
+        path = os.path.join(self.tmpdir, 'Level2_KGLD_20170713_0200.nc')
+        _write_cdm_file(path, self.raw)
+        self.ds = netCDF4.Dataset(path)
+
+    def tearDown(self):
+        self.ds.close()
+        shutil.rmtree(self.tmpdir)
+
+
+class TestSweepDecode(CdmFileTestCase):
+    def test_should_decode_unsigned_gates_to_float32(self):
+        data = Nexrad2Plotter(self.ds, sweep=1)._data_for_sweep()
+
+        expected = self.raw[1] * 0.5 - 33.
+        self.assertEqual(data.dtype, np.float32)
+        np.testing.assert_array_equal(np.isnan(data), self.raw[1] == 0)
+        np.testing.assert_allclose(data[self.raw[1] != 0], expected[self.raw[1] != 0])
+
+    def test_should_not_leave_auto_maskandscale_off(self):
+        Nexrad2Plotter(self.ds)._data_for_sweep()
+        var = self.ds.variables['Reflectivity_HI']
+        self.assertTrue(var.scale)
+        self.assertTrue(var.mask)
+
+    def test_should_decode_into_buffer(self):
+        out = np.empty((4, 6), dtype=np.float32)
+        for sweep in (0, 1):
+            data = Nexrad2Plotter(self.ds, sweep=sweep)._data_for_sweep(out=out)
+            self.assertIs(data, out)
+            np.testing.assert_allclose(data[self.raw[sweep] != 0], self.raw[sweep][self.raw[sweep] != 0] * 0.5 - 33.)
+
+
+class TestSignedDecode(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.raw = np.array([[[0, 1, -1, 100, -100, 127]]], dtype=np.int8)
+        path = os.path.join(self.tmpdir, 'Level2_KGLD_20170713_0200.nc')
+        _write_cdm_file(path, self.raw.view(np.uint8), azimuth=np.array([0.]), unsigned=False)
+        self.ds = netCDF4.Dataset(path)
+
+    def tearDown(self):
+        self.ds.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_should_keep_sign_without_unsigned_flag(self):
+        data = Nexrad2Plotter(self.ds)._data_for_sweep()
+
+        expected = self.raw[0] * 0.5 - 33.
+        self.assertEqual(data.dtype, np.float32)
+        np.testing.assert_allclose(data, expected)
+
+
+class TestRangeLimitedReads(CdmFileTestCase):
+    def test_should_read_gates_out_to_max_range(self):
+        plotter = Nexrad2Plotter(self.ds, sweep=1)
+        # 1.5 mi ~ 2414 m: gates at 2125 and 2375 m, plus the one straddling the ring
+        gates = plotter._gate_slice(1.5)
+        self.assertEqual(gates, slice(0, 3))
+
+        x, y = plotter._calculate_xy(gates)
+        data = plotter._data_for_sweep(gates=gates)
+        self.assertEqual(x.shape, (4, 3))
+        self.assertEqual(data.shape, (4, 3))
+        np.testing.assert_array_equal(np.isnan(data), self.raw[1, :, :3] == 0)
+
+    def test_should_read_all_gates_without_max_range(self):
+        plotter = Nexrad2Plotter(self.ds)
+        self.assertEqual(plotter._data_for_sweep(gates=plotter._gate_slice(None)).shape, (4, 6))
+        self.assertEqual(plotter._gate_slice(500.), slice(0, 6))
+
+
+class TestSector(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        # scan starts at 135 deg, like a real sweep would at an arbitrary azimuth
+        self.azimuth = (135 + 45 * np.arange(8)) % 360
+        self.raw = (np.arange(8 * 10).reshape(1, 8, 10) % 250 + 2).astype(np.uint8)
+        path = os.path.join(self.tmpdir, 'Level2_KGLD_20170713_0200.nc')
+        _write_cdm_file(path, self.raw, self.azimuth)
+        self.ds = netCDF4.Dataset(path)
+
+    def tearDown(self):
+        self.ds.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_should_read_sector(self):
+        sector = Nexrad2Plotter(self.ds).sector((130, 230), (2.3, 3.))
+
+        np.testing.assert_array_equal(sector.azimuth, [135, 180, 225])
+        np.testing.assert_allclose(sector.distance, [2.375, 2.625, 2.875])
+        np.testing.assert_allclose(sector.data, self.raw[0, 0:3, 1:4] * 0.5 - 33.)
+        self.assertEqual(sector.x.shape, (3, 3))
+        np.testing.assert_allclose(sector.y[1], -sector.distance * 1000, atol=1e-6)
+
+    def test_should_read_sector_wrapping_around_north(self):
+        sector = Nexrad2Plotter(self.ds).sector((300, 50), (2., 3.))
+
+        np.testing.assert_array_equal(sector.azimuth, [315, 0, 45])
+        expected = self.raw[0, [4, 5, 6], 0:4] * 0.5 - 33.
+        np.testing.assert_allclose(sector.data, expected)
+
+    def test_should_convert_range_units(self):
+        sector = Nexrad2Plotter(self.ds).sector((0, 360), (2300., 2700.), dist_unit=units.METER)
+        self.assertEqual(len(sector.azimuth), 8)
+        np.testing.assert_allclose(sector.distance, [2375., 2625.])
+
+    def test_should_reject_empty_windows(self):
+        plotter = Nexrad2Plotter(self.ds)
+        with self.assertRaises(ValueError):
+            plotter.sector((10, 20), (2., 3.))
+        with self.assertRaises(ValueError):
+            plotter.sector((0, 90), (50., 60.))
+
+
+class TestLazyMetadata(CdmFileTestCase):
+    def setUp(self):
+        super(TestLazyMetadata, self).setUp()
+        self.opener = MagicMock(return_value=self.ds)
+
+    def test_should_not_open_dataset_for_name_metadata(self):
+        plotter = Nexrad2Plotter(LazyDataset(self.opener), name='Level2_KGLD_20170713_0200.ar2v')
+
+        self.assertEqual(plotter.station, 'KGLD')
+        plotter.set_radar('RadialVelocity', sweep=1)
+        self.opener.assert_not_called()
+
+    def test_should_not_open_dataset_for_timestamp_with_name(self):
+        plotter = Nexrad2Plotter(LazyDataset(self.opener), name='Level2_KGLD_20170713_0200.ar2v')
+        self.assertEqual(plotter.timestamp, datetime(2017, 7, 13, 2, 0))
+        self.opener.assert_not_called()
+
+    def test_should_read_sweep_time_with_name(self):
+        plotter = Nexrad2Plotter(LazyDataset(self.opener), name='Level2_KGLD_20170713_0200.ar2v')
+        expected = netCDF4.num2date(1498091839000 % 2 ** 31, 'milliseconds since 1970-01-01T00:00:00Z')
+        self.assertEqual(plotter.sweep_time, expected)
+        self.opener.assert_called_once_with()
+
+    def test_should_reopen_lazy_dataset_after_close(self):
+        path = self.ds.filepath()
+        opener = MagicMock(side_effect=lambda: netCDF4.Dataset(path))
+        dataset = LazyDataset(opener)
+        self.assertEqual(dataset.Station, 'KGLD')
+        dataset.close()
+        self.assertFalse(dataset.opened)
+
+        self.assertEqual(dataset.Station, 'KGLD')
+        self.assertEqual(opener.call_count, 2)
+        dataset.close()
+
+    def test_should_open_dataset_once_data_is_needed(self):
+        dataset = LazyDataset(self.opener)
+        plotter = Nexrad2Plotter(dataset, name='Level2_KGLD_20170713_0200.ar2v')
+        self.assertFalse(dataset.opened)
+
+        data = plotter._data_for_sweep()
+        self.assertEqual(data.shape, (4, 6))
+        self.assertEqual(plotter._stn_coordinates, (-101.7, 39.37))
+        self.opener.assert_called_once_with()
+
+    def test_should_read_timestamp_of_sweep_without_name(self):
+        plotter = Nexrad2Plotter(self.ds)
+        expected = netCDF4.num2date(1498091839000 % 2 ** 31, 'milliseconds since 1970-01-01T00:00:00Z')
+        self.assertEqual(plotter.timestamp, expected)
+        self.assertEqual(plotter.station, 'KGLD')
+
+    def test_should_reject_invalid_radar_type_without_reading(self):
+        with self.assertRaises(ValueError):
+            Nexrad2Plotter(LazyDataset(self.opener), radartype='Nonsense')
+        self.opener.assert_not_called()
+
+    def test_should_create_lazy_plotter_for_catalog_dataset(self):
+        catalog_ds = MagicMock(spec=['name', 'access_urls'])
+        catalog_ds.name = 'Level2_KGLD_20170713_0200.ar2v'
+        catalog_ds.access_urls = {'OPENDAP': 'http://example.com/nowhere'}
+
+        plotter = lazy_plotter(catalog_ds, sweep=1)
+        self.assertEqual(plotter.station, 'KGLD')
+        self.assertEqual(plotter.sweep, 1)
+        self.assertFalse(plotter.dataset.opened)
@@ -1,12 +1,13 @@
 from collections import OrderedDict
-from datetime import datetime
+from datetime import datetime, timedelta
 from unittest import TestCase
 from unittest.mock import MagicMock, patch, call
 
+import requests
 from siphon.catalog import Dataset
 from siphon.radarserver import RadarQuery, RadarServer
 
-from weatherpy.radar.nexradl2 import Nexrad2Selection
+from weatherpy.radar.nexradl2 import Nexrad2Selection, Nexrad2MultiSelection, station_from_name
 from weatherpy.thredds import DatasetAccessException
 
 
@@ -151,6 +152,24 @@ class TestNexrad2Selection(TestCase):
         self.dummy_radar_server.get_catalog.assert_called_with(self.q)
         self.action.assert_called_with(around_ds[ds_key])
 
+    def test_should_get_timestamped_datasets_between(self):
+        self.dummy_radar_server.get_catalog.return_value = dummy_catalog
+
+        t1 = datetime(2017, 7, 15, 23, 30)
+        t2 = datetime(2017, 7, 16, 0, 30)
+        items = list(self.selection._datasets_between(t1, t2, 'asc'))
+
+        self.assert_correct_query(spatial={'stn': ('KMUX',)},
+                                  temporal={'time_start': t1.isoformat(),
+                                            'time_end': t2.isoformat()})
+        self.assertEqual(items[0], (datetime(2017, 7, 15, 23, 33), dummy_datasets['Level2_KMUX_20170715_2333.ar2v']))
+        self.assertEqual(items[-1], (datetime(2017, 7, 16, 0, 13), dummy_datasets['Level2_KMUX_20170716_0013.ar2v']))
+
+    def test_should_raise_if_no_latest_radar_catalog(self):
+        self.dummy_radar_server.get_catalog.side_effect = requests.exceptions.HTTPError()
+        with self.assertRaises(DatasetAccessException):
+            self.selection.latest(self.action)
+
     def assert_correct_query(self, spatial, temporal):
         for k, v in self.q.spatial_query.items():
             self.assertIn(k, spatial)
@@ -159,3 +178,78 @@ class TestNexrad2Selection(TestCase):
         for k, v in self.q.time_query.items():
             self.assertIn(k, temporal)
             self.assertEqual(temporal[k], v)
+
+
+multi_ds_keys = (
+    'Level2_KMUX_20170715_2333.ar2v',
+    'Level2_KDAX_20170715_2336.ar2v',
+    'Level2_KMUX_20170716_0003.ar2v',
+    'Level2_KDAX_20170716_0001.ar2v',
+    'Level2_KMUX_20170715_2349.ar2v',
+)
+
+multi_catalog = MagicMock()
+multi_catalog.datasets = OrderedDict((ds_key, MagicMock(name=ds_key, spec=Dataset)) for ds_key in multi_ds_keys)
+
+
+class TestNexrad2MultiSelection(TestCase):
+    def setUp(self):
+        self.dummy_radar_server = MagicMock(spec=['stations', 'query', 'validate_query', 'get_catalog'])
+        self.dummy_radar_server.stations = {'KMUX': object(), 'KDAX': object(), 'KBBX': object()}
+        self.q = RadarQuery()
+        self.dummy_radar_server.query.return_value = self.q
+        self.dummy_radar_server.get_catalog.return_value = multi_catalog
+        self.selection = Nexrad2MultiSelection(['KMUX', 'KBBX', 'KDAX'], self.dummy_radar_server)
+        self.action = lambda ds: ds
+
+    def test_should_raise_on_invalid_stations(self):
+        with self.assertRaises(DatasetAccessException):
+            Nexrad2MultiSelection(['KMUX', 'XXXX'], self.dummy_radar_server)
+
+    def test_should_get_latest_of_each_station_in_one_query(self):
+        latest = self.selection.latest(self.action)
+
+        self.assertEqual(self.dummy_radar_server.get_catalog.call_count, 1)
+        self.assertEqual(self.q.spatial_query['stn'], ('KMUX', 'KBBX', 'KDAX'))
+        self.assertEqual(self.q.time_query, {'temporal': 'all'})
+        self.assertEqual(list(latest.keys()), ['KMUX', 'KDAX'])
+        self.assertIs(latest['KMUX'], multi_catalog.datasets['Level2_KMUX_20170716_0003.ar2v'])
+        self.assertIs(latest['KDAX'], multi_catalog.datasets['Level2_KDAX_20170716_0001.ar2v'])
+
+    def test_should_get_latest_within(self):
+        now = datetime(2017, 7, 16, 0, 30)
+        with patch('weatherpy.radar.nexradl2.pyhelpers.current_time_utc', return_value=now):
+            self.selection.latest(self.action, within=timedelta(hours=1))
+        self.assertEqual(self.q.time_query, {'time_start': datetime(2017, 7, 15, 23, 30).isoformat(),
+                                             'time_end': now.isoformat()})
+
+    def test_should_raise_if_no_latest_radar(self):
+        self.dummy_radar_server.get_catalog.return_value = empty_catalog
+        with self.assertRaises(DatasetAccessException):
+            self.selection.latest(self.action)
+
+    def test_should_get_nearest_of_each_station_around(self):
+        around = self.selection.around(datetime(2017, 7, 15, 23, 35), self.action)
+
+        self.assertIs(around['KMUX'], multi_catalog.datasets['Level2_KMUX_20170715_2333.ar2v'])
+        self.assertIs(around['KDAX'], multi_catalog.datasets['Level2_KDAX_20170715_2336.ar2v'])
+
+    def test_should_group_radars_between(self):
+        t1 = datetime(2017, 7, 15, 23, 30)
+        t2 = datetime(2017, 7, 16, 0, 30)
+        grouped = self.selection._datasets_between(t1, t2, 'desc')
+
+        self.assertEqual(self.dummy_radar_server.get_catalog.call_count, 1)
+        self.assertEqual(self.q.time_query, {'time_start': t1.isoformat(), 'time_end': t2.isoformat()})
+        self.assertEqual([ts for ts, _ in grouped['KMUX']],
+                         [datetime(2017, 7, 16, 0, 3), datetime(2017, 7, 15, 23, 49), datetime(2017, 7, 15, 23, 33)])
+        self.assertEqual(len(grouped['KDAX']), 2)
+        self.assertNotIn('KBBX', grouped)
+
+        between = self.selection.between(t1, t2, self.action)
+        self.assertEqual(len(list(between['KDAX'])), 2)
+
+    def test_should_get_station_from_name(self):
+        self.assertEqual(station_from_name('Level2_KMUX_20170715_2333.ar2v'), 'KMUX')
+        with self.assertRaises(ValueError):
+            station_from_name('not a radar file')
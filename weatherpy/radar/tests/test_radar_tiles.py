@@ -0,0 +1,51 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from weatherpy.internal import haversine_distance, initial_bearing
+from weatherpy.maps.extents import geobbox
+from weatherpy.radar import archive2
+from weatherpy.radar.nexradl2 import Nexrad2Plotter
+from weatherpy.tiles import TileRenderer, colorize, tile_lonlat, tiles_covering
+
+from archive2_fixture import write_archive2, LATITUDE, LONGITUDE
+
+
+class TestRadarTiles(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        path = os.path.join(self.tmpdir, 'KTLX20170622_003719_V06')
+        write_archive2(path, radials=72, ngates=30)
+        self.plotter = Nexrad2Plotter(archive2.open_archive2(path, workers=0))
+        self.renderer = TileRenderer(self.plotter)
+
+    def tearDown(self):
+        self.plotter.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_tile_pixels_are_nearest_gates(self):
+        # the tile with the radar in it; gates reach out to about 10 km, past its edges
+        (x, y), = tiles_covering(geobbox(LONGITUDE, LONGITUDE, LATITUDE, LATITUDE), 13)
+        rgba = self.renderer.render(13, x, y)
+        self.assertGreater(np.count_nonzero(rgba[..., 3]), 1000)
+        lon, lat = tile_lonlat(13, x, y)
+        data = self.plotter._data_for_sweep()
+        az = np.asarray(self.plotter.dataset.variables['azimuthR_HI'][0])
+
+        for row, col in ((0, 0), (60, 80), (128, 128), (200, 150), (255, 30)):
+            bearing = initial_bearing(LONGITUDE, LATITUDE, lon[row, col], lat[row, col])
+            distance = haversine_distance(LONGITUDE, LATITUDE, lon[row, col], lat[row, col]) * 1000
+            radial = np.abs((az - bearing + 180) % 360 - 180).argmin()
+            gate = int(np.floor((distance - 2125) / 250 + 0.5))
+            expected = data[radial, gate] if 0 <= gate < 30 else np.nan
+            np.testing.assert_array_equal(rgba[row, col], colorize(np.array([expected]),
+                                                                   self.renderer._colortable)[0])
+
+    def test_bounds_are_the_dataset_extent(self):
+        bounds = self.renderer.bounds()
+        self.assertLess(bounds.west, LONGITUDE)
+        self.assertGreater(bounds.north, LATITUDE)
+        self.assertEqual(self.renderer.product, 'KTLX_Reflectivity_HI_0')
@@ -0,0 +1,83 @@
+from datetime import timedelta
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from siphon.radarserver import RadarQuery
+
+from weatherpy.radar import nexradl2
+from weatherpy.radar.nexradl2 import Nexrad2Selection, get_radar_server, validate_stations, warm_up
+from weatherpy.thredds import DatasetAccessException
+
+
+def _dummy_server():
+    server = MagicMock(spec=['stations', 'query', 'validate_query', 'get_catalog'])
+    server.stations = {'KMUX': object(), 'KDAX': object(), 'KBBX': object()}
+    server.query.side_effect = RadarQuery
+    return server
+
+
+class TestRadarServerRegistry(TestCase):
+    def setUp(self):
+        nexradl2.clear_radar_servers()
+        self.discover = patch('weatherpy.radar.nexradl2._discover_radar_server',
+                              side_effect=lambda host, dataset: _dummy_server()).start()
+
+    def tearDown(self):
+        patch.stopall()
+        nexradl2.clear_radar_servers()
+
+    def test_should_share_server_between_selections(self):
+        sel1 = nexradl2.selectfor('KMUX')
+        sel2 = nexradl2.selectfor('KDAX')
+
+        self.assertIs(sel1._radarserver, sel2._radarserver)
+        self.assertEqual(self.discover.call_count, 1)
+
+    def test_should_cache_per_host_and_dataset(self):
+        server1 = get_radar_server('host1', 'dataset')
+        server2 = get_radar_server('host2', 'dataset')
+
+        self.assertIsNot(server1, server2)
+        self.assertIs(get_radar_server('host1', 'dataset'), server1)
+        self.assertEqual(self.discover.call_count, 2)
+
+    def test_should_look_up_again_after_ttl(self):
+        server = get_radar_server('host', 'dataset')
+        with patch('weatherpy.radar.nexradl2.RADAR_SERVER_TTL', timedelta(0)):
+            self.assertIsNot(get_radar_server('host', 'dataset'), server)
+        self.assertEqual(self.discover.call_count, 2)
+
+    def test_should_refresh_on_warm_up(self):
+        get_radar_server('host', 'dataset')
+        server = warm_up('host', 'dataset')
+
+        self.assertEqual(self.discover.call_count, 2)
+        self.assertIs(get_radar_server('host', 'dataset'), server)
+
+    def test_should_not_cache_failed_lookup(self):
+        self.discover.side_effect = ValueError('Invalid dataset')
+        with self.assertRaises(ValueError):
+            get_radar_server('host', 'dataset')
+
+        self.discover.side_effect = lambda host, dataset: _dummy_server()
+        self.assertIsNotNone(get_radar_server('host', 'dataset'))
+
+
+class TestValidateStations(TestCase):
+    def setUp(self):
+        self.server = _dummy_server()
+
+    def test_should_validate_against_station_list(self):
+        self.assertEqual(validate_stations(('KMUX', 'KBBX'), self.server), ['KMUX', 'KBBX'])
+        self.server.validate_query.assert_not_called()
+
+    def test_should_list_every_invalid_station(self):
+        with self.assertRaises(DatasetAccessException) as ctx:
+            validate_stations(['KMUX', 'XXXX', 'YYYY'], self.server)
+        self.assertIn('XXXX, YYYY', str(ctx.exception))
+
+    def test_should_validate_selection_station(self):
+        sel = Nexrad2Selection('KDAX', self.server)
+        self.assertEqual(sel._q.spatial_query['stn'], ('KDAX',))
+        with self.assertRaises(DatasetAccessException):
+            Nexrad2Selection('XXXX', self.server)
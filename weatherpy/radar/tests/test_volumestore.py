@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from weatherpy.radar import archive2, volumestore
+from weatherpy.radar.nexradl2 import Nexrad2Plotter, open_dataset
+
+from archive2_fixture import write_archive2, STATION
+
+
+class TestVolumeStore(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        path = os.path.join(self.tmpdir, 'KTLX20170622_003719_V06')
+        write_archive2(path)
+        self.source = archive2.open_archive2(path, workers=0)
+        self.store = os.path.join(self.tmpdir, 'store', 'KTLX20170622_003719')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_should_round_trip_variables(self):
+        volumestore.save_volume(self.source, self.store)
+        self.assertTrue(volumestore.is_volume(self.store))
+        ds = volumestore.open_volume(self.store)
+
+        self.assertEqual(ds.Station, STATION)
+        self.assertEqual(dict(ds.dimensions), dict(self.source.dimensions))
+        for name, var in self.source.variables.items():
+            stored = ds.variables[name]
+            self.assertEqual(stored.dimensions, var.dimensions)
+            self.assertEqual(stored.ncattrs(), var.ncattrs())
+            np.testing.assert_array_equal(stored[:], var[:])
+
+    def test_should_keep_packed_dtypes(self):
+        volumestore.save_volume(self.source, self.store, variables=['Reflectivity_HI', 'azimuthR_HI'])
+        ds = volumestore.open_volume(self.store)
+
+        self.assertEqual(list(ds.variables), ['Reflectivity_HI', 'azimuthR_HI'])
+        self.assertEqual(ds.variables['Reflectivity_HI'].dtype, np.uint8)
+        self.assertEqual(ds.variables['Reflectivity_HI'].scale_factor.dtype, np.float32)
+
+    def test_should_slice_sweeps_without_copying(self):
+        volumestore.save_volume(self.source, self.store)
+        var = volumestore.open_volume(self.store).variables['Reflectivity_HI']
+        var.set_auto_maskandscale(False)
+
+        sweep = var[1]
+        self.assertFalse(sweep.flags.owndata)
+        self.assertFalse(sweep.flags.writeable)
+
+    def test_should_work_with_plotter(self):
+        volumestore.save_volume(self.source, self.store)
+        from_store = Nexrad2Plotter(open_dataset(self.store), sweep=1)
+        from_source = Nexrad2Plotter(self.source, sweep=1)
+
+        np.testing.assert_array_equal(from_store._data_for_sweep(), from_source._data_for_sweep())
+        self.assertEqual(from_store.timestamp, from_source.timestamp)
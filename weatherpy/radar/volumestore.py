@@ -0,0 +1,94 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from weatherpy.internal import logger, ArrayVariable, ArrayDataset
+
+# On-disk store of decoded radar volumes: one .npy file per variable holding the raw (packed)
+# values, plus a meta.json with dimensions and attributes. Variables are opened memory-mapped,
+# so slicing out a sweep only touches the pages for that sweep.
+
+META_FILENAME = 'meta.json'
+FORMAT_VERSION = 1
+
+
+def is_volume(path):
+    return os.path.isfile(os.path.join(path, META_FILENAME))
+
+
+def save_volume(dataset, directory, variables=None):
+    names = list(dataset.variables) if variables is None else list(variables)
+    tmp_dir = directory.rstrip(os.sep) + '.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+
+    meta = {
+        'version': FORMAT_VERSION,
+        'attrs': {attr: _jsonable(dataset.getncattr(attr)) for attr in dataset.ncattrs()},
+        'dimensions': {},
+        'variables': {}
+    }
+    for name in names:
+        var = dataset.variables[name]
+        data = _raw_values(var)
+        np.save(os.path.join(tmp_dir, name + '.npy'), data)
+        for dim, size in zip(var.dimensions, data.shape):
+            meta['dimensions'][dim] = size
+        meta['variables'][name] = {
+            'dimensions': list(var.dimensions),
+            'attrs': [[attr, _jsonable(var.getncattr(attr))] for attr in var.ncattrs()]
+        }
+
+    with open(os.path.join(tmp_dir, META_FILENAME), 'w') as f:
+        json.dump(meta, f)
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+    os.replace(tmp_dir, directory)
+    logger.info('[VOLUME STORE] Saved {} variables to {}'.format(len(names), directory))
+    return directory
+
+
+def open_volume(directory):
+    with open(os.path.join(directory, META_FILENAME)) as f:
+        meta = json.load(f)
+    if meta.get('version') != FORMAT_VERSION:
+        raise ValueError("Unsupported volume store version: {}".format(meta.get('version')))
+
+    variables = []
+    for name, info in meta['variables'].items():
+        data = np.load(os.path.join(directory, name + '.npy'), mmap_mode='r')
+        attrs = [(attr, _from_json(value)) for attr, value in info['attrs']]
+        variables.append(ArrayVariable(name, data, info['dimensions'], attrs))
+    return ArrayDataset(variables, meta['dimensions'], meta['attrs'])
+
+
+def _raw_values(var):
+    var.set_auto_maskandscale(False)
+    try:
+        data = np.asarray(var[:])
+    finally:
+        var.set_auto_maskandscale(True)
+    if 'scale_factor' in var.ncattrs() and getattr(var, '_Unsigned', 'false') == 'true' \
+            and data.dtype.kind == 'i':
+        # netCDF stores these as signed bytes/shorts
+        data = data.view(data.dtype.str.replace('i', 'u'))
+    return np.ascontiguousarray(data)
+
+
+def _jsonable(value):
+    if isinstance(value, np.ndarray):
+        return {'array': value.tolist(), 'dtype': value.dtype.str}
+    if isinstance(value, np.generic):
+        return {'scalar': value.item(), 'dtype': value.dtype.str}
+    return value
+
+
+def _from_json(value):
+    if isinstance(value, dict) and 'array' in value:
+        return np.array(value['array'], dtype=value['dtype'])
+    if isinstance(value, dict) and 'scalar' in value:
+        return np.dtype(value['dtype']).type(value['scalar'])
+    return value
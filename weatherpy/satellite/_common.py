@@ -1,31 +1,44 @@
+import re
 from collections import namedtuple
-from datetime import timedelta
+from datetime import datetime, time, timedelta
 
+import numpy as np
 import requests
 
+from weatherpy import httpsession
 from weatherpy.internal import pyhelpers
 from weatherpy.thredds import DatasetAccessException
 
 
+# late scans keep showing up in a day's catalog for a while after midnight
+CATALOG_SETTLE = timedelta(hours=1)
+
+
 class ThreddsSatelliteSelection(object):
+    def __init__(self):
+        httpsession.ensure_configured()
+        # date -> (catalogindex, when its catalog was fetched)
+        self._catalog_indexes = {}
 
-    def _latest_impl(self, within, action):
+    def _latest_impl(self, within, action, k=None):
+        _check_k(k)
         right_now = pyhelpers.current_time_utc()
-        datasets = self._datasets_between(right_now - within, right_now, 'desc')
-
-        try:
-            _, ds = next(datasets)
-        except StopIteration:
+        times, datasets = self._window(right_now - within, right_now)
+        if not len(times):
             raise DatasetAccessException("No datasets found within {} of right now.".format(within))
-        return action(ds)
-
-    def _around_impl(self, when, within, action):
-        dataset_by_deltas = {abs((ts - when).total_seconds()): ds for ts, ds in
-                             self._datasets_between(when - within, when + within, 'desc')}
-        if not dataset_by_deltas:
+        positions = list(range(len(times) - 1, max(len(times) - (k or 1), 0) - 1, -1))
+        return _pick(datasets, positions, action, k)
+
+    def _around_impl(self, when, within, action, k=None, method='nearest'):
+        # binary search over the catalog index; ties go to the earlier scan
+        _check_k(k)
+        if method not in AROUND_METHODS:
+            raise ValueError("Method must be one of {}".format(AROUND_METHODS))
+        times, datasets = self._window(when - within, when + within)
+        positions = _nearest_positions(times, np.datetime64(when), method, k or 1)
+        if not positions:
             raise DatasetAccessException("No datasets found around: {} +/- {}".format(when, within))
-        smallest_delta = min(dataset_by_deltas.keys())
-        return action(dataset_by_deltas[smallest_delta])
+        return _pick(datasets, positions, action, k)
 
     def _between_impl(self, t1, t2, action, sort):
         if t1 >= t2:
@@ -44,29 +57,61 @@ class ThreddsSatelliteSelection(object):
         if sort == 'asc':
             date_on = date1
             while date_on <= date2:
-                for ts, ds in self._datasets_on(date_on, sort):
-                    if t1 <= ts < t2:
-                        yield ts, ds
+                for ts, ds in self._datasets_on(date_on, sort, t1, t2):
+                    yield ts, ds
                 date_on += timedelta(days=1)
         elif sort == 'desc':
             date_on = date2
             while date_on >= date1:
-                for ts, ds in self._datasets_on(date_on, sort):
-                    if t1 <= ts < t2:
-                        yield ts, ds
+                for ts, ds in self._datasets_on(date_on, sort, t1, t2):
+                    yield ts, ds
                 date_on -= timedelta(days=1)
         else:
             raise ValueError("Sort must be `asc` or `desc`")
 
-    def _datasets_on(self, query_date, sort):
+    def _datasets_on(self, query_date, sort, t1=None, t2=None):
+        index = self._catalog_index(query_date)
+        lo, hi = _index_range(index, t1, t2)
+        positions = range(lo, hi) if sort == 'asc' else range(hi - 1, lo - 1, -1)
+        return ((index.times[i].item(), index.datasets[i]) for i in positions)
+
+    def _window(self, t1, t2):
+        # timestamps and datasets in [t1, t2), from slices of the index of each date
+        times = []
+        datasets = []
+        date_on = t1.date()
+        while date_on <= t2.date():
+            index = self._catalog_index(date_on)
+            lo, hi = _index_range(index, t1, t2)
+            times.append(index.times[lo:hi])
+            datasets.extend(index.datasets[lo:hi])
+            date_on += timedelta(days=1)
+        return np.concatenate(times), datasets
+
+    def _catalog_index(self, query_date):
+        # Catalogs of days that had settled when they were fetched don't change, so they are fetched
+        # and parsed once. Other catalogs are fetched again on every query, but only parsed again
+        # when their listing has changed.
+        index, fetched_at = self._catalog_indexes.get(query_date, (None, None))
+        day_end = datetime.combine(query_date + timedelta(days=1), time())
+        if index is not None and fetched_at >= day_end + CATALOG_SETTLE:
+            return index
+
+        fetched_at = pyhelpers.current_time_utc()
         try:
             catalog = self._get_catalog(query_date)
         except requests.exceptions.HTTPError:
             # Catalog does not exist, thus datasets are empty
-            return ()
-        reverse = sort == 'desc'
-        dataset_keys = sorted(catalog.datasets.keys(), reverse=reverse)
-        return ((self._timestamp_from_dataset(ds_key), catalog.datasets[ds_key]) for ds_key in dataset_keys)
+            return catalogindex(np.array([], dtype='datetime64[s]'), [], [])
+
+        names = list(catalog.datasets.keys())
+        if index is None or index.names != names:
+            times = self._timestamps_from_datasets(names)
+            order = np.argsort(times, kind='stable')
+            order = order[~np.isnat(times[order])]
+            index = catalogindex(times[order], names, [catalog.datasets[names[i]] for i in order])
+        self._catalog_indexes[query_date] = (index, fetched_at)
+        return index
 
     def _get_catalog(self, query_date):
         raise NotImplementedError("Subclasses must implement _get_catalog method")
@@ -74,5 +119,70 @@ class ThreddsSatelliteSelection(object):
     def _timestamp_from_dataset(self, ds_key):
         raise NotImplementedError("Subclasses must implement _timestamp_from_dataset method")
 
+    def _timestamps_from_datasets(self, ds_keys):
+        return np.array([self._timestamp_from_dataset(ds_key) for ds_key in ds_keys], dtype='datetime64[s]')
+
+
+satpos = namedtuple('satpos', 'latitude longitude altitude')
+
+AROUND_METHODS = ('nearest', 'before', 'after')
+
+# timestamps of a catalog's datasets in ascending order, with the datasets in the same order.
+# `names` is the catalog listing the index was built from.
+catalogindex = namedtuple('catalogindex', 'times names datasets')
+
+
+def timestamps_from_names(names, seconds=True):
+    # NaT where a name has no timestamp
+    if not names:
+        return np.array([], dtype='datetime64[s]')
+    time_pattern = r'(\d{4})(\d{2})(\d{2})_(\d{2})(\d{2})' + (r'(\d{2})' if seconds else '()')
+    # every line matches, with empty groups when it has no timestamp, so the fields line up with the names
+    listing_pattern = re.compile(r'^(?:[^\n]*?' + time_pattern + r')?[^\n]*$', re.MULTILINE)
+    fields = np.array(listing_pattern.findall('\n'.join(names)), dtype=str).reshape(-1, 6)
+    if not seconds:
+        fields[:, 5] = '00'
+
+    iso = fields[:, 0]
+    for sep, column in zip('--T::', range(1, 6)):
+        iso = np.char.add(np.char.add(iso, sep), fields[:, column])
+    iso[fields[:, 0] == ''] = 'NaT'
+    return iso.astype('datetime64[s]')
+
+
+def _index_range(index, t1=None, t2=None):
+    lo = 0 if t1 is None else int(np.searchsorted(index.times, np.datetime64(t1), side='left'))
+    hi = len(index.times) if t2 is None else int(np.searchsorted(index.times, np.datetime64(t2), side='left'))
+    return lo, hi
+
+
+def _nearest_positions(times, when, method, count):
+    # up to `count` positions in ascending `times`, from the closest to `when` outwards
+    if method == 'before':
+        end = int(np.searchsorted(times, when, side='right'))
+        return list(range(end - 1, max(end - count, 0) - 1, -1))
+    right = int(np.searchsorted(times, when, side='left'))
+    if method == 'after':
+        return list(range(right, min(right + count, len(times))))
+
+    positions = []
+    left = right - 1
+    while len(positions) < count and (left >= 0 or right < len(times)):
+        if right >= len(times) or (left >= 0 and when - times[left] <= times[right] - when):
+            positions.append(left)
+            left -= 1
+        else:
+            positions.append(right)
+            right += 1
+    return positions
+
+
+def _check_k(k):
+    if k is not None and k < 1:
+        raise ValueError("k must be at least 1")
+
 
-satpos = namedtuple('satpos', 'latitude longitude altitude')
\ No newline at end of file
+def _pick(datasets, positions, action, k):
+    if k is None:
+        return action(datasets[positions[0]])
+    return [action(datasets[i]) for i in positions]
@@ -0,0 +1,87 @@
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from weatherpy import units
+from weatherpy.internal import logger, mask_outside_extent, mask_to_slice
+from weatherpy.thredds import netcdf_lock
+
+regionstats = namedtuple('regionstats', 'times count min max mean std percentiles')
+
+DEFAULT_PERCENTILES = (10, 50, 90)
+
+
+def region_stats(selection, t1, t2, extent, percentiles=DEFAULT_PERCENTILES, unit=None,
+                 workers=4, action=None):
+    if action is None:
+        action = selection._default_action
+    extractor = RegionExtractor(extent, percentiles, unit)
+    datasets = list(selection._datasets_between(t1, t2, 'asc'))
+
+    def stats_for(ds):
+        # only the netCDF calls hold the lock, so fetching one scan overlaps the statistics of another
+        plotter = action(ds)
+        try:
+            data = extractor.values(plotter)
+        finally:
+            with netcdf_lock:
+                plotter.close()
+        return extractor.stats_of(data)
+
+    logger.info('[EXTRACT] Computing region statistics for {} scans'.format(len(datasets)))
+    with ThreadPoolExecutor(workers) as pool:
+        results = list(pool.map(stats_for, (ds for _, ds in datasets)))
+
+    columns = [np.asarray([result[i] for result in results], dtype=np.float32) for i in range(5)]
+    percentile_values = np.asarray([result[5] for result in results],
+                                   dtype=np.float32).reshape(len(results), len(percentiles))
+    return regionstats([ts for ts, _ in datasets], columns[0].astype(int), *columns[1:],
+                       percentiles=percentile_values)
+
+
+class RegionExtractor(object):
+    def __init__(self, extent, percentiles=DEFAULT_PERCENTILES, unit=None):
+        self._extent = extent
+        self._percentiles = tuple(percentiles)
+        self._unit = unit
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def window(self, plotter):
+        with netcdf_lock:
+            x, y = plotter._coordinates()
+        key = (plotter.transform_crs.proj4_init, len(x), float(x[0]), float(x[-1]),
+               len(y), float(y[0]), float(y[-1]))
+        with self._lock:
+            if key not in self._windows:
+                xmask, ymask, _ = mask_outside_extent(self._extent, plotter.transform_crs, x, y)
+                self._windows[key] = (mask_to_slice(ymask), mask_to_slice(xmask))
+            return self._windows[key]
+
+    def values(self, plotter):
+        with netcdf_lock:
+            yslice, xslice = self.window(plotter)
+            if yslice is None or xslice is None:
+                return np.empty((0, 0), dtype=np.float32)
+            scmi = plotter.dataset.variables['Sectorized_CMI']
+            data = scmi[yslice, xslice]
+            data_units = units.get(scmi.units)
+        data = np.ma.filled(np.ma.asarray(data).astype(np.float32), np.nan)
+        if self._unit is not None:
+            # unit conversions are plain arithmetic, so they apply to the whole array at once
+            data = np.asarray(self._unit.convert(data, data_units), dtype=np.float32)
+        return data
+
+    def stats(self, plotter):
+        return self.stats_of(self.values(plotter))
+
+    def stats_of(self, data):
+        valid = data[~np.isnan(data)]
+        if not valid.size:
+            nan = float('nan')
+            return 0, nan, nan, nan, nan, [nan] * len(self._percentiles)
+        return (valid.size, valid.min(), valid.max(), valid.mean(), valid.std(),
+                np.percentile(valid, self._percentiles))
+
@@ -1,4 +1,5 @@
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, date
 
 import cartopy.crs as ccrs
@@ -6,14 +7,17 @@ import numpy as np
 from siphon.catalog import TDSCatalog
 
 from weatherpy import ctables, maps, units
-from weatherpy.internal import mask_outside_extent, logger
+from weatherpy.archive import LocalArchiveSelection
+from weatherpy.internal import mask_outside_extent, mask_to_slice, logger
 from weatherpy.maps import extents
-from weatherpy.satellite._common import ThreddsSatelliteSelection, satpos
-from weatherpy.thredds import DatasetContextManager, dap_plotter
+from weatherpy.satellite._common import ThreddsSatelliteSelection, satpos, timestamps_from_names
+from weatherpy.thredds import DatasetContextManager, dap_plotter, netcdf_lock
 from weatherpy.units import Scale, UnitsException, arrayconvert
 
 CATALOG_BASE_URL = 'http://thredds-jumbo.unidata.ucar.edu/thredds/catalog/satellite/goes16/GOES16/'
 
+DEFAULT_TILE_SIZE = 2048
+
 
 def conus(channel):
     return Goes16Selection('CONUS', channel)
@@ -35,30 +39,35 @@ def puertorico(channel):
     return Goes16Selection('PRREGI', channel)
 
 
+def archive(directory, pattern='*.nc*', **kwargs):
+    return LocalArchiveSelection(directory, timestamp_from_name, Goes16Plotter, pattern, **kwargs)
+
+
 class Goes16Selection(ThreddsSatelliteSelection):
     @staticmethod
     def _default_action(ds):
         return dap_plotter(ds, Goes16Plotter)
 
     def __init__(self, sector, channel):
+        super().__init__()
         self.sector = sector
         self.channel = channel
 
-    def latest(self, within=None, action=None):
+    def latest(self, within=None, action=None, k=None):
         if within is None:
             within = timedelta(minutes=40)
         if action is None:
             action = Goes16Selection._default_action
 
-        return self._latest_impl(within, action)
+        return self._latest_impl(within, action, k)
 
-    def around(self, when, within=None, action=None):
+    def around(self, when, within=None, action=None, k=None, method='nearest'):
         if within is None:
             within = timedelta(minutes=40)
         if action is None:
             action = Goes16Selection._default_action
 
-        return self._around_impl(when, within, action)
+        return self._around_impl(when, within, action, k, method)
 
     def between(self, t1, t2, action=None, sort='asc'):
         if action is None:
@@ -83,11 +92,17 @@ class Goes16Selection(ThreddsSatelliteSelection):
         return TDSCatalog(CATALOG_BASE_URL + path)
 
     def _timestamp_from_dataset(self, dataset_name):
-        match = re.search(r'\d{8}_\d{6}', dataset_name)
-        matched_str = match.group(0)
-        if not matched_str:
-            raise ValueError("Invalid dataset name: " + str(dataset_name))
-        return datetime.strptime(matched_str, '%Y%m%d_%H%M%S')
+        return timestamp_from_name(dataset_name)
+
+    def _timestamps_from_datasets(self, dataset_names):
+        return timestamps_from_names(dataset_names)
+
+
+def timestamp_from_name(dataset_name):
+    match = re.search(r'\d{8}_\d{6}', dataset_name)
+    if not match:
+        raise ValueError("Invalid dataset name: " + str(dataset_name))
+    return datetime.strptime(match.group(0), '%Y%m%d_%H%M%S')
 
 
 class Goes16Plotter(DatasetContextManager):
@@ -197,7 +212,7 @@ class Goes16Plotter(DatasetContextManager):
             return None
 
     def make_plot(self, mapper=None, colortable=None, scale=(), strict=True, extent=None,
-                  fix_clipped=True):
+                  fix_clipped=True, chunked=False, downsample=1, tile_size=DEFAULT_TILE_SIZE, workers=1):
         if colortable is None:
             colortable = self.default_ctable()
 
@@ -210,21 +225,29 @@ class Goes16Plotter(DatasetContextManager):
         if not mapper.initialized():
             mapper.initialize_drawing()
 
-        xvar = self.dataset.variables['x']
-        yvar = self.dataset.variables['y']
-        x = xvar[:]
-        y = yvar[:]
-
-        # for full disk, x and y coordinates are in microradians.
-        # Use the satellite height to convert to meters.
-        if xvar.units == 'microradian':
-            x *= self._position.altitude / 1E6
-        if yvar.units == 'microradian':
-            y *= self._position.altitude / 1E6
+        x, y = self._coordinates()
 
         plot_limited = mapper.extent is not None and strict
         use_pcolormesh = plot_limited
 
+        if chunked:
+            region = (slice(None), slice(None))
+            if plot_limited:
+                xmask, ymask, _ = mask_outside_extent(mapper.extent, mapper.crs, x, y, self._transform_crs)
+                region = (mask_to_slice(ymask), mask_to_slice(xmask))
+            if None in region:
+                # we are out of bounds of the satellite data
+                return mapper, colortable
+            x, y = x[region[1]], y[region[0]]
+            raster = self.render_raster(colortable, scale, region, fix_clipped, downsample, tile_size, workers)
+            logger.debug('Using imshow on chunked raster')
+            interp = 'bilinear' if self.sattype == 'VIS' else 'none'
+            lim = (x.min(), x.max(), y.min(), y.max())
+            mapper.ax.imshow(raster, extent=lim, origin='upper',
+                             transform=self._transform_crs,
+                             interpolation=interp)
+            return mapper, colortable
+
         if plot_limited:
             xmask, ymask, data_extnt = mask_outside_extent(mapper.extent, mapper.crs, x, y, self._transform_crs)
             xmasked = x[xmask]
@@ -246,10 +269,71 @@ class Goes16Plotter(DatasetContextManager):
         # apply gamma correction?
         # plotdata = np.sqrt(plotdata)
 
-        if self.sattype == 'VIS' and fix_clipped:
+        if self.sattype == 'VIS' and fix_clipped and '_FillValue' in self._scmi.ncattrs():
             # hack for fixing clipping highlights that default to fill value of 0
             plotdata[plotdata == self._scmi._FillValue] = 1.0
 
+        plotdata = self._unit_converter(colortable, scale)(plotdata)
+
+        logger.info("[GOES SAT] Finish processing satellite pixel data")
+
+        if use_pcolormesh:
+            logger.debug('Using pcolormesh')
+            mapper.ax.pcolormesh(x, y, plotdata,
+                                 transform=self._transform_crs,
+                                 cmap=colortable.cmap, norm=colortable.norm)
+        else:
+            logger.debug('Using imshow')
+            interp = 'bilinear' if self.sattype == 'VIS' else 'none'
+            lim = (x.min(), x.max(), y.min(), y.max())
+            mapper.ax.imshow(plotdata, extent=lim, origin='upper',
+                             transform=self._transform_crs,
+                             interpolation=interp,
+                             cmap=colortable.cmap, norm=colortable.norm)
+        return mapper, colortable
+
+    def render_raster(self, colortable=None, scale=(), region=(slice(None), slice(None)), fix_clipped=True,
+                      downsample=1, tile_size=DEFAULT_TILE_SIZE, workers=1):
+        # colorized tile by tile, so memory use is bounded by the tile size rather than the image
+        if colortable is None:
+            colortable = self.default_ctable()
+        if downsample < 1:
+            raise ValueError("Downsample must be at least 1")
+        tile_size = max(downsample, tile_size - tile_size % downsample)
+        convert = self._unit_converter(colortable, scale)
+
+        with netcdf_lock:
+            ny, nx = self._scmi.shape
+            fill_value = getattr(self._scmi, '_FillValue', None)
+        yslice, xslice = region
+        y0, y1, _ = yslice.indices(ny)
+        x0, x1, _ = xslice.indices(nx)
+        raster = np.empty((-(-(y1 - y0) // downsample), -(-(x1 - x0) // downsample), 4), dtype=np.uint8)
+        fix_clipped = fix_clipped and self.sattype == 'VIS' and fill_value is not None
+
+        def render_tile(origin):
+            ty, tx = origin
+            with netcdf_lock:
+                data = self._scmi[ty:min(ty + tile_size, y1), tx:min(tx + tile_size, x1)]
+            if fix_clipped:
+                # hack for fixing clipping highlights that default to fill value of 0
+                data[data == fill_value] = 1.0
+            data = np.ma.filled(np.ma.asarray(data, dtype=np.float32), np.nan)
+            data = convert(_block_mean(data, downsample))
+            ry, rx = (ty - y0) // downsample, (tx - x0) // downsample
+            raster[ry:ry + data.shape[0], rx:rx + data.shape[1]] = colortable.cmap(colortable.norm(data), bytes=True)
+
+        origins = [(ty, tx) for ty in range(y0, y1, tile_size) for tx in range(x0, x1, tile_size)]
+        logger.info("[GOES SAT] Rendering {} tiles of up to {}x{} pixels".format(len(origins), tile_size, tile_size))
+        if workers > 1:
+            with ThreadPoolExecutor(workers) as pool:
+                list(pool.map(render_tile, origins))
+        else:
+            for origin in origins:
+                render_tile(origin)
+        return raster
+
+    def _unit_converter(self, colortable, scale=()):
         try:
             data_units = units.get(self._scmi.units)
             ctable_units = colortable.unit
@@ -265,29 +349,41 @@ class Goes16Plotter(DatasetContextManager):
                 elif isinstance(scale, tuple):
                     scale = Scale(*scale)
 
-                plotdata = arrayconvert(scale, ctable_units.reverse())(plotdata)
+                return arrayconvert(scale, ctable_units.reverse())
             else:
-                plotdata = arrayconvert(data_units, ctable_units)(plotdata)
+                return arrayconvert(data_units, ctable_units)
 
         except UnitsException:
             raise ValueError("Unsupported plotting units: " + str(self._scmi.units))
 
-        logger.info("[GOES SAT] Finish processing satellite pixel data")
+    def _coordinates(self):
+        xvar = self.dataset.variables['x']
+        yvar = self.dataset.variables['y']
+        x = xvar[:]
+        y = yvar[:]
 
-        if use_pcolormesh:
-            logger.debug('Using pcolormesh')
-            mapper.ax.pcolormesh(x, y, plotdata,
-                                 transform=self._transform_crs,
-                                 cmap=colortable.cmap, norm=colortable.norm)
-        else:
-            logger.debug('Using imshow')
-            interp = 'bilinear' if self.sattype == 'VIS' else 'none'
-            lim = (x.min(), x.max(), y.min(), y.max())
-            mapper.ax.imshow(plotdata, extent=lim, origin='upper',
-                             transform=self._transform_crs,
-                             interpolation=interp,
-                             cmap=colortable.cmap, norm=colortable.norm)
-        return mapper, colortable
+        # for full disk, x and y coordinates are in microradians.
+        # Use the satellite height to convert to meters.
+        if xvar.units == 'microradian':
+            x = x * self._position.altitude / 1E6
+        if yvar.units == 'microradian':
+            y = y * self._position.altitude / 1E6
+        return x, y
+
+
+def _block_mean(data, size):
+    # mean over size x size blocks, ignoring NaN; blocks at the edges may be partial.
+    if size == 1:
+        return data
+    ny, nx = data.shape
+    padded = np.full((-(-ny // size) * size, -(-nx // size) * size), np.nan, dtype=data.dtype)
+    padded[:ny, :nx] = data
+    blocks = padded.reshape(padded.shape[0] // size, size, padded.shape[1] // size, size)
+    valid = ~np.isnan(blocks)
+    counts = valid.sum(axis=(1, 3))
+    sums = np.where(valid, blocks, 0).sum(axis=(1, 3))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (sums / counts).astype(data.dtype)
 
 
 channel_sattype_map = {}
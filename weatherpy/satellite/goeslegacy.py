@@ -7,8 +7,9 @@ from siphon.catalog import TDSCatalog
 
 from weatherpy import ctables, units
 from weatherpy import maps
+from weatherpy.archive import LocalArchiveSelection
 from weatherpy.internal import logger
-from weatherpy.satellite._common import ThreddsSatelliteSelection
+from weatherpy.satellite._common import ThreddsSatelliteSelection, timestamps_from_names
 from weatherpy.thredds import dap_plotter, DatasetContextManager
 
 
@@ -34,30 +35,35 @@ def conus_east(sattype):
     return GoesLegacySelection(sattype, sector)
 
 
+def archive(directory, pattern=None, **kwargs):
+    return LocalArchiveSelection(directory, timestamp_from_name, GoesLegacyPlotter, pattern, **kwargs)
+
+
 class GoesLegacySelection(ThreddsSatelliteSelection):
     @staticmethod
     def _default_action(ds):
         return dap_plotter(ds, GoesLegacyPlotter)
 
     def __init__(self, sattype, sector):
+        super().__init__()
         self.sector = sector
         self.sattype = sattype.upper()
 
-    def latest(self, within=None, action=None):
+    def latest(self, within=None, action=None, k=None):
         if within is None:
             within = timedelta(minutes=40)
         if action is None:
             action = GoesLegacySelection._default_action
 
-        return self._latest_impl(within, action)
+        return self._latest_impl(within, action, k)
 
-    def around(self, when, within=None, action=None):
+    def around(self, when, within=None, action=None, k=None, method='nearest'):
         if within is None:
             within = timedelta(minutes=40)
         if action is None:
             action = GoesLegacySelection._default_action
 
-        return self._around_impl(when, within, action)
+        return self._around_impl(when, within, action, k, method)
 
     def between(self, t1, t2, action=None, sort='asc'):
         if action is None:
@@ -80,11 +86,17 @@ class GoesLegacySelection(ThreddsSatelliteSelection):
         return TDSCatalog(catalog_url)
 
     def _timestamp_from_dataset(self, dataset_name):
-        match = re.search(r'\d{8}_\d{4}', dataset_name)
-        matched_str = match.group(0)
-        if not matched_str:
-            raise ValueError("Invalid dataset name: " + str(dataset_name))
-        return datetime.strptime(matched_str, '%Y%m%d_%H%M')
+        return timestamp_from_name(dataset_name)
+
+    def _timestamps_from_datasets(self, dataset_names):
+        return timestamps_from_names(dataset_names, seconds=False)
+
+
+def timestamp_from_name(dataset_name):
+    match = re.search(r'\d{8}_\d{4}', dataset_name)
+    if not match:
+        raise ValueError("Invalid dataset name: " + str(dataset_name))
+    return datetime.strptime(match.group(0), '%Y%m%d_%H%M')
 
 
 class GoesLegacyPlotter(DatasetContextManager):
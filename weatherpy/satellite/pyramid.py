@@ -0,0 +1,230 @@
+import json
+import math
+import os
+import shutil
+
+import netCDF4
+import numpy as np
+
+from weatherpy.internal import logger, mask_outside_extent, ArrayVariable, ArrayDataset
+from weatherpy.satellite.goes16 import Goes16Plotter, _block_mean
+from weatherpy.thredds import netcdf_lock
+
+# On-disk overview pyramid of a GOES-16 frame: level 0 is the full resolution source dataset and
+# every following level halves both dimensions. Each overview is a directory of .npy files
+# (unpacked float32 data with NaN for missing pixels, plus the x/y coordinates) so it can be
+# opened memory-mapped and plotted with Goes16Plotter like the original dataset. Only the
+# coordinates of level 0 are stored; its data is read from the source.
+
+META_FILENAME = 'meta.json'
+FORMAT_VERSION = 2
+
+METHODS = ('mean', 'max')
+DEFAULT_MIN_SIZE = 256
+DEFAULT_STRIP_ROWS = 1024
+
+_DATA_ATTRS = ('units', 'standard_name', 'grid_mapping')
+_COORDINATE_ATTRS = ('units', 'standard_name')
+
+
+def is_pyramid(path):
+    return os.path.isfile(os.path.join(path, META_FILENAME))
+
+
+def build_pyramid(plotter, directory, method='mean', levels=None, min_size=DEFAULT_MIN_SIZE,
+                  strip_rows=DEFAULT_STRIP_ROWS, fix_clipped=True):
+    # level 0 isn't copied; the pyramid reads it from the plotter's dataset file
+    if method not in METHODS:
+        raise ValueError("Invalid pyramid method: {}. Must be one of {}".format(method, METHODS))
+
+    with netcdf_lock:
+        scmi = plotter.dataset.variables['Sectorized_CMI']
+        shape = scmi.shape
+        fill_value = getattr(scmi, '_FillValue', None)
+        x = np.asarray(plotter.dataset.variables['x'][:], dtype=np.float64)
+        y = np.asarray(plotter.dataset.variables['y'][:], dtype=np.float64)
+
+    if levels is None:
+        levels = 1 + max(0, int(math.ceil(math.log2(max(shape) / float(min_size)))))
+    if levels < 1:
+        raise ValueError("A pyramid needs at least one level")
+    block = 2 ** (levels - 1)
+    strip_rows = -(-strip_rows // block) * block
+    fix_clipped = fix_clipped and plotter.sattype == 'VIS' and fill_value is not None
+
+    tmp_dir = directory.rstrip(os.sep) + '.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+
+    outputs = []
+    level_shape = shape
+    for level in range(levels):
+        level_dir = os.path.join(tmp_dir, _level_dirname(level))
+        os.makedirs(level_dir)
+        np.save(os.path.join(level_dir, 'x.npy'), x)
+        np.save(os.path.join(level_dir, 'y.npy'), y)
+        if level:
+            outputs.append(np.lib.format.open_memmap(os.path.join(level_dir, 'Sectorized_CMI.npy'), mode='w+',
+                                                     dtype=np.float32, shape=level_shape))
+        x, y = _block_mean(x[np.newaxis], 2)[0], _block_mean(y[np.newaxis], 2)[0]
+        level_shape = tuple(-(-n // 2) for n in level_shape)
+
+    # strips line up with the blocks of every level, so each one is decimated on its own
+    for row in range(0, shape[0], strip_rows):
+        with netcdf_lock:
+            data = scmi[row:row + strip_rows]
+        if fix_clipped:
+            # hack for fixing clipping highlights that default to fill value of 0
+            data[data == fill_value] = 1.0
+        data = np.ma.filled(np.ma.asarray(data, dtype=np.float32), np.nan)
+        for level, output in enumerate(outputs, 1):
+            data = _decimate(data, method)
+            start = row // 2 ** level
+            output[start:start + data.shape[0]] = data
+    for output in outputs:
+        output.flush()
+    del outputs
+
+    with netcdf_lock:
+        meta = _metadata(plotter.dataset, method, levels, _source_path(plotter.dataset))
+    with open(os.path.join(tmp_dir, META_FILENAME), 'w') as f:
+        json.dump(meta, f)
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+    os.replace(tmp_dir, directory)
+    logger.info('[PYRAMID] Saved {} levels of {} to {}'.format(levels, shape, directory))
+    return directory
+
+
+def open_pyramid(directory, source=None):
+    # source overrides the full resolution dataset, if it moved since the pyramid was built
+    with open(os.path.join(directory, META_FILENAME)) as f:
+        meta = json.load(f)
+    if meta.get('version') != FORMAT_VERSION:
+        raise ValueError("Unsupported pyramid version: {}".format(meta.get('version')))
+    return Pyramid(directory, meta, source)
+
+
+class Pyramid(object):
+    def __init__(self, directory, meta, source=None):
+        self._directory = directory
+        self._meta = meta
+        self._source = source or meta.get('source')
+        self._plotters = {}
+
+    @property
+    def method(self):
+        return self._meta['method']
+
+    @property
+    def levels(self):
+        return self._meta['levels']
+
+    def dataset(self, level=0):
+        # levels other than 0 are memory-mapped from disk
+        if not 0 <= level < self.levels:
+            raise ValueError("Invalid pyramid level: {}".format(level))
+        if level == 0:
+            if self._source is None:
+                raise ValueError("The source of the pyramid's full resolution level is unknown")
+            return netCDF4.Dataset(self._source)
+        level_dir = os.path.join(self._directory, _level_dirname(level))
+        variables_meta = self._meta['variables']
+
+        data = np.load(os.path.join(level_dir, 'Sectorized_CMI.npy'), mmap_mode='r')
+        variables = [ArrayVariable('Sectorized_CMI', data, ('y', 'x'), variables_meta['Sectorized_CMI'])]
+        for name in ('x', 'y'):
+            variables.append(ArrayVariable(name, np.load(os.path.join(level_dir, name + '.npy'), mmap_mode='r'),
+                                           (name,), variables_meta[name]))
+        projection = self._meta['projection']
+        variables.append(ArrayVariable(projection, np.array(0), (), variables_meta[projection]))
+        return ArrayDataset(variables, (('y', data.shape[0]), ('x', data.shape[1])), self._meta['attrs'])
+
+    def plotter(self, level=0):
+        return Goes16Plotter(self.dataset(level))
+
+    def level_for(self, extent=None, pixels=1000):
+        # the coarsest level still showing at least `pixels` columns across the extent
+        if pixels < 1:
+            raise ValueError("Pixels must be at least 1")
+        # coordinates of the full resolution level are stored, so the source isn't opened here
+        level_dir = os.path.join(self._directory, _level_dirname(0))
+        x = np.load(os.path.join(level_dir, 'x.npy'))
+        width = len(x)
+        if extent is not None:
+            y = np.load(os.path.join(level_dir, 'y.npy'))
+            crs = self._level_plotter(self.levels - 1).transform_crs
+            xmask, _, _ = mask_outside_extent(extent, crs, x, y)
+            width = max(int(np.count_nonzero(xmask)), 1)
+        level = int(math.floor(math.log2(max(width / float(pixels), 1.))))
+        return min(level, self.levels - 1)
+
+    def make_plot(self, mapper=None, colortable=None, extent=None, pixels=1000, **kwargs):
+        if extent is None and mapper is not None:
+            extent = mapper.extent
+        level = self.level_for(extent, pixels)
+        logger.info('[PYRAMID] Plotting from level {}'.format(level))
+        return self._level_plotter(level).make_plot(mapper, colortable, extent=extent, **kwargs)
+
+    def close(self):
+        for plotter in self._plotters.values():
+            plotter.close()
+        self._plotters.clear()
+
+    def _level_plotter(self, level):
+        if level not in self._plotters:
+            self._plotters[level] = self.plotter(level)
+        return self._plotters[level]
+
+
+def _level_dirname(level):
+    return 'level{}'.format(level)
+
+
+def _decimate(data, method):
+    if method == 'mean':
+        return _block_mean(data, 2)
+    ny, nx = data.shape
+    padded = np.full((ny + ny % 2, nx + nx % 2), np.nan, dtype=data.dtype)
+    padded[:ny, :nx] = data
+    blocks = padded.reshape(padded.shape[0] // 2, 2, padded.shape[1] // 2, 2)
+    # fmax ignores NaN unless the whole block is missing
+    return np.fmax.reduce(np.fmax.reduce(blocks, axis=3), axis=1)
+
+
+def _source_path(dataset):
+    try:
+        return dataset.filepath()
+    except (AttributeError, ValueError):
+        return None
+
+
+def _metadata(dataset, method, levels, source):
+    scmi = dataset.variables['Sectorized_CMI']
+    projection = scmi.grid_mapping
+    geog = dataset.variables[projection]
+
+    def attrs_of(var, names=None):
+        return [[attr, _jsonable(var.getncattr(attr))] for attr in var.ncattrs()
+                if names is None or attr in names]
+
+    return {
+        'version': FORMAT_VERSION,
+        'method': method,
+        'levels': levels,
+        'source': source,
+        'projection': projection,
+        'attrs': {attr: _jsonable(dataset.getncattr(attr)) for attr in dataset.ncattrs()},
+        'variables': {
+            'Sectorized_CMI': attrs_of(scmi, _DATA_ATTRS),
+            'x': attrs_of(dataset.variables['x'], _COORDINATE_ATTRS),
+            'y': attrs_of(dataset.variables['y'], _COORDINATE_ATTRS),
+            projection: attrs_of(geog)
+        }
+    }
+
+
+def _jsonable(value):
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    return value
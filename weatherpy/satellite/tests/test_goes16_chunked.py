@@ -0,0 +1,91 @@
+import os
+from unittest import TestCase, mock
+
+import cartopy.crs as ccrs
+import netCDF4
+import numpy as np
+
+import config
+from weatherpy.maps import extents
+from weatherpy.satellite.goes16 import Goes16Plotter, _block_mean
+
+INFRARED_SECTOR_FILE = 'GOES16_Mesoscale-1_20170628_235927_11.20_2km_41.8N_95.6W_Ch14.nc4'
+
+
+class TestRenderRaster(TestCase):
+    def setUp(self):
+        self.plotter = Goes16Plotter(netCDF4.Dataset(os.path.join(config.TEST_DATA_DIR, INFRARED_SECTOR_FILE)))
+        self.ctable = self.plotter.default_ctable()
+
+    def tearDown(self):
+        self.plotter.close()
+
+    def _colorized(self, data):
+        converted = self.plotter._unit_converter(self.ctable)(np.ma.filled(data.astype(np.float32), np.nan))
+        return self.ctable.cmap(self.ctable.norm(converted), bytes=True)
+
+    def test_tiles_match_full_read(self):
+        expected = self._colorized(self.plotter.dataset.variables['Sectorized_CMI'][:])
+        raster = self.plotter.render_raster(self.ctable, tile_size=100)
+        self.assertEqual(raster.shape, expected.shape)
+        np.testing.assert_array_equal(raster, expected)
+
+    def test_parallel_tiles_match_serial(self):
+        serial = self.plotter.render_raster(self.ctable, tile_size=128, downsample=4)
+        parallel = self.plotter.render_raster(self.ctable, tile_size=128, downsample=4, workers=4)
+        np.testing.assert_array_equal(serial, parallel)
+
+    def test_downsampled_region(self):
+        region = (slice(10, 111), slice(50, 250))
+        raster = self.plotter.render_raster(self.ctable, region=region, tile_size=64, downsample=4)
+        self.assertEqual(raster.shape, (26, 50, 4))
+
+        data = self.plotter.dataset.variables['Sectorized_CMI'][10:14, 50:54]
+        expected = self._colorized(np.ma.array([[data.mean()]]))
+        np.testing.assert_array_equal(raster[0, 0], expected[0, 0])
+
+    def test_tile_size_rounds_to_downsample(self):
+        raster = self.plotter.render_raster(self.ctable, tile_size=10, downsample=3)
+        whole = self.plotter.render_raster(self.ctable, tile_size=3000, downsample=3)
+        np.testing.assert_array_equal(raster, whole)
+
+    def test_invalid_downsample(self):
+        with self.assertRaises(ValueError):
+            self.plotter.render_raster(self.ctable, downsample=0)
+
+
+class TestBlockMean(TestCase):
+    def test_ignores_nan_and_partial_blocks(self):
+        data = np.array([[1., 3., 5.],
+                         [np.nan, 2., 7.],
+                         [4., 4., np.nan]], dtype=np.float32)
+        result = _block_mean(data, 2)
+        np.testing.assert_allclose(result, [[2., 6.], [4., np.nan]])
+        self.assertEqual(result.dtype, np.float32)
+
+
+
+class TestChunkedPlot(TestCase):
+    def _mapper(self, extent):
+        mapper = mock.Mock()
+        mapper.extent = extent
+        mapper.crs = ccrs.PlateCarree()
+        mapper.initialized.return_value = True
+        return mapper
+
+    def test_chunked_plot_uses_region_raster(self):
+        mapper = self._mapper(extents.zoom((41.6, -93.6), km=300))
+        with Goes16Plotter(netCDF4.Dataset(os.path.join(config.TEST_DATA_DIR, INFRARED_SECTOR_FILE))) as plotter:
+            plotter.make_plot(mapper, chunked=True, downsample=2, tile_size=64, workers=2)
+
+        mapper.ax.imshow.assert_called_once()
+        raster = mapper.ax.imshow.call_args[0][0]
+        self.assertEqual(raster.ndim, 3)
+        self.assertEqual(raster.dtype, np.uint8)
+        self.assertFalse(mapper.ax.pcolormesh.called)
+
+    def test_chunked_plot_outside_data_region(self):
+        mapper = self._mapper(extents.zoom((10, -30), km=300))
+        with Goes16Plotter(netCDF4.Dataset(os.path.join(config.TEST_DATA_DIR, INFRARED_SECTOR_FILE))) as plotter:
+            plotter.make_plot(mapper, chunked=True)
+        self.assertFalse(mapper.ax.imshow.called)
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import patch
+
+import netCDF4
+import numpy as np
+
+import config
+from weatherpy import units
+from weatherpy.maps import extents
+from weatherpy.satellite import goes16
+from weatherpy.satellite.extract import region_stats, RegionExtractor
+from weatherpy.satellite.goes16 import Goes16Plotter
+
+INFRARED_SECTOR_FILE = 'GOES16_Mesoscale-1_20170628_235927_11.20_2km_41.8N_95.6W_Ch14.nc4'
+
+
+class TestRegionStats(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        archive_dir = os.path.join(self.tmpdir, 'archive')
+        os.makedirs(archive_dir)
+        # the same scan under three times is enough to exercise the loop
+        for minute in (0, 5, 10):
+            name = 'GOES16_Mesoscale-1_20170629_00{:02d}27_11.20_2km_41.8N_95.6W_Ch14.nc4'.format(minute)
+            shutil.copy(os.path.join(config.TEST_DATA_DIR, INFRARED_SECTOR_FILE), os.path.join(archive_dir, name))
+        self.selection = goes16.archive(archive_dir, index_path=os.path.join(self.tmpdir, 'index.json'))
+        self.extent = extents.zoom((41.6, -93.6), km=100)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _reference(self):
+        # brute force over the full grid, the way make_plot masks it
+        with Goes16Plotter(netCDF4.Dataset(os.path.join(config.TEST_DATA_DIR, INFRARED_SECTOR_FILE))) as plotter:
+            x, y = plotter._coordinates()
+            target = self.extent.rect_transform_to(plotter.transform_crs)
+            xmask = (x >= target.west) & (x <= target.east)
+            ymask = (y >= target.south) & (y <= target.north)
+            data = plotter.dataset.variables['Sectorized_CMI'][:][ymask][:, xmask]
+            return np.ma.compressed(data)
+
+    def test_should_compute_stats_per_scan(self):
+        stats = region_stats(self.selection, datetime(2017, 6, 29, 0, 0), datetime(2017, 6, 29, 1, 0),
+                             self.extent, percentiles=(50,), workers=2)
+        reference = self._reference()
+
+        self.assertEqual(stats.times, [datetime(2017, 6, 29, 0, m, 27) for m in (0, 5, 10)])
+        np.testing.assert_array_equal(stats.count, reference.size)
+        np.testing.assert_allclose(stats.min, reference.min(), rtol=1e-5)
+        np.testing.assert_allclose(stats.mean, reference.mean(), rtol=1e-4)
+        self.assertEqual(stats.percentiles.shape, (3, 1))
+        np.testing.assert_allclose(stats.percentiles[:, 0], np.median(reference), rtol=1e-4)
+
+    def test_should_compute_stats_of_scans_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+        stats_of = RegionExtractor.stats_of
+
+        def wait_for_other_scan(extractor, data):
+            # only gets past the barrier when both scans are outside the netCDF lock at once
+            barrier.wait()
+            return stats_of(extractor, data)
+
+        with patch.object(RegionExtractor, 'stats_of', wait_for_other_scan):
+            stats = region_stats(self.selection, datetime(2017, 6, 29, 0, 0), datetime(2017, 6, 29, 0, 6),
+                                 self.extent, workers=2)
+        np.testing.assert_array_equal(stats.count, self._reference().size)
+
+    def test_should_convert_units(self):
+        stats = region_stats(self.selection, datetime(2017, 6, 29, 0, 0), datetime(2017, 6, 29, 0, 3),
+                             self.extent, unit=units.CELSIUS)
+        np.testing.assert_allclose(stats.max, self._reference().max() - 273.15, rtol=1e-4)
+
+    def test_should_compute_window_once_per_grid(self):
+        extractor = RegionExtractor(self.extent)
+        for _, ds in self.selection._datasets_between(datetime(2017, 6, 29), datetime(2017, 6, 30), 'asc'):
+            with self.selection._default_action(ds) as plotter:
+                extractor.stats(plotter)
+        self.assertEqual(len(extractor._windows), 1)
+
+    def test_should_return_nan_outside_of_grid(self):
+        extractor = RegionExtractor(extents.zoom((10., 0.), km=50))
+        with Goes16Plotter(netCDF4.Dataset(os.path.join(config.TEST_DATA_DIR, INFRARED_SECTOR_FILE))) as plotter:
+            count, minval = extractor.stats(plotter)[:2]
+        self.assertEqual(count, 0)
+        self.assertTrue(np.isnan(minval))
@@ -0,0 +1,118 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+import cartopy.crs as ccrs
+import netCDF4
+import numpy as np
+
+import config
+from weatherpy.maps import extents
+from weatherpy.satellite.goes16 import Goes16Plotter
+from weatherpy.satellite.pyramid import build_pyramid, open_pyramid, is_pyramid, _decimate
+
+INFRARED_SECTOR_FILE = 'GOES16_Mesoscale-1_20170628_235927_11.20_2km_41.8N_95.6W_Ch14.nc4'
+
+
+class TestPyramid(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.directory = os.path.join(self.tmpdir, 'pyramid')
+        self.plotter = Goes16Plotter(netCDF4.Dataset(os.path.join(config.TEST_DATA_DIR, INFRARED_SECTOR_FILE)))
+        self.source = np.ma.filled(self.plotter.dataset.variables['Sectorized_CMI'][:].astype(np.float32), np.nan)
+
+    def tearDown(self):
+        self.plotter.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_default_levels_fit_min_size(self):
+        build_pyramid(self.plotter, self.directory, min_size=256)
+        self.assertTrue(is_pyramid(self.directory))
+        pyramid = open_pyramid(self.directory)
+        # 774 rows -> 387 -> 194 -> 97
+        self.assertEqual(pyramid.levels, 3)
+        shapes = []
+        for level in range(pyramid.levels):
+            with pyramid.dataset(level) as ds:
+                shapes.append(ds.variables['Sectorized_CMI'].shape)
+        self.assertEqual(shapes, [(774, 565), (387, 283), (194, 142)])
+
+    def test_levels_are_block_means(self):
+        build_pyramid(self.plotter, self.directory, levels=3, strip_rows=100)
+        pyramid = open_pyramid(self.directory)
+
+        level1 = pyramid.dataset(1).variables['Sectorized_CMI'][:]
+        np.testing.assert_allclose(level1, _decimate(self.source, 'mean'), rtol=1e-6)
+        self.assertAlmostEqual(float(level1[0, 0]), float(np.nanmean(self.source[:2, :2])), places=3)
+
+        level2 = pyramid.dataset(2).variables['Sectorized_CMI'][:]
+        np.testing.assert_allclose(level2, _decimate(_decimate(self.source, 'mean'), 'mean'), rtol=1e-6)
+
+    def test_full_resolution_level_reads_source(self):
+        build_pyramid(self.plotter, self.directory, levels=2)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'level0', 'Sectorized_CMI.npy')))
+
+        with open_pyramid(self.directory).dataset(0) as ds:
+            self.assertEqual(ds.filepath(), self.plotter.dataset.filepath())
+
+        moved = os.path.join(self.tmpdir, 'moved.nc4')
+        shutil.copy(self.plotter.dataset.filepath(), moved)
+        with open_pyramid(self.directory, source=moved).dataset(0) as ds:
+            self.assertEqual(ds.filepath(), moved)
+
+    def test_max_method(self):
+        build_pyramid(self.plotter, self.directory, method='max', levels=2)
+        level1 = open_pyramid(self.directory).dataset(1).variables['Sectorized_CMI'][:]
+        self.assertEqual(float(level1[3, 5]), float(np.nanmax(self.source[6:8, 10:12])))
+
+    def test_invalid_method(self):
+        with self.assertRaises(ValueError):
+            build_pyramid(self.plotter, self.directory, method='median')
+
+    def test_levels_open_as_plotters(self):
+        build_pyramid(self.plotter, self.directory, levels=2)
+        pyramid = open_pyramid(self.directory)
+        level = pyramid.plotter(1)
+        self.assertEqual(level.channel, self.plotter.channel)
+        self.assertEqual(level.timestamp, self.plotter.timestamp)
+        self.assertEqual(level.transform_crs.proj4_init, self.plotter.transform_crs.proj4_init)
+
+        x, y = self.plotter._coordinates()
+        level_x, level_y = level._coordinates()
+        self.assertEqual(len(level_x), 283)
+        self.assertAlmostEqual(float(level_x[0]), float(x[:2].mean()), places=3)
+        self.assertAlmostEqual(float(level_y[-1]), float(y[-2:].mean()), places=3)
+
+    def test_level_for_extent(self):
+        build_pyramid(self.plotter, self.directory, levels=3)
+        pyramid = open_pyramid(self.directory)
+        self.assertEqual(pyramid.level_for(pixels=1000), 0)
+        self.assertEqual(pyramid.level_for(pixels=200), 1)
+        self.assertEqual(pyramid.level_for(pixels=10), 2)
+        # a 100 km box is about 95 pixels across at 2 km resolution
+        self.assertEqual(pyramid.level_for(extents.zoom((41.6, -93.6), km=100), pixels=40), 1)
+
+    def test_make_plot_reads_from_nearest_level(self):
+        build_pyramid(self.plotter, self.directory, levels=3)
+        pyramid = open_pyramid(self.directory)
+        mapper = mock.Mock()
+        mapper.extent = extents.zoom((41.6, -93.6), km=300)
+        mapper.crs = ccrs.PlateCarree()
+        mapper.initialized.return_value = True
+
+        pyramid.make_plot(mapper, pixels=70)
+        mapper.ax.imshow.assert_called_once()
+        data = mapper.ax.imshow.call_args[0][0]
+        # 300 km box, about 285 pixels at level 0
+        self.assertLess(data.shape[1], 90)
+        self.assertGreater(data.shape[1], 60)
+
+
+class TestDecimate(TestCase):
+    def test_odd_shapes_and_missing(self):
+        data = np.array([[1., np.nan, 3.],
+                         [2., 6., np.nan]], dtype=np.float32)
+        np.testing.assert_allclose(_decimate(data, 'mean'), [[3., 3.]])
+        np.testing.assert_allclose(_decimate(data, 'max'), [[6., 3.]])
+        np.testing.assert_array_equal(_decimate(np.full((2, 2), np.nan), 'max'), [[np.nan]])
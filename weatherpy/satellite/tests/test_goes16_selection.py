@@ -3,8 +3,10 @@ from datetime import datetime, timedelta
 from unittest import TestCase
 from unittest.mock import patch, MagicMock, call
 
+import numpy as np
 import requests
 
+from weatherpy.satellite._common import timestamps_from_names
 from weatherpy.satellite.goes16 import Goes16Selection
 from weatherpy.thredds import DatasetAccessException
 
@@ -77,6 +79,12 @@ class Test_Goes16Selection(TestCase):
 
         self.action_func.assert_called_with('GOES16_20170621_235919_0.64_500m_33.3N_91.4W.nc4')
 
+    def test_should_get_k_latest_newest_first(self):
+        found = self.selector.latest(action=lambda ds: ds, k=2)
+
+        self.assertEqual(found, ['GOES16_20170622_011719_0.64_500m_33.3N_91.4W.nc4',
+                                 'GOES16_20170622_011619_0.64_500m_33.3N_91.4W.nc4'])
+
     def test_should_raise_if_not_datasets_within_radius(self):
         self.current_date_patch.return_value = datetime(2017, 9, 22, 0, 0)
 
@@ -99,6 +107,45 @@ class Test_Goes16Selection(TestCase):
         with self.assertRaises(DatasetAccessException):
             self.selector.around(datetime(2008, 6, 18, 0, 46))
 
+    def test_should_get_k_nearest_closest_first(self):
+        found = self.selector.around(datetime(2017, 6, 22, 0, 46), action=lambda ds: ds, k=3)
+
+        self.assertEqual(found, ['GOES16_20170622_004719_0.64_500m_33.3N_91.4W.nc4',
+                                 'GOES16_20170622_003719_0.64_500m_33.3N_91.4W.nc4',
+                                 'GOES16_20170622_011619_0.64_500m_33.3N_91.4W.nc4'])
+
+    def test_should_get_k_nearest_across_dates(self):
+        found = self.selector.around(datetime(2017, 6, 22, 0, 10), action=lambda ds: ds, k=5)
+
+        self.assertEqual(found, ['GOES16_20170621_235919_0.64_500m_33.3N_91.4W.nc4',
+                                 'GOES16_20170622_003719_0.64_500m_33.3N_91.4W.nc4',
+                                 'GOES16_20170622_004719_0.64_500m_33.3N_91.4W.nc4'])
+
+    def test_should_get_around_before_and_after(self):
+        when = datetime(2017, 6, 22, 0, 46)
+        self.assertEqual(self.selector.around(when, action=lambda ds: ds, method='before'),
+                         'GOES16_20170622_003719_0.64_500m_33.3N_91.4W.nc4')
+        self.assertEqual(self.selector.around(when, action=lambda ds: ds, method='after', k=2),
+                         ['GOES16_20170622_004719_0.64_500m_33.3N_91.4W.nc4',
+                          'GOES16_20170622_011619_0.64_500m_33.3N_91.4W.nc4'])
+
+    def test_should_include_exact_match_before_and_after(self):
+        when = datetime(2017, 6, 22, 0, 47, 19)
+        for method in ('nearest', 'before', 'after'):
+            self.assertEqual(self.selector.around(when, action=lambda ds: ds, method=method),
+                             'GOES16_20170622_004719_0.64_500m_33.3N_91.4W.nc4')
+
+    def test_should_raise_if_nothing_before_within_radius(self):
+        with self.assertRaises(DatasetAccessException):
+            self.selector.around(datetime(2017, 6, 21, 23, 50), within=timedelta(minutes=5),
+                                 action=self.action_func, method='before')
+
+    def test_should_raise_if_around_method_or_k_is_invalid(self):
+        with self.assertRaises(ValueError):
+            self.selector.around(datetime(2017, 6, 22, 0, 46), action=self.action_func, method='closest')
+        with self.assertRaises(ValueError):
+            self.selector.around(datetime(2017, 6, 22, 0, 46), action=self.action_func, k=0)
+
     #### between ####
 
     def test_should_get_between_two_times_asc(self):
@@ -168,3 +215,80 @@ class Test_Goes16Selection(TestCase):
     def tearDown(self):
         self.catalog_patcher.stop()
         self.current_date_patcher.stop()
+
+
+class Test_CatalogIndex(TestCase):
+    def setUp(self):
+        self.catalog_patcher = patch('weatherpy.satellite.goes16.TDSCatalog', side_effect=catalog_subs)
+        self.mock_catalog = self.catalog_patcher.start()
+        self.current_date_patcher = patch('weatherpy.internal.pyhelpers.current_time_utc',
+                                          return_value=datetime(2017, 6, 22, 1, 20))
+        self.current_date_patcher.start()
+        self.selector = Goes16Selection(SECTOR, CHANNEL)
+
+    def tearDown(self):
+        self.catalog_patcher.stop()
+        self.current_date_patcher.stop()
+
+    def test_should_parse_timestamps_of_a_listing(self):
+        times = timestamps_from_names(['GOES16_20170622_003719_0.64_500m_33.3N_91.4W.nc4', 'latest.xml',
+                                       'GOES16_20170621_235919_0.64_500m_33.3N_91.4W.nc4'])
+        np.testing.assert_array_equal(times, np.array(['2017-06-22T00:37:19', 'NaT', '2017-06-21T23:59:19'],
+                                                      dtype='datetime64[s]'))
+        self.assertEqual(len(timestamps_from_names([])), 0)
+
+    def test_should_parse_timestamps_without_seconds(self):
+        times = timestamps_from_names(['EAST-CONUS_4km_WV_20160128_0530.gini'], seconds=False)
+        self.assertEqual(times[0].item(), datetime(2016, 1, 28, 5, 30))
+
+    def test_should_fetch_past_catalogs_once(self):
+        for _ in range(3):
+            list(self.selector.between(datetime(2017, 6, 21, 0, 0), datetime(2017, 6, 22, 1, 0),
+                                       action=lambda ds: ds))
+        urls = [args[0] for args, _ in self.mock_catalog.call_args_list]
+        self.assertEqual(sum('20170621' in url for url in urls), 1)
+        # today's catalog may still change
+        self.assertEqual(sum('20170622' in url for url in urls), 3)
+
+    def test_should_fetch_a_day_again_until_it_has_settled(self):
+        def june21_fetches():
+            list(self.selector.between(datetime(2017, 6, 21, 23, 0), datetime(2017, 6, 21, 23, 59),
+                                       action=lambda ds: ds))
+            urls = [args[0] for args, _ in self.mock_catalog.call_args_list]
+            return sum('20170621' in url for url in urls)
+
+        with patch('weatherpy.internal.pyhelpers.current_time_utc') as now:
+            now.return_value = datetime(2017, 6, 21, 23, 50)
+            self.assertEqual(june21_fetches(), 1)
+            # indexed before midnight, so still incomplete
+            now.return_value = datetime(2017, 6, 22, 0, 30)
+            self.assertEqual(june21_fetches(), 2)
+            now.return_value = datetime(2017, 6, 22, 2, 0)
+            self.assertEqual(june21_fetches(), 3)
+            self.assertEqual(june21_fetches(), 3)
+
+    def test_should_parse_current_catalog_again_only_when_it_changes(self):
+        with patch.object(Goes16Selection, '_timestamps_from_datasets',
+                          side_effect=timestamps_from_names) as parse:
+            for _ in range(2):
+                list(self.selector.between(datetime(2017, 6, 22, 0, 0), datetime(2017, 6, 22, 1, 0),
+                                           action=lambda ds: ds))
+            self.assertEqual(parse.call_count, 1)
+
+            june22_datasets['GOES16_20170622_011819_0.64_500m_33.3N_91.4W.nc4'] = 'new'
+            try:
+                found = list(self.selector.between(datetime(2017, 6, 22, 1, 0), datetime(2017, 6, 22, 1, 20),
+                                                   action=lambda ds: ds))
+            finally:
+                del june22_datasets['GOES16_20170622_011819_0.64_500m_33.3N_91.4W.nc4']
+            self.assertEqual(parse.call_count, 2)
+            self.assertEqual(found[-1], 'new')
+
+    def test_should_skip_names_without_timestamps(self):
+        june21_datasets['catalog.xml'] = 'catalog.xml'
+        try:
+            found = list(self.selector.between(datetime(2017, 6, 21, 0, 0), datetime(2017, 6, 22, 0, 0),
+                                               action=lambda ds: ds))
+        finally:
+            del june21_datasets['catalog.xml']
+        self.assertEqual(found, ['GOES16_20170621_235919_0.64_500m_33.3N_91.4W.nc4'])
@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from weatherpy import aio
+from weatherpy.satellite.goes16 import Goes16Selection
+from weatherpy.thredds import DatasetAccessException, dap_plotter, netcdf_lock
+
+from thredds_stub import StubThreddsServer
+
+DATASETS = {
+    2: ['GOES16_20170622_003719_0.64_500m_33.3N_91.4W.nc4', 'GOES16_20170622_004719_0.64_500m_33.3N_91.4W.nc4'],
+    13: ['GOES16_20170622_003719_10.3_2km_33.3N_91.4W.nc4', 'GOES16_20170622_004719_10.3_2km_33.3N_91.4W.nc4']
+}
+
+
+def _lock_held_elsewhere():
+    # held by the calling thread if another one can't take it
+    held = []
+
+    def probe():
+        acquired = netcdf_lock.acquire(blocking=False)
+        if acquired:
+            netcdf_lock.release()
+        held.append(not acquired)
+
+    thread = threading.Thread(target=probe)
+    thread.start()
+    thread.join()
+    return held[0]
+
+
+class TestAsyncSelection(TestCase):
+    def setUp(self):
+        self.server = StubThreddsServer().__enter__()
+        for channel, names in DATASETS.items():
+            self.server.add_catalog('CONUS/Channel{:02d}/20170622/catalog.xml'.format(channel), names)
+
+        self.url_patcher = patch('weatherpy.satellite.goes16.CATALOG_BASE_URL', self.server.url)
+        self.url_patcher.start()
+        self.clock_patcher = patch('weatherpy.internal.pyhelpers.current_time_utc',
+                                   return_value=datetime(2017, 6, 22, 1, 0))
+        self.clock_patcher.start()
+
+    def tearDown(self):
+        self.clock_patcher.stop()
+        self.url_patcher.stop()
+        self.server.__exit__(None, None, None)
+
+    def test_should_get_latest_from_stand_in_server(self):
+        sel = aio.AsyncSelection(Goes16Selection('CONUS', 2))
+        name = asyncio.run(sel.latest(action=lambda ds: ds.name))
+        self.assertEqual(name, DATASETS[2][-1])
+
+    def test_should_get_between_in_order(self):
+        sel = aio.AsyncSelection(Goes16Selection('CONUS', 13))
+        names = asyncio.run(sel.between(datetime(2017, 6, 22, 0, 0), datetime(2017, 6, 22, 1, 0),
+                                        action=lambda ds: ds.name, sort='desc'))
+        self.assertEqual(names, list(reversed(DATASETS[13])))
+
+    def test_should_fetch_catalogs_concurrently(self):
+        self.server.delay = lambda path: time.sleep(0.5)
+        selections = [Goes16Selection('CONUS', 2), Goes16Selection('CONUS', 13)]
+
+        start = time.time()
+        names = asyncio.run(aio.latest_all(selections, action=lambda ds: ds.name))
+        elapsed = time.time() - start
+
+        self.assertEqual(names, [DATASETS[2][-1], DATASETS[13][-1]])
+        self.assertLess(elapsed, 0.9)
+
+    def test_should_raise_selection_errors(self):
+        sel = aio.AsyncSelection(Goes16Selection('CONUS', 2))
+        with self.assertRaises(DatasetAccessException):
+            asyncio.run(sel.around(datetime(2016, 1, 1, 0, 0)))
+
+
+class TestLimiter(TestCase):
+    def test_should_limit_concurrency(self):
+        limiter = aio.Limiter(2)
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def work():
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+
+        async def main():
+            await asyncio.gather(*(limiter.run(work) for _ in range(6)))
+
+        asyncio.run(main())
+        self.assertEqual(max(peak), 2)
+
+    def test_should_read_variables_through_data_limiter(self):
+        var = MagicMock()
+        var.__getitem__.return_value = 42
+        sel = aio.AsyncSelection(MagicMock())
+
+        self.assertEqual(asyncio.run(sel.read(var, 3)), 42)
+        var.__getitem__.assert_called_with(3)
+
+    def test_should_run_actions_concurrently_outside_netcdf_lock(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def action(ds):
+            # both actions have to be running at once to get past the barrier
+            barrier.wait()
+            return _lock_held_elsewhere()
+
+        selection = MagicMock()
+        selection.between.return_value = ['ds1', 'ds2']
+        sel = aio.AsyncSelection(selection)
+        results = asyncio.run(sel.between(datetime(2017, 6, 22), datetime(2017, 6, 23), action=action))
+        self.assertEqual(results, [False, False])
+
+    def test_should_open_datasets_under_netcdf_lock(self):
+        catalog_ds = MagicMock()
+        catalog_ds.access_urls = {'OPENDAP': 'http://example.com/ds.nc'}
+        plotter = MagicMock(side_effect=lambda dataset: (dataset, _lock_held_elsewhere()))
+        with patch('weatherpy.thredds.netCDF4.Dataset', side_effect=lambda path: _lock_held_elsewhere()) as opener:
+            self.assertEqual(dap_plotter(catalog_ds, plotter), (True, True))
+        opener.assert_called_once_with('http://example.com/ds.nc')
+
+    def test_should_reject_invalid_concurrency(self):
+        with self.assertRaises(ValueError):
+            aio.Limiter(0)
@@ -0,0 +1,149 @@
+import os
+import shutil
+import struct
+import tempfile
+from unittest import TestCase, skipIf
+from unittest.mock import MagicMock
+
+import numpy as np
+from matplotlib.figure import Figure
+from PIL import Image
+
+from weatherpy.animation import ApngWriter, FFmpegWriter, animate, figure_rgba
+
+
+def _frame(value, size=(6, 8)):
+    return np.full(size + (4,), value, dtype=np.uint8)
+
+
+def _read_chunks(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    chunks = []
+    pos = 8
+    while pos < len(data):
+        length, = struct.unpack('>I', data[pos:pos + 4])
+        chunktype = data[pos + 4:pos + 8]
+        chunks.append((chunktype, data[pos + 8:pos + 8 + length]))
+        pos += 12 + length
+    return chunks
+
+
+class TestApngWriter(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.saveloc = os.path.join(self.tmpdir, 'loop.png')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_should_write_all_frames(self):
+        with ApngWriter(self.saveloc, fps=5, dedupe=False) as writer:
+            for val in (10, 20, 30):
+                writer.add_frame(_frame(val))
+
+        img = Image.open(self.saveloc)
+        self.assertEqual(img.n_frames, 3)
+        img.seek(2)
+        self.assertEqual(img.convert('RGBA').getpixel((0, 0)), (30, 30, 30, 30))
+
+    def test_should_collapse_duplicate_frames_into_longer_delay(self):
+        with ApngWriter(self.saveloc, fps=5) as writer:
+            for val in (10, 10, 10, 20):
+                writer.add_frame(_frame(val))
+
+        chunks = _read_chunks(self.saveloc)
+        actl = [data for chunktype, data in chunks if chunktype == b'acTL'][0]
+        self.assertEqual(struct.unpack('>II', actl), (2, 0))
+
+        delays = [struct.unpack('>HH', data[20:24]) for chunktype, data in chunks if chunktype == b'fcTL']
+        self.assertEqual(delays, [(3, 5), (1, 5)])
+
+    def test_should_write_delay_for_fractional_fps(self):
+        with ApngWriter(self.saveloc, fps=2.5) as writer:
+            for val in (10, 10, 20):
+                writer.add_frame(_frame(val))
+
+        delays = [struct.unpack('>HH', data[20:24]) for chunktype, data in _read_chunks(self.saveloc)
+                  if chunktype == b'fcTL']
+        self.assertEqual(delays, [(4, 5), (2, 5)])
+
+    def test_should_encode_on_worker_thread(self):
+        with ApngWriter(self.saveloc, threaded=True, max_queue=1) as writer:
+            for val in range(5):
+                writer.add_frame(_frame(val))
+
+        self.assertEqual(writer.frames_written, 5)
+        self.assertEqual(Image.open(self.saveloc).n_frames, 5)
+
+    def test_should_release_file_when_close_fails(self):
+        writer = ApngWriter(self.saveloc, dedupe=False)
+        writer.add_frame(_frame(0))
+        writer._compress_level = 'invalid'
+        with self.assertRaises(TypeError):
+            writer.add_frame(_frame(1))
+        fh = writer._fh
+        self.assertFalse(fh.closed)
+
+        with self.assertRaises(TypeError):
+            writer.close()
+        self.assertTrue(fh.closed)
+        self.assertIsNone(writer._fh)
+
+    def test_should_stay_failed_after_worker_error(self):
+        writer = ApngWriter(self.saveloc, dedupe=False, threaded=True, max_queue=1)
+        writer._compress_level = 'invalid'
+        with self.assertRaises(TypeError):
+            for val in range(10):
+                writer.add_frame(_frame(val))
+                writer._worker.join(0.05)
+
+        with self.assertRaises(TypeError):
+            writer.add_frame(_frame(0))
+        with self.assertRaises(TypeError):
+            writer.close()
+        with self.assertRaises(TypeError):
+            writer.close()
+        self.assertIsNone(writer._fh)
+        self.assertEqual(writer.frames_written, 0)
+
+    def test_should_raise_if_frame_size_changes(self):
+        writer = ApngWriter(self.saveloc)
+        writer.add_frame(_frame(0))
+        with self.assertRaises(ValueError):
+            writer.add_frame(_frame(0, size=(3, 3)))
+        writer.close()
+
+    def test_should_animate_figures_from_plotters(self):
+        plotters = [MagicMock(), MagicMock()]
+        render = MagicMock()
+
+        with ApngWriter(self.saveloc, dedupe=False) as writer:
+            animate(plotters, render, writer, figsize=(1, 1), dpi=20)
+
+        self.assertEqual(render.call_count, 2)
+        for plotter in plotters:
+            plotter.__enter__.assert_called_once_with()
+            plotter.__exit__.assert_called_once()
+        self.assertEqual(Image.open(self.saveloc).n_frames, 2)
+
+    def test_should_capture_figure_buffer(self):
+        fig = Figure(figsize=(2, 1), dpi=10)
+        rgba = figure_rgba(fig)
+        self.assertEqual(rgba.shape, (10, 20, 4))
+        self.assertEqual(rgba.dtype, np.uint8)
+
+
+@skipIf(shutil.which('ffmpeg') is None, 'ffmpeg not installed')
+class TestFFmpegWriter(TestCase):
+    def test_should_pipe_frames_to_ffmpeg(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            saveloc = os.path.join(tmpdir, 'loop.gif')
+            with FFmpegWriter(saveloc, fps=2) as writer:
+                for val in (0, 0, 255):
+                    writer.add_frame(_frame(val, size=(8, 8)))
+            self.assertEqual(writer.frames_written, 3)
+            self.assertTrue(os.path.getsize(saveloc) > 0)
+        finally:
+            shutil.rmtree(tmpdir)
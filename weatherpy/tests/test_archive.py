@@ -0,0 +1,149 @@
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest import TestCase
+from unittest.mock import patch
+
+from weatherpy.archive import LocalArchiveSelection, ArchiveIndex
+from weatherpy.satellite import goes16
+from weatherpy.thredds import DatasetAccessException
+
+NAMES = {
+    '20170621': ['GOES16_20170621_234719_0.64_500m_33.3N_91.4W.nc4'],
+    '20170622': ['GOES16_20170622_003719_0.64_500m_33.3N_91.4W.nc4',
+                 'GOES16_20170622_004719_0.64_500m_33.3N_91.4W.nc4',
+                 'GOES16_20170622_005719_0.64_500m_33.3N_91.4W.nc4',
+                 'README.txt']
+}
+
+
+class TestLocalArchiveSelection(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.index_path = os.path.join(tempfile.mkdtemp(), 'index.json')
+        for day, names in NAMES.items():
+            os.makedirs(os.path.join(self.tmpdir, day))
+            for name in names:
+                self._touch(os.path.join(day, name))
+        self._age_dirs()
+
+        self.clock_patcher = patch('weatherpy.internal.pyhelpers.current_time_utc',
+                                   return_value=datetime(2017, 6, 22, 1, 0))
+        self.clock_patcher.start()
+
+    def tearDown(self):
+        self.clock_patcher.stop()
+        shutil.rmtree(self.tmpdir)
+        shutil.rmtree(os.path.dirname(self.index_path))
+
+    def _touch(self, relpath):
+        with open(os.path.join(self.tmpdir, relpath), 'w'):
+            pass
+
+    def _age_dirs(self):
+        old = time.time() - 60
+        for day in os.listdir(self.tmpdir) + ['']:
+            path = os.path.join(self.tmpdir, day)
+            if os.path.isdir(path):
+                os.utime(path, (old, old))
+
+    def _selection(self, refresh_interval=timedelta(0)):
+        return LocalArchiveSelection(self.tmpdir, goes16.timestamp_from_name, pattern='*.nc4',
+                                     index_path=self.index_path, refresh_interval=refresh_interval)
+
+    def test_should_get_latest(self):
+        ds = self._selection().latest()
+        self.assertEqual(ds.name, NAMES['20170622'][2])
+        self.assertEqual(ds.path, os.path.join(self.tmpdir, '20170622', ds.name))
+
+    def test_should_raise_if_nothing_latest_within(self):
+        with self.assertRaises(DatasetAccessException):
+            self._selection().latest(within=timedelta(minutes=1))
+
+    def test_should_get_around(self):
+        ds = self._selection().around(datetime(2017, 6, 22, 0, 45))
+        self.assertEqual(ds.name, NAMES['20170622'][1])
+
+    def test_should_get_around_before_and_after_range(self):
+        sel = self._selection()
+        self.assertEqual(sel.around(datetime(2017, 6, 20)).name, NAMES['20170621'][0])
+        self.assertEqual(sel.around(datetime(2017, 6, 23)).name, NAMES['20170622'][2])
+
+    def test_should_get_earlier_around_on_tie(self):
+        ds = self._selection().around(datetime(2017, 6, 22, 0, 42, 19))
+        self.assertEqual(ds.name, NAMES['20170622'][0])
+
+    def test_should_raise_if_nothing_around_within(self):
+        with self.assertRaises(DatasetAccessException):
+            self._selection().around(datetime(2017, 6, 22, 0, 42, 19), within=timedelta(minutes=1))
+
+    def test_should_get_between_across_directories(self):
+        names = list(self._selection().between(datetime(2017, 6, 21, 23, 0), datetime(2017, 6, 22, 0, 50),
+                                               action=lambda ds: ds.name, sort='desc'))
+        self.assertEqual(names, [NAMES['20170622'][1], NAMES['20170622'][0], NAMES['20170621'][0]])
+
+    def test_should_get_since(self):
+        names = list(self._selection().since(datetime(2017, 6, 22, 0, 40), action=lambda ds: ds.name))
+        self.assertEqual(names, NAMES['20170622'][1:3])
+
+    def test_should_only_rescan_changed_directories(self):
+        sel = self._selection()
+        sel.latest()
+        self.assertEqual(sel.index.scans, 3)
+
+        sel.latest()
+        self.assertEqual(sel.index.scans, 3)
+
+        self._touch(os.path.join('20170622', 'GOES16_20170622_010719_0.64_500m_33.3N_91.4W.nc4'))
+        with patch('weatherpy.internal.pyhelpers.current_time_utc', return_value=datetime(2017, 6, 22, 2, 0)):
+            self.assertEqual(sel.latest().name, 'GOES16_20170622_010719_0.64_500m_33.3N_91.4W.nc4')
+        self.assertEqual(sel.index.scans, 4)
+
+    def test_should_not_refresh_within_interval(self):
+        sel = self._selection(refresh_interval=timedelta(hours=1))
+        with patch.object(sel.index, 'refresh', wraps=sel.index.refresh) as refresh:
+            sel.latest()
+            sel.around(datetime(2017, 6, 22, 0, 45))
+            list(sel.since(datetime(2017, 6, 22, 0, 40)))
+            self.assertEqual(refresh.call_count, 1)
+
+            self._touch(os.path.join('20170622', 'GOES16_20170622_010719_0.64_500m_33.3N_91.4W.nc4'))
+            self.assertEqual(sel.latest().name, NAMES['20170622'][2])
+
+            sel.refresh()
+            self.assertEqual(sel.latest().name, 'GOES16_20170622_010719_0.64_500m_33.3N_91.4W.nc4')
+            self.assertEqual(refresh.call_count, 2)
+
+    def test_should_reuse_persisted_index(self):
+        self._selection().latest()
+
+        sel = self._selection()
+        self.assertEqual(sel.latest().name, NAMES['20170622'][2])
+        self.assertEqual(sel.index.scans, 0)
+
+    def test_should_forget_removed_directories(self):
+        sel = self._selection()
+        sel.latest()
+        shutil.rmtree(os.path.join(self.tmpdir, '20170622'))
+
+        self.assertEqual(sel.latest().name, NAMES['20170621'][0])
+
+
+class TestTimestampFromName(TestCase):
+    def test_should_raise_value_error_for_invalid_name(self):
+        with self.assertRaises(ValueError):
+            goes16.timestamp_from_name('README.txt')
+
+    def test_index_should_skip_unparseable_files(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            for name in ('GOES16_20170622_003719_0.64.nc4', 'README.txt'):
+                with open(os.path.join(tmpdir, name), 'w'):
+                    pass
+            index = ArchiveIndex(tmpdir, goes16.timestamp_from_name, index_path=os.path.join(tmpdir, 'index.json'))
+            index.refresh()
+            self.assertEqual([ts for ts, _ in index.entries()], [datetime(2017, 6, 22, 0, 37, 19)])
+        finally:
+            shutil.rmtree(tmpdir)
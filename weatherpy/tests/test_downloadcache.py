@@ -0,0 +1,158 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+import netCDF4
+import requests
+
+from weatherpy.downloadcache import DownloadCache
+from weatherpy.thredds import cached_action
+
+from thredds_stub import StubThreddsServer
+
+
+class TestDownloadCache(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.server = StubThreddsServer().__enter__()
+        for name, body in (('a.nc4', b'a' * 100), ('b.nc4', b'b' * 100), ('c.nc4', b'c' * 100),
+                           ('a-copy.nc4', b'a' * 100)):
+            self.server.add('data/' + name, body, content_type='application/octet-stream')
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+        shutil.rmtree(self.tmpdir)
+
+    def _url(self, name):
+        return self.server.url + 'data/' + name
+
+    def _cache(self, max_bytes=1000):
+        return DownloadCache(os.path.join(self.tmpdir, 'cache'), max_bytes=max_bytes)
+
+    def test_should_download_once(self):
+        cache = self._cache()
+        path1 = cache.fetch(self._url('a.nc4'))
+        path2 = cache.fetch(self._url('a.nc4'))
+
+        self.assertEqual(path1, path2)
+        self.assertTrue(path1.endswith('.nc4'))
+        with open(path1, 'rb') as f:
+            self.assertEqual(f.read(), b'a' * 100)
+        self.assertEqual(len(self.server.requests_for('data/a.nc4')), 1)
+
+    def test_should_store_identical_content_once(self):
+        cache = self._cache()
+        self.assertEqual(cache.fetch(self._url('a.nc4')), cache.fetch(self._url('a-copy.nc4')))
+        self.assertEqual(cache.size, 100)
+
+    def test_should_evict_least_recently_used(self):
+        cache = self._cache(max_bytes=250)
+        cache.fetch(self._url('a.nc4'))
+        cache.fetch(self._url('b.nc4'))
+        cache.fetch(self._url('a.nc4'))
+        cache.fetch(self._url('c.nc4'))
+
+        self.assertIn(self._url('a.nc4'), cache)
+        self.assertNotIn(self._url('b.nc4'), cache)
+        self.assertIn(self._url('c.nc4'), cache)
+        self.assertEqual(cache.size, 200)
+
+    def test_should_persist_index(self):
+        self._cache().fetch(self._url('a.nc4'))
+        cache = self._cache()
+
+        self.assertIn(self._url('a.nc4'), cache)
+        cache.fetch(self._url('a.nc4'))
+        self.assertEqual(len(self.server.requests_for('data/a.nc4')), 1)
+
+    def test_should_not_rewrite_index_on_every_hit(self):
+        cache = self._cache()
+        cache.fetch(self._url('a.nc4'))
+        with patch.object(cache, '_save_index', wraps=cache._save_index) as save:
+            for _ in range(5):
+                cache.fetch(self._url('a.nc4'))
+            self.assertEqual(save.call_count, 0)
+
+            cache.flush()
+            self.assertEqual(save.call_count, 1)
+            cache.flush()
+            self.assertEqual(save.call_count, 1)
+
+    def test_should_save_hits_after_flush_interval(self):
+        cache = self._cache()
+        cache.fetch(self._url('a.nc4'))
+        with patch('weatherpy.downloadcache.INDEX_FLUSH_INTERVAL', 0), \
+                patch.object(cache, '_save_index', wraps=cache._save_index) as save:
+            cache.fetch(self._url('a.nc4'))
+            self.assertEqual(save.call_count, 1)
+
+    def test_should_download_once_for_concurrent_fetches(self):
+        cache = self._cache()
+        download = cache._download
+
+        def slow_download(url):
+            time.sleep(0.2)
+            return download(url)
+
+        with patch.object(cache, '_download', side_effect=slow_download):
+            paths = []
+            threads = [threading.Thread(target=lambda: paths.append(cache.fetch(self._url('a.nc4'))))
+                       for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        self.assertEqual(len(set(paths)), 1)
+        self.assertEqual(len(paths), 4)
+        self.assertEqual(len(self.server.requests_for('data/a.nc4')), 1)
+        self.assertEqual(cache._url_locks, {})
+
+    def test_should_share_downloads_between_caches_on_same_directory(self):
+        cache1 = self._cache()
+        cache2 = self._cache()
+        cache1.fetch(self._url('a.nc4'))
+        cache2.fetch(self._url('b.nc4'))
+
+        self.assertEqual(cache2.fetch(self._url('a.nc4')), cache1.fetch(self._url('a.nc4')))
+        self.assertEqual(len(self.server.requests_for('data/a.nc4')), 1)
+        self.assertIn(self._url('a.nc4'), self._cache())
+        self.assertIn(self._url('b.nc4'), self._cache())
+
+    def test_should_reuse_fixed_set_of_lock_files(self):
+        cache = self._cache()
+        for name in ('a.nc4', 'b.nc4', 'c.nc4', 'a-copy.nc4'):
+            cache.fetch(self._url(name))
+
+        lock_files = os.listdir(os.path.join(cache.directory, 'locks'))
+        self.assertLessEqual(len(lock_files), 5)
+        self.assertTrue(all(f in ['index.lock'] + ['url-{:02d}.lock'.format(i) for i in range(64)]
+                            for f in lock_files))
+
+    def test_should_not_cache_failed_downloads(self):
+        cache = self._cache()
+        with self.assertRaises(requests.exceptions.HTTPError):
+            cache.fetch(self._url('missing.nc4'))
+        self.assertEqual(cache.size, 0)
+        self.assertEqual([f for f in os.listdir(cache.directory) if f.endswith('.part')], [])
+
+    def test_should_open_cached_dataset_in_plotter(self):
+        ncfile = os.path.join(self.tmpdir, 'scan.nc')
+        with netCDF4.Dataset(ncfile, 'w') as ds:
+            ds.title = 'test scan'
+        with open(ncfile, 'rb') as f:
+            self.server.add('data/scan.nc', f.read(), content_type='application/x-netcdf')
+
+        catalog_ds = MagicMock()
+        catalog_ds.access_urls = {'HTTPServer': self._url('scan.nc'), 'OPENDAP': 'unused'}
+        action = cached_action(lambda ds: ds, self._cache())
+
+        ds = action(catalog_ds)
+        try:
+            self.assertEqual(ds.title, 'test scan')
+        finally:
+            ds.close()
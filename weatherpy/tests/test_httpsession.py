@@ -0,0 +1,186 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from unittest import TestCase
+from unittest.mock import patch
+
+import requests
+from siphon.catalog import TDSCatalog
+
+from weatherpy import httpsession
+
+from thredds_stub import StubThreddsServer
+
+
+class TestHttpSession(TestCase):
+    def setUp(self):
+        self.server = StubThreddsServer().__enter__()
+        self.server.add('data/file.nc', b'abc', content_type='application/octet-stream')
+        self.adapter = httpsession.configure(timeout=(1, 0.5), retries=2, backoff_factor=0, per_host=2)
+        httpsession.metrics().clear()
+
+    def tearDown(self):
+        httpsession.configure()
+        self.server.__exit__(None, None, None)
+
+    def test_should_keep_configured_adapter(self):
+        self.assertIs(httpsession.ensure_configured(), self.adapter)
+        self.assertIs(httpsession.get_session().get_adapter(self.server.url), self.adapter)
+
+    def test_should_share_adapter_across_sessions(self):
+        s1 = httpsession.get_session()
+        s2 = httpsession.get_session()
+        self.assertIs(s1.get_adapter(self.server.url), self.adapter)
+        self.assertIs(s2.get_adapter(self.server.url), self.adapter)
+
+    def test_siphon_catalogs_should_use_shared_adapter(self):
+        self.server.add_catalog('catalog.xml', ['a.nc4', 'b.nc4'])
+        cat = TDSCatalog(self.server.url + 'catalog.xml')
+
+        self.assertEqual(list(cat.datasets), ['a.nc4', 'b.nc4'])
+        self.assertIs(cat.session.get_adapter(self.server.url), self.adapter)
+        self.assertEqual(len(httpsession.metrics().records), 1)
+
+    def test_should_retry_server_errors(self):
+        self.server.fail('data/file.nc', 2)
+        resp = httpsession.get_session().get(self.server.url + 'data/file.nc')
+
+        self.assertEqual(resp.content, b'abc')
+        self.assertEqual(len(self.server.requests_for('data/file.nc')), 3)
+
+    def test_should_apply_default_timeout(self):
+        self.server.delay = lambda path: time.sleep(1)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            httpsession.get_session().get(self.server.url + 'data/file.nc')
+
+    def test_should_cap_concurrent_requests_per_host(self):
+        self.server.delay = lambda path: time.sleep(0.1)
+        session = httpsession.get_session()
+        with ThreadPoolExecutor(6) as pool:
+            list(pool.map(lambda _: session.get(self.server.url + 'data/file.nc'), range(6)))
+
+        self.assertEqual(self.server.peak_active, 2)
+
+    def test_should_report_latency_metrics(self):
+        session = httpsession.get_session()
+        session.get(self.server.url + 'data/file.nc')
+        session.get(self.server.url + 'missing.nc')
+
+        records = httpsession.metrics().records
+        self.assertEqual([r.status for r in records], [200, 404])
+        self.assertTrue(all(r.elapsed > 0 for r in records))
+
+        summary = httpsession.metrics().summary()[records[0].host]
+        self.assertEqual(summary['count'], 2)
+        self.assertEqual(summary['errors'], 1)
+
+
+class TestCatalogCache(TestCase):
+    def setUp(self):
+        self.server = StubThreddsServer().__enter__()
+        self.current_time_patcher = patch('weatherpy.internal.pyhelpers.current_time_utc',
+                                          return_value=datetime(2017, 6, 22, 1, 20))
+        self.current_time_patcher.start()
+        self.adapter = httpsession.configure(retries=0)
+        httpsession.catalog_cache().clear()
+        httpsession.metrics().clear()
+
+    def tearDown(self):
+        self.current_time_patcher.stop()
+        httpsession.configure()
+        httpsession.catalog_cache().clear()
+        self.server.__exit__(None, None, None)
+
+    def test_should_not_refetch_past_day_catalogs(self):
+        self.server.add_catalog('CONUS/Channel02/20170621/catalog.xml', ['a.nc4', 'b.nc4'])
+        url = self.server.url + 'CONUS/Channel02/20170621/catalog.xml'
+        first = TDSCatalog(url)
+        second = TDSCatalog(url)
+
+        self.assertEqual(list(second.datasets), list(first.datasets))
+        self.assertEqual(len(self.server.requests_for('CONUS/Channel02/20170621/catalog.xml')), 1)
+
+    def test_should_revalidate_current_catalogs_with_etag(self):
+        path = 'CONUS/Channel02/20170622/catalog.xml'
+        self.server.add_catalog(path, ['a.nc4'], etag='"v1"')
+        TDSCatalog(self.server.url + path)
+        cat = TDSCatalog(self.server.url + path)
+
+        self.assertEqual(list(cat.datasets), ['a.nc4'])
+        requests_made = self.server.requests_for(path)
+        self.assertEqual(len(requests_made), 2)
+        self.assertEqual(requests_made[1]['headers'].get('If-None-Match'), '"v1"')
+        self.assertEqual([r.status for r in httpsession.metrics().records], [200, 304])
+
+    def test_should_revalidate_with_last_modified(self):
+        path = 'CONUS/Channel02/20170622/catalog.xml'
+        self.server.add_catalog(path, ['a.nc4'], last_modified='Thu, 22 Jun 2017 01:00:00 GMT')
+        TDSCatalog(self.server.url + path)
+        TDSCatalog(self.server.url + path)
+
+        self.assertEqual(self.server.requests_for(path)[1]['headers'].get('If-Modified-Since'),
+                         'Thu, 22 Jun 2017 01:00:00 GMT')
+        self.assertEqual(httpsession.metrics().records[-1].status, 304)
+
+    def test_should_pick_up_changed_catalogs(self):
+        path = 'CONUS/Channel02/20170622/catalog.xml'
+        self.server.add_catalog(path, ['a.nc4'], etag='"v1"')
+        TDSCatalog(self.server.url + path)
+        self.server.add_catalog(path, ['a.nc4', 'b.nc4'], etag='"v2"')
+
+        self.assertEqual(list(TDSCatalog(self.server.url + path).datasets), ['a.nc4', 'b.nc4'])
+        self.assertEqual(list(TDSCatalog(self.server.url + path).datasets), ['a.nc4', 'b.nc4'])
+        self.assertEqual([r.status for r in httpsession.metrics().records], [200, 200, 304])
+
+    def test_should_use_current_catalogs_within_ttl(self):
+        httpsession.configure(retries=0, catalog_policy=httpsession.CatalogCachePolicy(current_ttl=60))
+        path = 'CONUS/Channel02/20170622/catalog.xml'
+        self.server.add_catalog(path, ['a.nc4'], etag='"v1"')
+        TDSCatalog(self.server.url + path)
+        TDSCatalog(self.server.url + path)
+
+        self.assertEqual(len(self.server.requests_for(path)), 1)
+
+    def test_should_not_cache_data_files(self):
+        self.server.add('data/file.nc', b'abc', content_type='application/octet-stream', etag='"v1"')
+        session = httpsession.get_session()
+        session.get(self.server.url + 'data/file.nc')
+        session.get(self.server.url + 'data/file.nc')
+
+        self.assertEqual(len(httpsession.catalog_cache()), 0)
+        self.assertNotIn('If-None-Match', self.server.requests_for('data/file.nc')[1]['headers'])
+
+    def test_should_not_cache_when_disabled(self):
+        httpsession.configure(retries=0, cache_catalogs=False)
+        self.server.add_catalog('CONUS/Channel02/20170621/catalog.xml', ['a.nc4'])
+        url = self.server.url + 'CONUS/Channel02/20170621/catalog.xml'
+        TDSCatalog(url)
+        TDSCatalog(url)
+
+        self.assertEqual(len(self.server.requests_for('CONUS/Channel02/20170621/catalog.xml')), 2)
+
+
+class TestCatalogCachePolicy(TestCase):
+    def setUp(self):
+        self.policy = httpsession.CatalogCachePolicy(current_ttl=5, past_ttl=3600, settle=timedelta(hours=1))
+        self.current_time_patcher = patch('weatherpy.internal.pyhelpers.current_time_utc',
+                                          return_value=datetime(2017, 6, 22, 1, 20))
+        self.current_time_patcher.start()
+
+    def tearDown(self):
+        self.current_time_patcher.stop()
+
+    def test_dated_catalogs(self):
+        self.assertEqual(self.policy.ttl('http://host/CONUS/Channel02/20170621/catalog.xml'), 3600)
+        self.assertEqual(self.policy.ttl('http://host/CONUS/Channel02/20170622/catalog.xml'), 5)
+        self.assertEqual(self.policy.ttl('http://host/WV/EAST-CONUS_4km/current/catalog.xml'), 5)
+
+    def test_past_catalogs_expire_by_default(self):
+        ttl = httpsession.CatalogCachePolicy().ttl('http://host/CONUS/Channel02/20170621/catalog.xml')
+        self.assertEqual(ttl, httpsession.DEFAULT_PAST_TTL)
+        self.assertIsNotNone(ttl)
+
+    def test_radar_queries(self):
+        base = 'http://host/thredds/radarServer/nexrad/level2/IDD?stn=KTLX&time_start=2017-06-21T00:00:00&'
+        self.assertEqual(self.policy.ttl(base + 'time_end=2017-06-22T00:00:00'), 3600)
+        self.assertEqual(self.policy.ttl(base + 'time_end=2017-06-22T01:00:00'), 5)
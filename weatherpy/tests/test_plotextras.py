@@ -0,0 +1,231 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import cartopy.crs as ccrs
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib import rcParams
+from matplotlib.backend_bases import FigureCanvasBase
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
+
+from weatherpy import ctables, maps, plotextras
+
+
+class TestSaveImage(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        plt.close('all')
+        shutil.rmtree(self.tmpdir)
+
+    def _fig(self):
+        fig = plt.figure(figsize=(2, 2), dpi=50)
+        fig.add_subplot(111).plot([0, 1], [0, 1])
+        return fig
+
+    def _saveloc(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def test_should_compute_layout_once_per_template(self):
+        layout = plotextras.FixedLayout()
+        fig1 = self._fig()
+        fig2 = self._fig()
+
+        with patch.object(fig2, 'get_tightbbox') as tightbbox:
+            plotextras.save_image_no_border(fig1, self._saveloc('1.png'), layout=layout)
+            plotextras.save_image_no_border(fig2, self._saveloc('2.png'), layout=layout)
+            tightbbox.assert_not_called()
+
+        self.assertEqual(Image.open(self._saveloc('1.png')).size, Image.open(self._saveloc('2.png')).size)
+
+    def test_fixed_layout_should_match_tight_layout(self):
+        fig = self._fig()
+        plotextras.save_image_no_border(fig, self._saveloc('tight.png'))
+        plotextras.save_image_no_border(fig, self._saveloc('fixed.png'), layout=plotextras.FixedLayout())
+
+        self.assertEqual(Image.open(self._saveloc('tight.png')).size, Image.open(self._saveloc('fixed.png')).size)
+
+    def test_should_recompute_layout_for_different_template(self):
+        layout = plotextras.FixedLayout()
+        bbox1 = layout.bbox_inches(self._fig())
+        bbox2 = layout.bbox_inches(plt.figure(figsize=(4, 2), dpi=50))
+        self.assertNotEqual(bbox1.bounds, bbox2.bounds)
+
+    def test_should_recompute_layout_for_different_axes(self):
+        layout = plotextras.FixedLayout()
+        bbox1 = layout.bbox_inches(self._fig())
+
+        moved = plt.figure(figsize=(2, 2), dpi=50)
+        moved.add_axes([0.3, 0.3, 0.4, 0.4]).plot([0, 1], [0, 1])
+        self.assertNotEqual(layout.bbox_inches(moved).bounds, bbox1.bounds)
+
+        labeled = self._fig()
+        labeled.axes[0].set_ylim(0, 100000)
+        labeled.axes[0].set_title('title')
+        with patch.object(labeled, 'get_tightbbox', wraps=labeled.get_tightbbox) as tightbbox:
+            layout.bbox_inches(labeled)
+            tightbbox.assert_called_once()
+
+    def test_should_share_layout_by_explicit_key(self):
+        layout = plotextras.FixedLayout()
+        bbox = layout.bbox_inches(self._fig(), key='radar')
+        other = plt.figure(figsize=(4, 2), dpi=50)
+        with patch.object(other, 'get_tightbbox') as tightbbox:
+            self.assertIs(layout.bbox_inches(other, key='radar'), bbox)
+            tightbbox.assert_not_called()
+
+    def test_should_save_with_compression_level(self):
+        fig = self._fig()
+        plotextras.save_image_no_border(fig, self._saveloc('fast.png'), compress_level=1)
+        plotextras.save_image_no_border(fig, self._saveloc('small.png'), compress_level=9)
+
+        self.assertGreaterEqual(os.path.getsize(self._saveloc('fast.png')),
+                                os.path.getsize(self._saveloc('small.png')))
+
+    def test_should_save_webp(self):
+        plotextras.save_image_no_border(self._fig(), self._saveloc('img.webp'), fmt='webp', quality=80)
+        self.assertEqual(Image.open(self._saveloc('img.webp')).format, 'WEBP')
+
+
+class TestBackgroundSaver(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        plt.close('all')
+        shutil.rmtree(self.tmpdir)
+
+    def _saveloc(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def test_should_save_figures_closed_by_figcontext(self):
+        with plotextras.BackgroundSaver(workers=2, max_pending=1) as saver:
+            for i in range(4):
+                with plotextras.figcontext(figsize=(1, 1), dpi=30) as fig:
+                    fig.add_subplot(111).plot([0, i])
+                    saver.submit(fig, self._saveloc('{}.png'.format(i)))
+
+        for i in range(4):
+            self.assertEqual(Image.open(self._saveloc('{}.png'.format(i))).size, (30, 30))
+
+    def test_should_save_jpeg_by_extension(self):
+        with plotextras.BackgroundSaver() as saver:
+            fig = plt.figure(figsize=(1, 1), dpi=20)
+            saver.submit(fig, self._saveloc('img.jpg'))
+
+        img = Image.open(self._saveloc('img.jpg'))
+        self.assertEqual((img.format, img.mode), ('JPEG', 'RGB'))
+
+    def test_should_crop_to_layout(self):
+        layout = plotextras.FixedLayout(pad_inches=-0.1)
+        with plotextras.BackgroundSaver(layout=layout) as saver:
+            fig = plt.figure(figsize=(2, 1), dpi=40)
+            fig.add_subplot(111).plot([0, 1])
+            saver.submit(fig, self._saveloc('cropped.png'))
+
+        width, height = Image.open(self._saveloc('cropped.png')).size
+        self.assertLess(width, 80)
+        self.assertLess(height, 40)
+
+    def test_should_keep_canvas_of_non_agg_figures(self):
+        fig = Figure(figsize=(1, 1), dpi=20)
+        canvas = FigureCanvasBase(fig)
+        rgba = plotextras.figure_rgba(fig)
+
+        self.assertEqual(rgba.shape, (20, 20, 4))
+        self.assertIs(fig.canvas, canvas)
+
+    def test_should_surface_errors_on_flush(self):
+        saver = plotextras.BackgroundSaver()
+        fig = plt.figure(figsize=(1, 1), dpi=10)
+        saver.submit(fig, os.path.join(self.tmpdir, 'missing', 'dir', 'img.png'))
+        with self.assertRaises(IOError):
+            saver.flush()
+
+        # errors are reported once, and the saver remains usable
+        saver.submit(fig, self._saveloc('ok.png'))
+        saver.close()
+        self.assertTrue(os.path.exists(self._saveloc('ok.png')))
+
+    def test_should_not_accept_saves_once_closed(self):
+        saver = plotextras.BackgroundSaver()
+        saver.close()
+        with self.assertRaises(ValueError):
+            saver.submit(plt.figure(), self._saveloc('img.png'))
+
+
+class TestFigurePool(TestCase):
+    def setUp(self):
+        self.pool = plotextras.FigurePool()
+        self.crs = ccrs.LambertConformal()
+
+    def test_should_reuse_figures_of_same_template(self):
+        with self.pool.figure(figsize=(2, 2), dpi=20) as fig1:
+            pass
+        with self.pool.figure(figsize=(2, 2), dpi=20) as fig2:
+            pass
+        with self.pool.figure(figsize=(3, 2), dpi=20) as fig3:
+            pass
+
+        self.assertIs(fig1, fig2)
+        self.assertIsNot(fig1, fig3)
+
+    def test_should_reuse_figures_of_equivalent_templates(self):
+        with self.pool.figure(figsize=(2, 2), dpi=20) as fig1:
+            pass
+        with self.pool.figure(figsize=np.array([2., 2.]), dpi=20.0) as fig2:
+            pass
+        with self.pool.figure() as fig3:
+            pass
+        with self.pool.figure(figsize=rcParams['figure.figsize'], dpi=rcParams['figure.dpi']) as fig4:
+            pass
+
+        self.assertIs(fig1, fig2)
+        self.assertIs(fig3, fig4)
+
+    def test_should_draw_colorbar_without_pyplot(self):
+        fignums = plt.get_fignums()
+        with self.pool.figure(figsize=(2, 2), dpi=20) as fig:
+            ax = fig.add_subplot(111)
+            plotextras.colorbar_inset(ax, ctables.ir.alpha)
+            self.assertEqual(len(fig.axes), 2)
+        self.assertEqual(plt.get_fignums(), fignums)
+
+    def test_should_not_register_figures_with_pyplot(self):
+        fignums = plt.get_fignums()
+        with self.pool.figure(figsize=(2, 2), dpi=20) as fig:
+            self.assertIsInstance(fig.canvas, FigureCanvasAgg)
+        self.assertEqual(plt.get_fignums(), fignums)
+
+    def test_should_hand_back_cleared_figure_with_same_map_axes(self):
+        with self.pool.figure(figsize=(2, 2), dpi=20) as fig:
+            ax = self.pool.map_axes(fig, self.crs)
+            ax.plot([0, 1], [0, 1])
+            fig.add_axes([0, 0, 0.1, 0.1])
+            fig.text(0.5, 0.5, 'stamp')
+
+        with self.pool.figure(figsize=(2, 2), dpi=20) as fig:
+            self.assertEqual(fig.axes, [ax])
+            self.assertFalse(ax.lines)
+            self.assertFalse(fig.texts)
+            self.assertIs(self.pool.map_axes(fig, self.crs), ax)
+
+    def test_should_replace_map_axes_for_different_projection(self):
+        with self.pool.figure(figsize=(2, 2), dpi=20) as fig:
+            ax1 = self.pool.map_axes(fig, self.crs)
+            ax2 = self.pool.map_axes(fig, ccrs.Mercator())
+
+            self.assertIsNot(ax1, ax2)
+            self.assertEqual(fig.axes, [ax2])
+
+    def test_should_initialize_mapper_on_pooled_axes(self):
+        mapper = maps.LargeScaleMap(self.crs)
+        with self.pool.figure(figsize=(2, 2), dpi=20) as fig:
+            self.pool.initialize(mapper, fig)
+            self.assertIs(mapper.ax, self.pool.map_axes(fig, self.crs))
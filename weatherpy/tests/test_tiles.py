@@ -0,0 +1,180 @@
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from unittest import TestCase
+
+import netCDF4
+import numpy as np
+
+import config
+from weatherpy import ctables, tiles
+from weatherpy.maps import extents
+from weatherpy.satellite.goes16 import Goes16Plotter
+from weatherpy.tiles import TileRenderer, TileCache, seed_tiles, colorize, tiles_covering, tile_lonlat
+
+INFRARED_SECTOR_FILE = 'GOES16_Mesoscale-1_20170628_235927_11.20_2km_41.8N_95.6W_Ch14.nc4'
+
+
+class TestTileMath(TestCase):
+    def test_world_tile(self):
+        west, south, east, north = tiles.tile_bounds(0, 0, 0)
+        self.assertAlmostEqual(west, -20037508.342789244)
+        self.assertAlmostEqual(north, 20037508.342789244)
+
+        lon, lat = tile_lonlat(0, 0, 0, size=4)
+        np.testing.assert_allclose(lon[0], [-135, -45, 45, 135])
+        self.assertGreater(lat[0, 0], lat[-1, 0])
+
+    def test_tiles_covering(self):
+        self.assertEqual(tiles_covering(extents.conus, 0), [(0, 0)])
+        # conus spans tiles x 2..5 and y 5..7 at zoom 4
+        covered = tiles_covering(extents.conus, 4)
+        self.assertEqual(sorted(set(x for x, _ in covered)), [2, 3, 4, 5])
+        self.assertEqual(sorted(set(y for _, y in covered)), [5, 6, 7])
+
+
+class TestColorize(TestCase):
+    def test_matches_colortable(self):
+        ctable = ctables.ir.alpha
+        values = np.linspace(ctable.norm.vmin, ctable.norm.vmax, 50)
+        expected = ctable.cmap(ctable.norm(values), bytes=True)
+        np.testing.assert_array_equal(colorize(values, ctable), expected)
+
+    def test_missing_and_out_of_range(self):
+        ctable = ctables.ir.alpha
+        rgba = colorize(np.array([np.nan, ctable.norm.vmax + 100]), ctable)
+        np.testing.assert_array_equal(rgba[0], ctable.cmap(np.ma.masked_invalid([np.nan]), bytes=True)[0])
+        np.testing.assert_array_equal(rgba[1], ctable.cmap(1.0, bytes=True))
+
+
+class TestSatelliteTiles(TestCase):
+    def setUp(self):
+        self.path = os.path.join(config.TEST_DATA_DIR, INFRARED_SECTOR_FILE)
+        self.plotter = Goes16Plotter(netCDF4.Dataset(self.path))
+        self.renderer = TileRenderer(self.plotter)
+
+    def tearDown(self):
+        self.plotter.close()
+
+    def test_tile_pixels_are_nearest_grid_values(self):
+        # Des Moines at zoom 7
+        z, x, y = 7, 30, 47
+        rgba = self.renderer.render(z, x, y)
+        self.assertEqual(rgba.shape, (256, 256, 4))
+
+        lon, lat = tile_lonlat(z, x, y)
+        gx, gy = self.plotter._coordinates()
+        point = self.plotter.transform_crs.transform_point(lon[100, 120], lat[100, 120], tiles.ccrs.Geodetic())
+        col = np.abs(gx - point[0]).argmin()
+        row = np.abs(gy - point[1]).argmin()
+        value = self.plotter._unit_converter(self.renderer._colortable)(
+            np.float32(self.plotter.dataset.variables['Sectorized_CMI'][row, col]))
+        np.testing.assert_array_equal(rgba[100, 120], colorize(np.array([value]), self.renderer._colortable)[0])
+
+    def test_tile_reads_only_its_window(self):
+        scmi = self.plotter._scmi
+        reads = []
+
+        class RecordingVariable(object):
+            def __getattr__(self, name):
+                return getattr(scmi, name)
+
+            def __getitem__(self, item):
+                reads.append(item)
+                return scmi[item]
+
+        self.plotter._scmi = RecordingVariable()
+        self.renderer.render(9, 122, 190)
+        (yslice, xslice), = reads
+        self.assertLess(yslice.stop - yslice.start, scmi.shape[0] // 2)
+        self.assertLess(xslice.stop - xslice.start, scmi.shape[1] // 2)
+
+    def test_tile_outside_data_is_empty(self):
+        rgba = self.renderer.render(7, 64, 40)
+        self.assertTrue((rgba == rgba[0, 0]).all())
+        self.assertEqual(rgba[0, 0, 3], 0)
+
+    def test_warp_is_cached_across_renderers(self):
+        self.renderer.render(6, 15, 23)
+        warp = tiles._warp(self.renderer._source, 6, 15, 23, 256)
+        other = TileRenderer(self.plotter, ctables.ir.rainbow)
+        self.assertIs(tiles._warp(other._source, 6, 15, 23, 256), warp)
+
+    def test_bounds(self):
+        bounds = self.renderer.bounds()
+        self.assertLess(bounds.west, -95.6)
+        self.assertGreater(bounds.east, -95.6)
+        self.assertLess(bounds.south, 41.8)
+        self.assertGreater(bounds.north, 41.8)
+
+
+class TestTileCache(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.timestamp = datetime(2017, 6, 28, 23, 59, 27)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_put_and_get(self):
+        cache = TileCache(self.tmpdir)
+        cache.put('product', self.timestamp, 'style', 5, 1, 2, b'png')
+        self.assertEqual(cache.get('product', self.timestamp, 'style', 5, 1, 2), b'png')
+        self.assertIsNone(cache.get('product', self.timestamp, 'other', 5, 1, 2))
+        self.assertIsNone(cache.get('product', datetime(2017, 6, 29), 'style', 5, 1, 2))
+
+    def test_ttl_per_product(self):
+        cache = TileCache(self.tmpdir, ttl=lambda product, timestamp: 0 if product == 'latest' else 3600)
+        cache.put('latest', self.timestamp, 'style', 5, 1, 2, b'png')
+        cache.put('archived', self.timestamp, 'style', 5, 1, 2, b'png')
+        time.sleep(0.01)
+        self.assertIsNone(cache.get('latest', self.timestamp, 'style', 5, 1, 2))
+        self.assertEqual(cache.get('archived', self.timestamp, 'style', 5, 1, 2), b'png')
+
+    def test_purge(self):
+        cache = TileCache(self.tmpdir, ttl=lambda product, timestamp: 0 if timestamp.year < 2017 else 3600)
+        cache.put('product', datetime(2016, 1, 1), 'style', 5, 1, 2, b'old')
+        cache.put('product', self.timestamp, 'style', 5, 1, 2, b'new')
+        time.sleep(0.01)
+        self.assertEqual(cache.purge(), 1)
+        self.assertEqual(os.listdir(os.path.join(self.tmpdir, 'product')), ['20170628_235927'])
+
+    def test_renderer_uses_cache(self):
+        cache = TileCache(self.tmpdir)
+        with Goes16Plotter(netCDF4.Dataset(os.path.join(config.TEST_DATA_DIR, INFRARED_SECTOR_FILE))) as plotter:
+            renderer = TileRenderer(plotter, cache=cache)
+            png = renderer.tile(7, 30, 47)
+            self.assertTrue(png.startswith(b'\x89PNG'))
+            path = cache.path(renderer.product, renderer.timestamp, renderer.style, 7, 30, 47)
+            self.assertTrue(os.path.exists(path))
+            renderer.render = None
+            self.assertEqual(renderer.tile(7, 30, 47), png)
+
+
+class TestSeedTiles(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(config.TEST_DATA_DIR, INFRARED_SECTOR_FILE)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _tiles_on_disk(self):
+        return sum(len(files) for _, _, files in os.walk(self.tmpdir))
+
+    def test_seed_in_process(self):
+        cache = TileCache(self.tmpdir)
+        seeded = seed_tiles(self.path, range(4, 6), cache, workers=0)
+        self.assertGreater(seeded, 0)
+        self.assertEqual(self._tiles_on_disk(), seeded)
+        self.assertEqual(seed_tiles(self.path, range(4, 6), cache, workers=0), 0)
+
+    def test_seed_in_process_pool(self):
+        cache = TileCache(self.tmpdir)
+        serial_dir = os.path.join(self.tmpdir, 'serial')
+        expected = seed_tiles(self.path, range(5, 7), TileCache(serial_dir), workers=0)
+        shutil.rmtree(serial_dir)
+        self.assertEqual(seed_tiles(self.path, range(5, 7), cache, workers=2), expected)
+        self.assertEqual(self._tiles_on_disk(), expected)
@@ -1,6 +1,8 @@
 import unittest
 from unittest import mock
 
+import numpy as np
+
 from weatherpy import units
 from weatherpy.units import UnitsException, Scale
 
@@ -159,3 +161,17 @@ class Test_Scale(unittest.TestCase):
     def test_scale_eq(self):
         self.assertEqual(Scale(2, 5.5), Scale(2, 6.5 - 1))
         self.assertNotEqual(Scale(2, 5.5), Scale(1.5, 3.75))
+
+    def test_arrayconvert_converts_whole_arrays(self):
+        convert = units.arrayconvert(units.KELVIN, units.CELSIUS)
+        arr = np.array([[273.15, 283.15], [np.nan, 300.]], dtype=np.float32)
+        converted = convert(arr)
+        self.assertEqual(converted.shape, arr.shape)
+        np.testing.assert_allclose(converted, [[0., 10.], [np.nan, 26.85]], atol=1e-4)
+
+    def test_arrayconvert_keeps_masks(self):
+        convert = units.arrayconvert(Scale(0, 10), Scale(0, 1))
+        arr = np.ma.array([5., 10.], mask=[False, True])
+        converted = convert(arr)
+        self.assertAlmostEqual(converted[0], 0.5)
+        self.assertTrue(converted.mask[1])
@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+import requests
+
+from weatherpy.watcher import Watcher, watch
+
+
+class FakeSelection(object):
+    def __init__(self, name, timestamps):
+        self.name = name
+        self.published = {ts: '{}_{}'.format(name, ts.strftime('%H%M')) for ts in timestamps}
+        self.queries = []
+
+    def publish(self, ts):
+        self.published[ts] = '{}_{}'.format(self.name, ts.strftime('%H%M'))
+
+    def _default_action(self, ds):
+        return ds
+
+    def _datasets_between(self, t1, t2, sort):
+        self.queries.append((t1, t2))
+        return ((ts, self.published[ts]) for ts in sorted(self.published) if t1 <= ts < t2)
+
+
+class TestWatcher(TestCase):
+    def setUp(self):
+        self.now = datetime(2017, 7, 16, 0, 0)
+        self.clock_patcher = patch('weatherpy.internal.pyhelpers.current_time_utc', side_effect=lambda: self.now)
+        self.clock_patcher.start()
+        self.sleeps = []
+
+    def tearDown(self):
+        self.clock_patcher.stop()
+
+    def _sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += timedelta(seconds=seconds)
+
+    def _scans(self, *minutes_ago):
+        return [self.now - timedelta(minutes=m) for m in minutes_ago]
+
+    def test_should_yield_only_datasets_since_start(self):
+        sel = FakeSelection('KMUX', self._scans(15, 10, 5))
+        watcher = Watcher(sleep=self._sleep)
+        watcher.add(sel, since=self.now - timedelta(minutes=7))
+
+        self.assertEqual(watcher.poll(), [(sel, 'KMUX_2355')])
+
+    def test_should_look_back_to_since_older_than_lookback(self):
+        sel = FakeSelection('KMUX', self._scans(150, 90, 30))
+        watcher = Watcher(sleep=self._sleep)
+        watcher.add(sel, since=self.now - timedelta(hours=2))
+
+        self.assertEqual(watcher.poll(), [(sel, 'KMUX_2230'), (sel, 'KMUX_2330')])
+        t1, _ = sel.queries[0]
+        self.assertEqual(t1, self.now - timedelta(hours=2))
+
+    def test_should_yield_each_new_dataset_once(self):
+        sel = FakeSelection('KMUX', self._scans(10, 5))
+        watcher = Watcher(sleep=self._sleep)
+        watcher.add(sel, label='KMUX')
+        self.assertEqual(watcher.poll(), [])
+
+        self.now += timedelta(minutes=5)
+        sel.publish(self.now - timedelta(minutes=1))
+        items = list(watcher.run(limit=1))
+
+        self.assertEqual(items, [('KMUX', 'KMUX_0004')])
+        self.assertEqual(watcher.poll(), [])
+
+    def test_should_keep_undelivered_datasets_after_limit(self):
+        sel = FakeSelection('KMUX', self._scans(15, 10, 5))
+        actions = []
+        watcher = Watcher(sleep=self._sleep)
+        watcher.add(sel, action=lambda ds: actions.append(ds) or ds, label='KMUX',
+                    since=self.now - timedelta(minutes=20))
+
+        self.assertEqual(list(watcher.run(limit=1)), [('KMUX', 'KMUX_2345')])
+        self.assertEqual(actions, ['KMUX_2345'])
+
+        self.assertEqual(list(watcher.run(limit=2)), [('KMUX', 'KMUX_2350'), ('KMUX', 'KMUX_2355')])
+        self.assertEqual(actions, ['KMUX_2345', 'KMUX_2350', 'KMUX_2355'])
+        self.assertEqual(watcher.poll(), [])
+
+    def test_should_keep_undelivered_datasets_after_stop(self):
+        sel = FakeSelection('KMUX', self._scans(15, 10, 5))
+        watcher = Watcher(sleep=self._sleep)
+        watcher.add(sel, label='KMUX', since=self.now - timedelta(minutes=20))
+
+        results = watcher.run()
+        self.assertEqual(next(results), ('KMUX', 'KMUX_2345'))
+        watcher.stop()
+        self.assertEqual(list(results), [])
+
+        self.assertEqual(watcher.poll(), [('KMUX', 'KMUX_2350'), ('KMUX', 'KMUX_2355')])
+
+    def test_should_refresh_incrementally_from_last_seen_timestamp(self):
+        sel = FakeSelection('KMUX', self._scans(10, 5))
+        watcher = Watcher(sleep=self._sleep)
+        watcher.add(sel)
+        watcher.poll()
+
+        self.now += timedelta(minutes=10)
+        watcher.poll()
+
+        t1, _ = sel.queries[-1]
+        self.assertEqual(t1, datetime(2017, 7, 15, 23, 55))
+
+    def test_should_schedule_next_poll_from_scan_cadence(self):
+        sel = FakeSelection('KMUX', self._scans(12, 8, 4, 0))
+        watcher = Watcher(sleep=self._sleep)
+        watcher.add(sel)
+        watcher.poll()
+
+        next_poll, _, _ = watcher._schedule[0]
+        self.assertEqual(next_poll, self.now + timedelta(minutes=4))
+
+    def test_should_back_off_when_nothing_new(self):
+        sel = FakeSelection('KMUX', [])
+        watcher = Watcher(min_interval=timedelta(seconds=10), max_interval=timedelta(seconds=60),
+                          sleep=self._sleep)
+        watcher.add(sel)
+        for _ in range(5):
+            watcher.poll()
+            self.now = watcher._schedule[0][0]
+
+        self.assertEqual([q[0] for q in sel.queries][-1] < self.now, True)
+        deltas = [(q2[1] - q1[1]).total_seconds() for q1, q2 in zip(sel.queries, sel.queries[1:])]
+        self.assertEqual(deltas, [20, 40, 60, 60])
+
+    def test_should_watch_several_targets_in_one_loop(self):
+        sel1 = FakeSelection('KMUX', self._scans(5))
+        sel2 = FakeSelection('KDAX', self._scans(2))
+        watcher = Watcher(sleep=self._sleep)
+        watcher.add(sel1, label='KMUX', since=self.now - timedelta(minutes=10))
+        watcher.add(sel2, label='KDAX', since=self.now - timedelta(minutes=10))
+
+        self.assertEqual(sorted(watcher.run(limit=2)), [('KDAX', 'KDAX_2358'), ('KMUX', 'KMUX_2355')])
+
+    def test_should_keep_watching_after_request_failure(self):
+        sel = MagicMock()
+        sel._datasets_between.side_effect = requests.exceptions.ConnectionError('down')
+        watcher = Watcher(sleep=self._sleep)
+        watcher.add(sel)
+
+        self.assertEqual(watcher.poll(), [])
+        self.assertEqual(len(watcher._schedule), 1)
+
+    def test_watch_should_apply_action(self):
+        sel = FakeSelection('KMUX', self._scans(1))
+        results = watch(sel, action=str.upper, since=self.now - timedelta(minutes=5), sleep=self._sleep)
+
+        self.assertEqual(next(results), 'KMUX_2359')
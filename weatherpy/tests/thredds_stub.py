@@ -0,0 +1,126 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+CATALOG_TEMPLATE = '''<?xml version="1.0" encoding="UTF-8"?>
+<catalog xmlns="http://www.unidata.ucar.edu/namespaces/thredds/InvCatalog/v1.0"
+         xmlns:xlink="http://www.w3.org/1999/xlink" name="{name}" version="1.0.1">
+  <service name="all" serviceType="Compound" base="">
+    <service name="OPENDAP" serviceType="OPENDAP" base="/thredds/dodsC/" />
+    <service name="HTTPServer" serviceType="HTTPServer" base="/thredds/fileServer/" />
+  </service>
+  <dataset name="{name}" ID="{name}">
+    <metadata inherited="true">
+      <serviceName>all</serviceName>
+    </metadata>
+{datasets}
+  </dataset>
+</catalog>
+'''
+
+DATASET_TEMPLATE = '    <dataset name="{name}" ID="{path}" urlPath="{path}" />'
+
+
+def catalog_xml(name, dataset_names, path_prefix='data/'):
+    datasets = '\n'.join(DATASET_TEMPLATE.format(name=ds_name, path=path_prefix + ds_name)
+                         for ds_name in dataset_names)
+    return CATALOG_TEMPLATE.format(name=name, datasets=datasets).encode()
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubThreddsServer(object):
+    """
+    A minimal local stand-in for a THREDDS server, serving fixed content per path
+    with ETag and Last-Modified validation.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self.failures = {}
+        self.delay = None
+        self.active = 0
+        self.peak_active = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = _ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}/'.format(self._server.server_address[1])
+
+    def add(self, path, body, content_type='application/xml', etag=None, status=200, last_modified=None):
+        self.routes[path.lstrip('/')] = (status, body, content_type, etag, last_modified)
+
+    def add_catalog(self, path, dataset_names, etag=None, last_modified=None):
+        self.add(path, catalog_xml(path, dataset_names), etag=etag, last_modified=last_modified)
+
+    def fail(self, path, times, status=503):
+        self.failures[path.lstrip('/')] = [status] * times
+
+    def requests_for(self, path):
+        return [req for req in self.requests if req['path'] == path.lstrip('/')]
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.shutdown()
+        self._server.server_close()
+        return None
+
+    def _handle(self, handler):
+        with self._lock:
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+        try:
+            self._respond(handler)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def _respond(self, handler):
+        path = handler.path.lstrip('/').split('?')[0]
+        with self._lock:
+            self.requests.append({'path': path, 'headers': dict(handler.headers)})
+            failure = self.failures[path].pop() if self.failures.get(path) else None
+        if self.delay is not None:
+            self.delay(path)
+
+        if failure is not None:
+            handler.send_error(failure)
+            return
+        if path not in self.routes:
+            handler.send_error(404)
+            return
+        status, body, content_type, etag, last_modified = self.routes[path]
+        if (etag is not None and handler.headers.get('If-None-Match') == etag) or \
+                (last_modified is not None and handler.headers.get('If-Modified-Since') == last_modified):
+            handler.send_response(304)
+            if etag is not None:
+                handler.send_header('ETag', etag)
+            handler.end_headers()
+            return
+
+        handler.send_response(status)
+        handler.send_header('Content-Type', content_type)
+        handler.send_header('Content-Length', str(len(body)))
+        if etag is not None:
+            handler.send_header('ETag', etag)
+        if last_modified is not None:
+            handler.send_header('Last-Modified', last_modified)
+        handler.end_headers()
+        handler.wfile.write(body)
@@ -1,8 +1,14 @@
+import functools
 import re
+import threading
 from datetime import datetime
 
 import netCDF4
 
+# netCDF4 releases the GIL around library calls, and the netCDF/HDF5 libraries aren't
+# thread-safe. Anything opening or reading datasets from several threads holds this.
+netcdf_lock = threading.RLock()
+
 
 class DatasetAccessException(Exception):
     pass
@@ -26,7 +32,50 @@ class DatasetContextManager(object):
             pass
 
 
-def dap_plotter(catalog_ds, plotter):
-    dap_url = catalog_ds.access_urls['OPENDAP']
-    ds = netCDF4.Dataset(dap_url)
-    return plotter(ds)
\ No newline at end of file
+def dap_plotter(catalog_ds, plotter, cache=None):
+    dataset = open_dap_dataset(catalog_ds, cache)
+    # plotters read their metadata as they're built
+    with netcdf_lock:
+        return plotter(dataset)
+
+
+def open_dap_dataset(catalog_ds, cache=None):
+    if cache is None:
+        path = catalog_ds.access_urls['OPENDAP']
+    else:
+        # fetch the whole file once and read it locally, instead of a remote request per slice.
+        path = cache.fetch(catalog_ds.access_urls['HTTPServer'])
+    with netcdf_lock:
+        return netCDF4.Dataset(path)
+
+
+# opened the first time an attribute or variable is used, so building a plotter doesn't touch the server
+class LazyDataset(object):
+    def __init__(self, opener):
+        self._opener = opener
+        self._dataset = None
+
+    @property
+    def opened(self):
+        return self._dataset is not None
+
+    def open(self):
+        with netcdf_lock:
+            if self._dataset is None:
+                self._dataset = self._opener()
+            return self._dataset
+
+    def __getattr__(self, name):
+        if name.startswith('__') or name in ('_opener', '_dataset'):
+            raise AttributeError(name)
+        return getattr(self.open(), name)
+
+    def close(self):
+        with netcdf_lock:
+            if self._dataset is not None:
+                dataset, self._dataset = self._dataset, None
+                dataset.close()
+
+
+def cached_action(plotter, cache):
+    return functools.partial(dap_plotter, plotter=plotter, cache=cache)
\ No newline at end of file
@@ -0,0 +1,381 @@
+import hashlib
+import io
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import cartopy.crs as ccrs
+import netCDF4
+import numpy as np
+from PIL import Image
+
+import config
+from weatherpy import units
+from weatherpy.internal import logger, haversine_distance, initial_bearing, mask_to_slice
+from weatherpy.maps.extents import geobbox
+from weatherpy.radar import nexradl2
+from weatherpy.radar.extract import _nearest_radials
+from weatherpy.radar.nexradl2 import Nexrad2Plotter
+from weatherpy.satellite.goes16 import Goes16Plotter
+from weatherpy.thredds import netcdf_lock
+
+# Renders radar and satellite data as 256x256 Web Mercator (XYZ) map tiles, without matplotlib
+# figures: each tile pixel is looked up in the source grid through a warp map, which only depends
+# on the grid's geometry and so is cached across scans, then colorized through a colortable LUT.
+
+TILE_SIZE = 256
+WARP_CACHE_SIZE = 128
+DEFAULT_TTL = 24 * 3600
+
+MERCATOR_RADIUS = 6378137.
+MERCATOR_ORIGIN = math.pi * MERCATOR_RADIUS
+MERCATOR_MAX_LATITUDE = 85.0511287798
+
+_luts = {}
+_warps = OrderedDict()
+_warps_lock = threading.Lock()
+
+
+def tile_bounds(z, x, y):
+    span = 2 * MERCATOR_ORIGIN / 2 ** z
+    west = -MERCATOR_ORIGIN + x * span
+    north = MERCATOR_ORIGIN - y * span
+    return west, north - span, west + span, north
+
+
+def tile_lonlat(z, x, y, size=TILE_SIZE):
+    # pixel centers, rows from north to south
+    west, south, east, north = tile_bounds(z, x, y)
+    offsets = (np.arange(size) + 0.5) / size
+    mx = west + offsets * (east - west)
+    my = north - offsets * (north - south)
+    lon = np.degrees(mx / MERCATOR_RADIUS)
+    lat = np.degrees(2 * np.arctan(np.exp(my / MERCATOR_RADIUS)) - math.pi / 2)
+    return np.meshgrid(lon, lat)
+
+
+def tiles_covering(extent, z):
+    n = 2 ** z
+
+    def tile_x(lon):
+        return min(max(int(math.floor((lon + 180.) / 360. * n)), 0), n - 1)
+
+    def tile_y(lat):
+        lat = math.radians(min(max(lat, -MERCATOR_MAX_LATITUDE), MERCATOR_MAX_LATITUDE))
+        return min(max(int(math.floor((1 - math.asinh(math.tan(lat)) / math.pi) / 2 * n)), 0), n - 1)
+
+    return [(x, y) for x in range(tile_x(extent.west), tile_x(extent.east) + 1)
+            for y in range(tile_y(extent.north), tile_y(extent.south) + 1)]
+
+
+def colortable_lut(colortable):
+    # the last entry is the color for missing data
+    key = (colortable.name, tuple(sorted(colortable.raw.items())))
+    lut = _luts.get(key)
+    if lut is None:
+        cmap = colortable.cmap
+        lut = np.empty((cmap.N + 1, 4), dtype=np.uint8)
+        lut[:cmap.N] = cmap(np.arange(cmap.N), bytes=True)
+        lut[cmap.N] = cmap(np.ma.masked_invalid([np.nan]), bytes=True)[0]
+        _luts[key] = lut
+    return lut
+
+
+def colorize(values, colortable):
+    lut = colortable_lut(colortable)
+    ncolors = len(lut) - 1
+    norm = colortable.norm
+    with np.errstate(invalid='ignore'):
+        index = np.floor((values - norm.vmin) / (norm.vmax - norm.vmin) * ncolors)
+        np.clip(index, 0, ncolors - 1, out=index)
+    index[np.isnan(index)] = ncolors
+    return lut[index.astype(np.intp)]
+
+
+def open_plotter(path):
+    if os.path.basename(path).startswith('GOES16'):
+        return Goes16Plotter(netCDF4.Dataset(path))
+    return Nexrad2Plotter(nexradl2.open_dataset(path))
+
+
+class TileRenderer(object):
+    def __init__(self, plotter, colortable=None, cache=None, tile_size=TILE_SIZE, scale=()):
+        if colortable is None:
+            colortable = plotter.default_ctable()
+        self._plotter = plotter
+        self._colortable = colortable
+        self._cache = cache
+        self._tile_size = tile_size
+        if isinstance(plotter, Goes16Plotter):
+            self._source = _SatelliteSource(plotter, colortable, scale)
+        elif isinstance(plotter, Nexrad2Plotter):
+            self._source = _RadarSource(plotter, colortable)
+        else:
+            raise ValueError("Cannot render tiles for: {}".format(type(plotter).__name__))
+
+    @property
+    def product(self):
+        return self._source.product
+
+    @property
+    def timestamp(self):
+        return self._plotter.timestamp
+
+    @property
+    def style(self):
+        return '{}_{}px'.format(self._colortable.name, self._tile_size)
+
+    def bounds(self):
+        return self._source.bounds()
+
+    def tiles_for(self, zooms, extent=None):
+        extent = extent or self.bounds()
+        for z in zooms:
+            for x, y in tiles_covering(extent, z):
+                yield z, x, y
+
+    def render(self, z, x, y):
+        index = self._source.lookup(_warp(self._source, z, x, y, self._tile_size))
+        values = np.full(index.shape, np.nan, dtype=np.float32)
+        inside = index >= 0
+        values[inside] = self._source.sample(index[inside])
+        return colorize(values, self._colortable)
+
+    def tile(self, z, x, y):
+        if self._cache is not None:
+            cached = self._cache.get(self.product, self.timestamp, self.style, z, x, y)
+            if cached is not None:
+                return cached
+
+        buffer = io.BytesIO()
+        Image.fromarray(self.render(z, x, y), 'RGBA').save(buffer, format='png')
+        png = buffer.getvalue()
+        if self._cache is not None:
+            self._cache.put(self.product, self.timestamp, self.style, z, x, y, png)
+        return png
+
+
+# ttl is in seconds, or a function of (product, timestamp)
+class TileCache(object):
+    def __init__(self, directory=None, ttl=DEFAULT_TTL):
+        self._directory = directory or config.TILE_CACHE_DIR
+        self._ttl = ttl
+        os.makedirs(self._directory, exist_ok=True)
+
+    @property
+    def directory(self):
+        return self._directory
+
+    def ttl(self, product, timestamp):
+        if callable(self._ttl):
+            return self._ttl(product, timestamp)
+        return self._ttl
+
+    def path(self, product, timestamp, style, z, x, y):
+        digest = hashlib.sha1('{}/{}/{}/{}'.format(style, z, x, y).encode('utf-8')).hexdigest()
+        return os.path.join(self._directory, product, _timestamp_dirname(timestamp), digest + '.png')
+
+    def get(self, product, timestamp, style, z, x, y):
+        path = self.path(product, timestamp, style, z, x, y)
+        try:
+            age = time.time() - os.path.getmtime(path)
+            if age > self.ttl(product, timestamp):
+                os.remove(path)
+                return None
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, product, timestamp, style, z, x, y, data):
+        path = self.path(product, timestamp, style, z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # several seeding processes may write the same cache
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return path
+
+    def purge(self):
+        removed = 0
+        now = time.time()
+        for product in os.listdir(self._directory):
+            product_dir = os.path.join(self._directory, product)
+            for timestamp_name in os.listdir(product_dir):
+                timestamp_dir = os.path.join(product_dir, timestamp_name)
+                ttl = self.ttl(product, _timestamp_from_dirname(timestamp_name))
+                for name in os.listdir(timestamp_dir):
+                    path = os.path.join(timestamp_dir, name)
+                    if now - os.path.getmtime(path) > ttl:
+                        os.remove(path)
+                        removed += 1
+                if not os.listdir(timestamp_dir):
+                    shutil.rmtree(timestamp_dir)
+        logger.info('[TILES] Purged {} expired tiles'.format(removed))
+        return removed
+
+
+def seed_tiles(path, zooms, cache=None, colortable=None, extent=None, opener=open_plotter,
+               tile_size=TILE_SIZE, workers=4):
+    # workers=0 renders in this process
+    if cache is None:
+        cache = TileCache()
+    with opener(path) as plotter:
+        tiles = list(TileRenderer(plotter, colortable, tile_size=tile_size).tiles_for(zooms, extent))
+    logger.info('[TILES] Seeding {} tiles from: {}'.format(len(tiles), path))
+
+    args = (path, opener, colortable, cache, tile_size)
+    if not workers:
+        _init_seed_worker(*args)
+        return sum(_seed_tile(tile) for tile in tiles)
+    with ProcessPoolExecutor(workers, initializer=_init_seed_worker, initargs=args) as pool:
+        return sum(pool.map(_seed_tile, tiles, chunksize=max(1, len(tiles) // (4 * workers))))
+
+
+_seed_renderer = None
+
+
+def _init_seed_worker(path, opener, colortable, cache, tile_size):
+    global _seed_renderer
+    if _seed_renderer is not None:
+        _seed_renderer._plotter.close()
+    _seed_renderer = TileRenderer(opener(path), colortable, cache, tile_size)
+
+
+def _seed_tile(tile):
+    renderer = _seed_renderer
+    if renderer._cache.get(renderer.product, renderer.timestamp, renderer.style, *tile) is not None:
+        return 0
+    renderer.tile(*tile)
+    return 1
+
+
+def _warp(source, z, x, y, size):
+    key = source.geometry_key + (z, x, y, size)
+    with _warps_lock:
+        if key in _warps:
+            _warps.move_to_end(key)
+            return _warps[key]
+    warp = source.warp(*tile_lonlat(z, x, y, size))
+    with _warps_lock:
+        _warps[key] = warp
+        while len(_warps) > WARP_CACHE_SIZE:
+            _warps.popitem(last=False)
+    return warp
+
+
+def _timestamp_dirname(timestamp):
+    return timestamp.strftime('%Y%m%d_%H%M%S')
+
+
+def _timestamp_from_dirname(name):
+    return datetime.strptime(name, '%Y%m%d_%H%M%S')
+
+
+class _SatelliteSource(object):
+    def __init__(self, plotter, colortable, scale):
+        self._plotter = plotter
+        self._convert = plotter._unit_converter(colortable, scale)
+        with netcdf_lock:
+            x, y = plotter._coordinates()
+        self._x = np.asarray(x, dtype=np.float64)
+        self._y = np.asarray(y, dtype=np.float64)
+        self._crs = plotter.transform_crs
+        self.geometry_key = ('satellite', self._crs.proj4_init, len(self._x), self._x[0], self._x[-1],
+                             len(self._y), self._y[0], self._y[-1])
+        self.product = 'GOES16_{}_Ch{:02d}'.format(plotter.dataset.product_name, int(plotter.channel))
+
+    def bounds(self):
+        rows = np.linspace(0, len(self._y) - 1, 65).astype(int)
+        cols = np.linspace(0, len(self._x) - 1, 65).astype(int)
+        x, y = np.meshgrid(self._x[cols], self._y[rows])
+        lonlat = ccrs.PlateCarree().transform_points(self._crs, x, y)
+        lon, lat = lonlat[..., 0], lonlat[..., 1]
+        valid = np.isfinite(lon) & np.isfinite(lat)
+        return geobbox(lon[valid].min(), lon[valid].max(), lat[valid].min(), lat[valid].max())
+
+    def warp(self, lon, lat):
+        # flat index into the grid of the pixel nearest each point, or -1 outside of it
+        points = self._crs.transform_points(ccrs.Geodetic(), lon, lat)
+        with np.errstate(invalid='ignore'):
+            cols = np.rint((points[..., 0] - self._x[0]) / (self._x[1] - self._x[0]))
+            rows = np.rint((points[..., 1] - self._y[0]) / (self._y[1] - self._y[0]))
+            inside = (cols >= 0) & (cols < len(self._x)) & (rows >= 0) & (rows < len(self._y))
+        index = np.full(lon.shape, -1, dtype=np.int32)
+        index[inside] = rows[inside] * len(self._x) + cols[inside]
+        return index
+
+    def lookup(self, warp):
+        return warp
+
+    def sample(self, index):
+        if not index.size:
+            return np.empty(0, dtype=np.float32)
+        rows, cols = np.divmod(index, len(self._x))
+        yslice = mask_to_slice(np.bincount(rows, minlength=len(self._y)) > 0)
+        xslice = mask_to_slice(np.bincount(cols, minlength=len(self._x)) > 0)
+        with netcdf_lock:
+            scmi = self._plotter._scmi
+            data = scmi[yslice, xslice]
+            fill_value = getattr(scmi, '_FillValue', None)
+        if self._plotter.sattype == 'VIS' and fill_value is not None:
+            # hack for fixing clipping highlights that default to fill value of 0
+            data[data == fill_value] = 1.0
+        data = np.ma.filled(np.ma.asarray(data, dtype=np.float32), np.nan)
+        data = np.asarray(self._convert(data), dtype=np.float32)
+        return data[rows - yslice.start, cols - xslice.start]
+
+
+class _RadarSource(object):
+    def __init__(self, plotter, colortable):
+        self._plotter = plotter
+        self._values = None
+        radar_units = plotter._radarunits
+        if isinstance(radar_units, str):
+            radar_units = units.get(radar_units)
+        self._convert = units.arrayconvert(radar_units, colortable.unit)
+
+        with netcdf_lock:
+            variables = plotter.dataset.variables
+            self._az = np.asarray(variables[plotter._getncvar('azimuth')][plotter.sweep])
+            distvar = variables[plotter._getncvar('distance')]
+            dist = np.asarray(distvar[:2], dtype=np.float64)
+            self._ngates = distvar.shape[0]
+            dist_unit = units.get(getattr(distvar, 'units', 'm'))
+            self._stn_lon, self._stn_lat = plotter._stn_coordinates
+        self._first_gate_km = units.KILOMETER.convert(dist[0], dist_unit)
+        self._spacing_km = units.KILOMETER.convert(dist[1] - dist[0], dist_unit)
+        # the warp is bearing and range from the radar; the radials it falls on change every scan
+        self.geometry_key = ('radar', float(self._stn_lon), float(self._stn_lat))
+        self.product = '{}_{}{}_{}'.format(plotter.station, plotter.radartype,
+                                           '_HI' if plotter.hires else '', plotter.sweep)
+
+    def bounds(self):
+        return geobbox(*self._plotter._extent)
+
+    def warp(self, lon, lat):
+        return (initial_bearing(self._stn_lon, self._stn_lat, lon, lat).astype(np.float32),
+                haversine_distance(self._stn_lon, self._stn_lat, lon, lat).astype(np.float32))
+
+    def lookup(self, warp):
+        bearings, ranges = warp
+        radials = _nearest_radials(self._az, bearings.ravel()).reshape(bearings.shape)
+        # distance is at gate centers
+        gates = np.floor((ranges - self._first_gate_km) / self._spacing_km + 0.5).astype(np.int64)
+        inside = (gates >= 0) & (gates < self._ngates)
+        return np.where(inside, radials * self._ngates + gates, -1)
+
+    def sample(self, index):
+        # a sweep is small, so it is read and converted once for all tiles
+        if self._values is None:
+            with netcdf_lock:
+                data = self._plotter._data_for_sweep()
+            self._values = np.asarray(self._convert(data), dtype=np.float32).ravel()
+        return self._values[index]
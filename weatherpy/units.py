@@ -1,5 +1,3 @@
-import math
-
 import numpy as np
 
 
@@ -155,12 +153,13 @@ _units_repo.register_conversion(KILOMETER, METER, lambda km: km * 1000)
 _units_repo.register_conversion(METER, KILOMETER, lambda m: m / 1000)
 _units_repo.register_conversion(METER, MILE, lambda m: m * 0.000621371)
 _units_repo.register_conversion(MILE, METER, lambda mi: mi / 0.000621371)
-_units_repo.register_conversion(DEGREE, RADIAN, math.radians)
-_units_repo.register_conversion(RADIAN, DEGREE, math.degrees)
+_units_repo.register_conversion(DEGREE, RADIAN, np.radians)
+_units_repo.register_conversion(RADIAN, DEGREE, np.degrees)
 
 
 def arrayconvert(unit1, unit2):
+    # all conversions are arithmetic on the values, so they apply to whole arrays at once
     def convert(x):
-        return unit2.convert(x, unit1)
+        return unit2.convert(np.asanyarray(x), unit1)
 
-    return np.vectorize(convert)
\ No newline at end of file
+    return convert
\ No newline at end of file
@@ -0,0 +1,164 @@
+import heapq
+import itertools
+import time
+from collections import deque
+from datetime import timedelta
+
+import requests
+
+from weatherpy.internal import pyhelpers, logger
+
+
+def watch(selection, action=None, since=None, **watcher_kwargs):
+    watcher = Watcher(**watcher_kwargs)
+    watcher.add(selection, action, since=since)
+    return (result for _, result in watcher.run())
+
+
+class Watcher(object):
+    def __init__(self, min_interval=timedelta(seconds=20), max_interval=timedelta(minutes=10),
+                 default_cadence=timedelta(minutes=5), lookback=timedelta(hours=1), sleep=None):
+        if min_interval > max_interval:
+            raise ValueError("min_interval must not be greater than max_interval")
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._default_cadence = default_cadence
+        self._lookback = lookback
+        self._sleep = sleep or time.sleep
+        self._schedule = []
+        self._targets = []
+        self._counter = itertools.count()
+        self._stopped = False
+
+    def add(self, selection, action=None, label=None, since=None):
+        if action is None:
+            action = selection._default_action
+        if label is None:
+            label = selection
+        now = pyhelpers.current_time_utc()
+        target = _WatchTarget(selection, action, label, since or now)
+        self._targets.append(target)
+        self._push(now, target)
+        return target
+
+    def stop(self):
+        self._stopped = True
+
+    def poll(self):
+        return list(self._deliver())
+
+    def run(self, limit=None):
+        self._stopped = False
+        count = 0
+        while not self._stopped and self._schedule:
+            for item in self._deliver():
+                yield item
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+                if self._stopped:
+                    return
+            wait = (self._schedule[0][0] - pyhelpers.current_time_utc()).total_seconds()
+            if wait > 0:
+                self._sleep(wait)
+
+    def _deliver(self):
+        now = pyhelpers.current_time_utc()
+        while self._schedule and self._schedule[0][0] <= now:
+            _, _, target = heapq.heappop(self._schedule)
+            self._refresh(target, now)
+
+        # datasets stay pending until they are yielded, so stopping early doesn't drop any
+        for target in self._targets:
+            while target.pending:
+                ts, ds = target.pending[0]
+                logger.info('[WATCH] New dataset for {}: {}'.format(target.label, ts))
+                result = target.action(ds)
+                target.pending.popleft()
+                yield target.label, result
+
+    def _refresh(self, target, now):
+        if target.last_timestamp is not None:
+            t1 = target.last_timestamp
+        else:
+            # the lookback seeds cadence and latency estimates; never start after `since`
+            t1 = min(target.since, now - self._lookback)
+        try:
+            found = list(target.selection._datasets_between(t1, now + self._min_interval, 'asc'))
+        except requests.exceptions.RequestException as e:
+            logger.warning('[WATCH] Failed to refresh {}: {}'.format(target.label, e))
+            found = []
+
+        previous = target.last_timestamp
+        target.pending.extend(target.update(found, now))
+        if target.last_timestamp != previous:
+            target.misses = 0
+            next_poll = self._next_expected(target, now)
+        else:
+            target.misses += 1
+            next_poll = now + min(self._min_interval * 2 ** target.misses, self._max_interval)
+        self._push(next_poll, target)
+
+    def _next_expected(self, target, now):
+        # the next scan should show up one cadence after the latest one, plus however long it
+        # has typically taken datasets to appear in the catalog.
+        cadence = target.cadence() or self._default_cadence
+        expected = target.last_timestamp + cadence + target.latency()
+        return min(max(expected, now + self._min_interval), now + self._max_interval)
+
+    def _push(self, when, target):
+        heapq.heappush(self._schedule, (when, next(self._counter), target))
+
+
+class _WatchTarget(object):
+    def __init__(self, selection, action, label, since):
+        self.selection = selection
+        self.action = action
+        self.label = label
+        self.since = since
+        self.misses = 0
+        self.last_timestamp = None
+        self.pending = deque()
+        self._last_keys = set()
+        self._timestamps = deque(maxlen=8)
+        self._latencies = deque(maxlen=8)
+
+    def update(self, found, now):
+        initial = self.last_timestamp is None
+        new = []
+        for ts, ds in found:
+            key = _dataset_key(ds)
+            if self.last_timestamp is not None:
+                if ts < self.last_timestamp or (ts == self.last_timestamp and key in self._last_keys):
+                    continue
+            if ts != self.last_timestamp:
+                self._last_keys = set()
+                self._timestamps.append(ts)
+                if not initial:
+                    self._latencies.append(now - ts)
+            self.last_timestamp = ts
+            self._last_keys.add(key)
+            if ts >= self.since:
+                new.append((ts, ds))
+        return new
+
+    def cadence(self):
+        if len(self._timestamps) < 2:
+            return None
+        ts = list(self._timestamps)
+        return _median([t2 - t1 for t1, t2 in zip(ts, ts[1:])])
+
+    def latency(self):
+        if not self._latencies:
+            return timedelta(0)
+        return max(_median(list(self._latencies)), timedelta(0))
+
+
+def _dataset_key(ds):
+    name = getattr(ds, 'name', None)
+    return name if isinstance(name, str) else str(ds)
+
+
+def _median(deltas):
+    deltas = sorted(deltas)
+    return deltas[len(deltas) // 2]